@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: regex-based parse_height_str vs. the previous replace()/split() parser.
+Run with: python benchmarks/bench_parse_height.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from bmi_bot import parse_height_str  # noqa: E402
+
+SAMPLES = ["170", "170 cm", "170.5 cm", "1.75", "5'9\"", "5 ft 9 in", "5'11\"", "6 ft", "5 9", "182 cm"]
+
+
+def legacy_parse_height_str(text: str) -> float:
+    """The replace()/split() parser that parse_height_str replaced (kept for comparison)."""
+    raw = text.strip().lower()
+    raw = raw.replace('"', ' in').replace("'", ' ft ').replace('feet', 'ft').replace('meter', 'm')
+    raw = raw.replace('cms', 'cm')
+    parts = raw.replace(',', '.').split()
+    if len(parts) == 1 or (len(parts) == 2 and parts[1].startswith('c')):
+        num = float(parts[0])
+        return round(num * 100 if len(parts) == 1 and num <= 3 else num, 1)
+    ft = None
+    inch = 0.0
+    if 'ft' in raw or 'foot' in raw:
+        tokens = raw.replace('ft', ' ft ').replace('in', ' in ').split()
+        for i, t in enumerate(tokens):
+            if t == 'ft' and i > 0:
+                ft = float(tokens[i-1])
+            if t == 'in' and i > 0:
+                inch = float(tokens[i-1])
+    else:
+        nums = [p for p in parts if all(c.isdigit() or c == '.' for c in p)]
+        if len(nums) >= 2:
+            ft = float(nums[0])
+            inch = float(nums[1])
+    if ft is None:
+        raise ValueError(text)
+    return round(ft * 30.48 + inch * 2.54, 1)
+
+
+def bench(fn, repeat: int = 5, number: int = 20000) -> float:
+    """Best-of-`repeat` parses per second over SAMPLES."""
+    def run():
+        for s in SAMPLES:
+            fn(s)
+    best = min(timeit.repeat(run, repeat=repeat, number=number))
+    return number * len(SAMPLES) / best
+
+
+def main():
+    old = bench(legacy_parse_height_str)
+    new = bench(parse_height_str)
+    print(f"legacy replace/split : {old:12,.0f} parses/sec")
+    print(f"compiled regex       : {new:12,.0f} parses/sec")
+    print(f"speed-up             : {new / old:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
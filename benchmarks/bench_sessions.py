@@ -0,0 +1,64 @@
+"""
+Session store throughput: complete chat sessions per second for each bmi_sessions backend.
+Run with: python benchmarks/bench_sessions.py [--sessions N]
+
+A session here is what the chat server does for one planner conversation: a put()
+after each of ANSWERS answers, a get() as if resuming halfway, and a delete() at the end.
+SQLite is measured with the default batched writes and with batch_size=1 (a
+transaction per write) to show what batching buys.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from bmi_dialog import ChatSession  # noqa: E402
+from bmi_sessions import MemorySessionStore, SQLiteSessionStore  # noqa: E402
+
+ANSWERS = 11
+
+
+def run_sessions(store, n: int) -> float:
+    """Sessions per second; conversations are interleaved like concurrent users."""
+    blob = ChatSession().to_bytes()
+    ids = [f"s{i:08d}" for i in range(n)]
+    start = time.perf_counter()
+    for step in range(ANSWERS):
+        for sid in ids:
+            store.put(sid, blob)
+        if step == ANSWERS // 2:
+            for sid in ids:
+                store.get(sid)
+    for sid in ids:
+        store.delete(sid)
+    store.flush()
+    return n / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    args = parser.parse_args(argv)
+    n = args.sessions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory (LRU+TTL)", lambda: MemorySessionStore()),
+            ("sqlite WAL, batched", lambda: SQLiteSessionStore(os.path.join(tmp, "batched.db"))),
+            ("sqlite WAL, batch_size=1", lambda: SQLiteSessionStore(os.path.join(tmp, "single.db"), batch_size=1)),
+        ]
+        print(f"{'backend':28} {'sessions/sec':>14}   ({n} sessions x {ANSWERS} answers)")
+        for name, make in backends:
+            store = make()
+            try:
+                rate = run_sessions(store, n)
+            finally:
+                store.close()
+            print(f"{name:28} {rate:14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
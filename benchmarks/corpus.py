@@ -0,0 +1,85 @@
+"""
+Deterministic, offline test corpora for the benchmarks.
+
+Free-text weights/heights mix the formats people actually type (kg/lb, cm/m/ft+in,
+with and without spaces) and person records cover the full range of ages, sexes
+and activity levels accepted by the planner.
+"""
+import random
+from typing import List
+
+SEED = 20250101
+
+
+def weight_strings(n: int, seed: int = SEED) -> List[str]:
+    r = random.Random(seed)
+    out = []
+    for _ in range(n):
+        kg = r.gauss(80, 18)
+        kg = min(max(kg, 40), 200)
+        style = r.random()
+        if style < 0.4:
+            out.append(f"{kg:.0f}")
+        elif style < 0.6:
+            out.append(f"{kg:.1f} kg")
+        elif style < 0.7:
+            out.append(f"{kg:.0f}kg")
+        elif style < 0.9:
+            out.append(f"{kg / 0.45359237:.0f} lb")
+        else:
+            out.append(f"{kg / 0.45359237:.0f}lbs")
+    return out
+
+
+def height_strings(n: int, seed: int = SEED + 1) -> List[str]:
+    r = random.Random(seed)
+    out = []
+    for _ in range(n):
+        cm = min(max(r.gauss(171, 10), 140), 210)
+        style = r.random()
+        if style < 0.4:
+            out.append(f"{cm:.0f}")
+        elif style < 0.55:
+            out.append(f"{cm:.0f} cm")
+        elif style < 0.65:
+            out.append(f"{cm / 100:.2f} m")
+        else:
+            ft, inch = divmod(round(cm / 2.54), 12)
+            out.append(r.choice((f"{ft}'{inch}\"", f"{ft} ft {inch} in", f"{ft}ft{inch}", f"{ft} {inch}")))
+    return out
+
+
+def person_records(n: int, seed: int = SEED + 2) -> List[dict]:
+    """Records in the shape bmi_batch reads (string fields, as from a CSV)."""
+    r = random.Random(seed)
+    weights = weight_strings(n, seed)
+    heights = height_strings(n, seed + 1)
+    out = []
+    for i in range(n):
+        rec = {
+            "id": str(i),
+            "weight": weights[i],
+            "height": heights[i],
+            "age": str(r.randint(18, 80)),
+            "sex": r.choice(("male", "female", "other")),
+            "activity": str(r.randint(1, 5)),
+            "target_weight": "",
+            "weeks": "",
+        }
+        if r.random() < 0.7:
+            rec["target_weight"] = str(r.randint(50, 90))
+            rec["weeks"] = str(r.randint(4, 52))
+        out.append(rec)
+    return out
+
+
+def numeric_people(n: int, seed: int = SEED + 3) -> List[tuple]:
+    """(weight_kg, height_cm, age, sex, activity_key, target_kg, days) tuples for the core math."""
+    r = random.Random(seed)
+    out = []
+    for _ in range(n):
+        w = round(min(max(r.gauss(80, 18), 40), 200), 1)
+        out.append((w, round(min(max(r.gauss(171, 10), 140), 210), 1), r.randint(18, 80),
+                    r.choice(("male", "female", "other")), str(r.randint(1, 5)),
+                    round(w * r.uniform(0.75, 0.98), 1), r.randint(28, 365)))
+    return out
@@ -0,0 +1,116 @@
+"""
+Benchmark suite for bmi_bot. Runs offline with the standard library only
+(NumPy-backed benchmarks are skipped when NumPy is missing).
+
+Run with: python benchmarks/run.py [--quick] [-k SUBSTRING] [--json FILE]
+
+For every benchmark it reports operations per second (best of several repeats)
+and the peak memory traced by tracemalloc while running one pass over the corpus.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import bmi_batch  # noqa: E402
+import bmi_bot  # noqa: E402
+import bmi_server  # noqa: E402
+import corpus  # noqa: E402
+
+
+def _benchmarks(n: int) -> List[Tuple[str, Callable[[], None], int]]:
+    """(name, one pass over the corpus, operations per pass)."""
+    weights = corpus.weight_strings(n)
+    heights = corpus.height_strings(n)
+    people = corpus.numeric_people(n)
+    records = corpus.person_records(n)
+    bmis = [bmi_bot.calculate_bmi(p[0], p[1]) for p in people]
+    tdees = [bmi_bot.estimate_tdee(*p[:5]) for p in people]
+    plans = [bmi_bot.recommend_calories_for_weight_loss(p[0], p[5], t, p[6], p[3]) for p, t in zip(people, tdees)]
+    calories = [pl.get("suggested_daily_calories", t) for pl, t in zip(plans, tdees)]
+    bmi_bodies = [json.dumps({"weight_kg": p[0], "height_cm": p[1]}).encode() for p in people]
+
+    def plan_pipeline():
+        for w, h, age, sex, act, target, days in people:
+            tdee = bmi_bot.estimate_tdee(w, h, age, sex, act)
+            plan = bmi_bot.recommend_calories_for_weight_loss(w, target, tdee, days, sex)
+            bmi_bot.recommend_macros(plan.get("suggested_daily_calories", tdee), w, act)
+
+    def each(fn, args):
+        # results are discarded so peak memory reflects per-call garbage, not retained output
+        def run():
+            for a in args:
+                fn(*a)
+        return run
+
+    benches = [
+        ("parse_weight_str", each(bmi_bot.parse_weight_str, [(s,) for s in weights]), n),
+        ("parse_height_str", each(bmi_bot.parse_height_str, [(s,) for s in heights]), n),
+        ("calculate_bmi", each(bmi_bot.calculate_bmi, [p[:2] for p in people]), n),
+        ("bmi_category", each(bmi_bot.bmi_category, [(b,) for b in bmis]), n),
+        ("bmi_category_code[who_obesity_classes]",
+         each(bmi_bot.bmi_category_code, [(b, "who_obesity_classes") for b in bmis]), n),
+        ("bmr_mifflin_sex", each(bmi_bot.bmr_mifflin_sex, [p[:4] for p in people]), n),
+        ("estimate_tdee", each(bmi_bot.estimate_tdee, [p[:5] for p in people]), n),
+        ("recommend_calories_for_weight_loss", each(bmi_bot.recommend_calories_for_weight_loss,
+                                                    [(p[0], p[5], t, p[6], p[3]) for p, t in zip(people, tdees)]), n),
+        ("recommend_macros", each(bmi_bot.recommend_macros, [(c, p[0], p[4]) for c, p in zip(calories, people)]), n),
+        ("plan pipeline (tdee+plan+macros)", plan_pipeline, n),
+        ("bmi_batch.process_record (end to end)", each(bmi_batch.process_record, [(r,) for r in records]), n),
+        ("bmi_server.handle_request /bmi", each(bmi_server.handle_request, [("POST", "/bmi", b) for b in bmi_bodies]), n),
+    ]
+
+    try:
+        import numpy as np
+    except ImportError:
+        return benches
+    w_arr = np.array([p[0] for p in people])
+    h_arr = np.array([p[1] for p in people])
+    bmi_arr = np.array(bmis)
+    benches += [
+        ("calculate_bmi_batch (numpy)", lambda: bmi_bot.calculate_bmi_batch(w_arr, h_arr), n),
+        ("bmi_category_codes (numpy)", lambda: bmi_bot.bmi_category_codes(bmi_arr), n),
+    ]
+    return benches
+
+
+def measure(fn: Callable[[], None], ops: int, repeat: int) -> Dict[str, float]:
+    fn()  # warm up (regex compile, lazy imports)
+    best = min(timeit.repeat(fn, repeat=repeat, number=1))
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"ops_per_sec": ops / best, "peak_kib": peak / 1024}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small corpus, fewer repeats")
+    parser.add_argument("-k", dest="pattern", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args(argv)
+
+    n, repeat = (2000, 3) if args.quick else (20000, 5)
+    results = {}
+    print(f"{'benchmark':45} {'ops/sec':>14} {'peak KiB':>10}   (corpus of {n})")
+    for name, fn, ops in _benchmarks(n):
+        if args.pattern not in name:
+            continue
+        r = measure(fn, ops, repeat)
+        results[name] = r
+        print(f"{name:45} {r['ops_per_sec']:14,.0f} {r['peak_kib']:10,.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
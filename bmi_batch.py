@@ -0,0 +1,564 @@
+"""
+Batch mode for the BMI Checker Bot.
+Run with: python bmi_bot.py --batch people.csv --output results.csv
+
+Streams person records from CSV or JSON Lines through the same pipeline the chatbot
+uses (parse weight/height -> BMI and category -> TDEE -> calorie plan -> macros) and
+writes one result per input record as it goes, so memory use does not grow with the
+size of the input.
+
+Input fields: weight, height (free text, e.g. '154 lb', '5 ft 9 in'), and optionally
+age, sex, activity (1-5), target_weight and weeks. Unknown fields are passed through.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+from array import array
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import bmi_bot
+
+RESULT_FIELDS = (
+    "weight_kg", "height_cm", "bmi", "category", "tdee",
+    "suggested_daily_calories", "daily_deficit", "estimated_weeks_needed",
+    "protein_g", "fat_g", "carb_g", "warnings", "error",
+)
+
+
+# what one unusable record can raise; anything else is a bug and should stop the run
+RECORD_ERRORS = (ValueError, ArithmeticError)
+
+
+class BadRecord(dict):
+    """Stands in for an input line that could not be read as a record (see read_records).
+
+    It is an empty record, so writers can still emit a row; `error` says what was wrong."""
+
+    def __init__(self, error: str):
+        super().__init__()
+        self.error = error
+
+    def __reduce__(self):
+        # dict subclasses otherwise pickle without their attributes (workers receive these)
+        return BadRecord, (self.error,)
+
+
+class ParsedRecord(dict):
+    """An input record whose values are already parsed (e.g. read from a binary snapshot).
+
+    `person` is the PersonRecord the pipeline uses as is; the dict holds the fields to pass
+    through to the output, like the text fields of a CSV row."""
+
+    def __init__(self, person: bmi_bot.PersonRecord, fields: dict):
+        super().__init__(fields)
+        self.person = person
+
+    def __reduce__(self):
+        return ParsedRecord, (self.person, dict(self))
+
+
+def _field(rec: dict, name: str) -> Optional[str]:
+    val = rec.get(name)
+    if val is None:
+        return None
+    val = str(val).strip()
+    return val or None
+
+
+def person_from_record(rec: dict) -> bmi_bot.PersonRecord:
+    """Parse a raw input record (free-text weight/height, string fields) into a PersonRecord.
+
+    age is None when the record has no age; target_weight_kg/days are None without a goal.
+    Raises ValueError (usually a bmi_bot.ParseError) for unusable values."""
+    if isinstance(rec, ParsedRecord):
+        return rec.person
+    if isinstance(rec, BadRecord):
+        raise ValueError(rec.error)
+    if not isinstance(rec, dict):
+        raise ValueError("Record is not an object.")
+    weight = bmi_bot.parse_weight_str(_field(rec, "weight") or "")
+    height = bmi_bot.parse_height_str(_field(rec, "height") or "")
+    age = _field(rec, "age")
+    target = _field(rec, "target_weight")
+    weeks = _field(rec, "weeks")
+    target_kg = days = None
+    if target is not None and weeks is not None:
+        target_kg = bmi_bot.parse_weight_str(target)
+        days = int(max(1, round(float(weeks) * 7)))
+    return bmi_bot.PersonRecord(weight, height, None if age is None else int(float(age)),
+                                _field(rec, "sex") or "other", _field(rec, "activity") or "1", target_kg, days)
+
+
+def evaluate_person(p: bmi_bot.PersonRecord):
+    """Run the pipeline for one person: returns (bmi, tdee, plan, macros).
+
+    tdee and macros are None without an age; plan is None without a goal (or when no
+    deficit is needed), in which case macros are for maintenance calories."""
+    bmi = bmi_bot.calculate_bmi(p.weight_kg, p.height_cm)
+    if p.age is None:
+        return bmi, None, None, None
+    tdee = bmi_bot.estimate_tdee(p.weight_kg, p.height_cm, p.age, p.sex, p.activity_key)
+    plan = None
+    if p.target_weight_kg is not None:
+        plan = bmi_bot.plan_weight_loss(p.weight_kg, p.target_weight_kg, tdee, p.days, p.sex)
+        if plan.message is not None:
+            plan = None
+    suggested = plan.suggested_daily_calories if plan is not None else tdee
+    return bmi, tdee, plan, bmi_bot.compute_macros(suggested, p.weight_kg, p.activity_key)
+
+
+def process_record(rec: dict) -> dict:
+    """Run one input record through the pipeline and return the result fields.
+
+    Records that cannot be processed get an 'error' message instead of raising, so
+    one bad row does not stop a whole run."""
+    out = dict.fromkeys(RESULT_FIELDS)
+    try:
+        p = person_from_record(rec)
+        bmi, tdee, plan, macros = evaluate_person(p)
+    except RECORD_ERRORS as e:
+        out["error"] = str(e) or type(e).__name__
+        return out
+    out.update(weight_kg=p.weight_kg, height_cm=p.height_cm, bmi=bmi, category=bmi_bot.bmi_category(bmi))
+    if tdee is None:
+        return out
+    out["tdee"] = tdee
+    # without a goal the suggested intake is simply maintenance calories
+    out["suggested_daily_calories"] = tdee
+    if plan is not None:
+        out.update(
+            suggested_daily_calories=plan.suggested_daily_calories,
+            daily_deficit=plan.daily_deficit,
+            estimated_weeks_needed=plan.estimated_weeks_needed,
+            warnings=list(plan.warnings) or None,
+        )
+    out.update(protein_g=macros.protein_g, fat_g=macros.fat_g, carb_g=macros.carb_g)
+    return out
+
+
+class PlanColumns:
+    """Column-oriented results for many people: one typed array.array per field instead of
+    a dict per row (8 bytes per value, 1 for the category code). Missing values are NaN
+    (category code -1).
+
+    `row` is the record's 0-based position in the input, so results can be joined back to
+    it; `fields` names input fields (e.g. member_id) copied as text into `passthrough`.
+    A record that could not be processed keeps its row, its passthrough values and its
+    message in `errors`, with every computed value missing."""
+
+    COLUMNS = (
+        ("row", "q"), ("weight_kg", "d"), ("height_cm", "d"), ("bmi", "d"), ("category_code", "b"), ("tdee", "d"),
+        ("suggested_daily_calories", "d"), ("daily_deficit", "d"), ("estimated_weeks_needed", "d"),
+        ("protein_g", "d"), ("fat_g", "d"), ("carb_g", "d"),
+    )
+
+    def __init__(self, fields: Iterable[str] = ()):
+        self.columns = {name: array(code) for name, code in self.COLUMNS}
+        self.fields = tuple(fields)
+        self.passthrough: Dict[str, List[Optional[str]]] = {name: [] for name in self.fields}
+        self.errors: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.columns["row"])
+
+    def _append_input(self, row: int, rec: dict, error: Optional[str]):
+        self.columns["row"].append(row)
+        for name in self.fields:
+            self.passthrough[name].append(_field(rec, name) if isinstance(rec, dict) else None)
+        self.errors.append(error)
+
+    def append(self, row: int, rec: dict, p: bmi_bot.PersonRecord, bmi: float, tdee, plan, macros):
+        nan = float("nan")
+        self._append_input(row, rec, None)
+        c = self.columns
+        c["weight_kg"].append(p.weight_kg)
+        c["height_cm"].append(p.height_cm)
+        c["bmi"].append(bmi)
+        c["category_code"].append(bmi_bot.bmi_category_code(bmi))
+        c["tdee"].append(nan if tdee is None else tdee)
+        if plan is not None:
+            c["suggested_daily_calories"].append(plan.suggested_daily_calories)
+            c["daily_deficit"].append(plan.daily_deficit)
+            c["estimated_weeks_needed"].append(plan.estimated_weeks_needed)
+        else:
+            c["suggested_daily_calories"].append(nan if tdee is None else tdee)
+            c["daily_deficit"].append(nan)
+            c["estimated_weeks_needed"].append(nan)
+        c["protein_g"].append(nan if macros is None else macros.protein_g)
+        c["fat_g"].append(nan if macros is None else macros.fat_g)
+        c["carb_g"].append(nan if macros is None else macros.carb_g)
+
+    def append_error(self, row: int, rec: dict, error: str):
+        nan = float("nan")
+        self._append_input(row, rec, error)
+        for name, code in self.COLUMNS[1:]:
+            self.columns[name].append(-1 if code == "b" else nan)
+
+    def clear(self):
+        for col in self.columns.values():
+            del col[:]
+        for col in self.passthrough.values():
+            del col[:]
+        del self.errors[:]
+
+    def row(self, i: int) -> dict:
+        out = {"row": self.columns["row"][i]}
+        out.update((name, col[i]) for name, col in self.passthrough.items())
+        out.update((name, col[i]) for name, col in self.columns.items() if name != "row")
+        out["error"] = self.errors[i]
+        return out
+
+    def to_dicts(self) -> List[dict]:
+        """Back-compat view as a list of per-row dicts."""
+        return [self.row(i) for i in range(len(self))]
+
+
+def process_records_columnar(records: Iterable[dict], columns: Optional[PlanColumns] = None,
+                             start: int = 0) -> Tuple[PlanColumns, int]:
+    """Process records straight into a PlanColumns, numbering them from `start`.
+
+    Returns (columns, records that had errors); those are stored too, with their message."""
+    columns = PlanColumns() if columns is None else columns
+    errors = 0
+    for row, rec in enumerate(records, start):
+        try:
+            p = person_from_record(rec)
+            result = evaluate_person(p)
+        except RECORD_ERRORS as e:
+            columns.append_error(row, rec, str(e) or type(e).__name__)
+            errors += 1
+            continue
+        columns.append(row, rec, p, *result)
+    return columns, errors
+
+
+def columns_to_record_batch(columns: PlanColumns):
+    """Wrap PlanColumns as a pyarrow.RecordBatch without copying the numeric buffers.
+
+    Columns: row, the passthrough fields (text), the computed values, error (text).
+    Missing values (NaN, category code -1, None) become Arrow nulls."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    n = len(columns)
+    arrays, names = [], []
+    for name, code in PlanColumns.COLUMNS:
+        typ = {"q": pa.int64(), "b": pa.int8()}.get(code, pa.float64())
+        arr = pa.Array.from_buffers(typ, n, [None, pa.py_buffer(columns.columns[name])])
+        if code == "d":
+            arr = pc.if_else(pc.is_nan(arr), pa.scalar(None, typ), arr)
+        elif code == "b":
+            arr = pc.if_else(pc.equal(arr, -1), pa.scalar(None, typ), arr)
+        arrays.append(arr)
+        names.append(name)
+        if name == "row":
+            for field in columns.fields:
+                arrays.append(pa.array(columns.passthrough[field], pa.string()))
+                names.append(field)
+    arrays.append(pa.array(columns.errors, pa.string()))
+    names.append("error")
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def write_columnar(records: Iterable[dict], path: str, fmt: str = "parquet",
+                   row_group_size: int = 65536, fields: Iterable[str] = ()) -> Tuple[int, int]:
+    """Stream records into a Parquet ('parquet') or Arrow IPC ('arrow') file (needs pyarrow).
+
+    Results are accumulated in PlanColumns and flushed as one record batch / row group
+    every `row_group_size` rows. Each row has its input position ('row'), the input
+    `fields` named (e.g. ['member_id']) and an 'error' column for records that could not
+    be processed. Returns (records processed, errors), like process_stream."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow output needs the optional 'pyarrow' package (pip install pyarrow).") from None
+
+    fields = tuple(fields)
+    schema = columns_to_record_batch(PlanColumns(fields)).schema
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        sink = pq.ParquetWriter(path, schema)
+        write = lambda batch: sink.write_batch(batch, row_group_size=row_group_size)  # noqa: E731
+    elif fmt == "arrow":
+        sink = pa.ipc.new_file(path, schema)
+        write = sink.write_batch
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt!r} (use 'parquet' or 'arrow').")
+
+    n = errors = 0
+    it = iter(records)
+    try:
+        while True:
+            # a fresh PlanColumns per group: Arrow may still reference the previous buffers
+            columns, bad = process_records_columnar(islice(it, row_group_size), PlanColumns(fields), n)
+            if len(columns) == 0:
+                break
+            write(columns_to_record_batch(columns))
+            n += len(columns)
+            errors += bad
+    finally:
+        sink.close()
+    return n, errors
+
+
+def read_records(f: TextIO, fmt: str) -> Iterator[dict]:
+    """Yield input records one at a time from a CSV or JSON Lines stream.
+
+    A JSON Lines line that is not valid JSON, or not an object, becomes a BadRecord
+    so the run carries on and the output reports the error in that row."""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    elif fmt == "jsonl":
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield BadRecord(f"Line {lineno}: invalid JSON ({e.msg}).")
+                continue
+            if isinstance(rec, dict):
+                yield rec
+            else:
+                yield BadRecord(f"Line {lineno}: expected a JSON object, got {type(rec).__name__}.")
+    else:
+        raise ValueError(f"Unknown batch format: {fmt!r} (use 'csv' or 'jsonl').")
+
+
+class RecordWriter:
+    """Incrementally writes input records merged with their results.
+
+    For CSV the columns come from the first record unless `fields` is given; pass
+    header=False when writing a fragment of a larger file (see _process_chunk)."""
+
+    def __init__(self, f: TextIO, fmt: str, fields: Optional[List[str]] = None, header: bool = True):
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown batch format: {fmt!r} (use 'csv' or 'jsonl').")
+        self.f = f
+        self.fmt = fmt
+        self.fields = fields
+        self._header = header
+        self._csv = None
+
+    def prepare(self, rec: dict):
+        """Fix the CSV columns from `rec` and write the header, if not done yet."""
+        if self.fmt != "csv" or self._csv is not None:
+            return
+        if self.fields is None:
+            self.fields = [k for k in rec if k not in RESULT_FIELDS] + list(RESULT_FIELDS)
+        self._csv = csv.DictWriter(self.f, fieldnames=self.fields, extrasaction="ignore")
+        if self._header:
+            self._csv.writeheader()
+
+    def write(self, rec: dict, result: dict):
+        if self.fmt == "jsonl":
+            self.f.write(json.dumps({**rec, **result}) + "\n")
+            return
+        if self._csv is None:
+            self.prepare(rec)
+        row = {**rec, **result}
+        if row["warnings"]:
+            row["warnings"] = "; ".join(row["warnings"])
+        self._csv.writerow(row)
+
+
+def guess_format(path: Optional[str], default: str = "csv") -> str:
+    if path and path != "-":
+        lower = path.lower()
+        if lower.endswith(".bmis"):
+            return "bmis"
+        if lower.endswith(".parquet"):
+            return "parquet"
+        if lower.endswith((".arrow", ".feather")):
+            return "arrow"
+        if lower.endswith((".jsonl", ".ndjson", ".json")):
+            return "jsonl"
+        if lower.endswith(".csv"):
+            return "csv"
+    return default
+
+
+def guess_input_format(path: Optional[str]) -> str:
+    """guess_format for an input file, also recognising snapshots by their magic bytes."""
+    fmt = guess_format(path)
+    if fmt != "bmis" and path and path != "-":
+        import bmi_snapshot
+
+        if bmi_snapshot.is_snapshot(path):
+            return "bmis"
+    return fmt
+
+
+def process_stream(records: Iterable[dict], writer: RecordWriter) -> Tuple[int, int]:
+    """Process and write records one by one. Returns (processed, errors)."""
+    n = errors = 0
+    for rec in records:
+        result = process_record(rec)
+        writer.write(rec, result)
+        n += 1
+        if result["error"]:
+            errors += 1
+    return n, errors
+
+
+def _process_chunk(records: List[dict], fmt: str, fields: Optional[List[str]]) -> Tuple[str, int, int, float]:
+    """Worker entry point: process one shard and render it in the output format.
+
+    Returns (text, errors, worker pid, seconds). Rendering in the worker keeps the
+    parent down to reading input and writing finished text."""
+    start = time.perf_counter()
+    buf = io.StringIO()
+    writer = RecordWriter(buf, fmt, fields, header=False)
+    errors = 0
+    for rec in records:
+        result = process_record(rec)
+        writer.write(rec, result)
+        if result["error"]:
+            errors += 1
+    return buf.getvalue(), errors, os.getpid(), time.perf_counter() - start
+
+
+class WorkerStats:
+    """Per-worker throughput collected by process_stream_parallel."""
+
+    def __init__(self):
+        self.records: Dict[int, int] = {}
+        self.busy: Dict[int, float] = {}
+
+    def add(self, pid: int, n: int, seconds: float):
+        self.records[pid] = self.records.get(pid, 0) + n
+        self.busy[pid] = self.busy.get(pid, 0.0) + seconds
+
+    def report(self) -> str:
+        lines = []
+        for i, pid in enumerate(sorted(self.records), 1):
+            n, busy = self.records[pid], self.busy[pid]
+            rate = n / busy if busy > 0 else 0.0
+            lines.append(f"worker {i} (pid {pid}): {n} records in {busy:.2f}s busy, {rate:,.0f} records/sec")
+        return "\n".join(lines)
+
+
+def _init_worker(cache_size: int, metrics: bool):
+    if cache_size:
+        bmi_bot.enable_cache(cache_size)
+    if metrics:
+        import bmi_metrics
+
+        bmi_metrics.enable()
+
+
+def _metered(fn: Callable, *args):
+    """Run fn(*args) in a worker and return its result with the metrics it produced."""
+    import bmi_metrics
+
+    # a forked worker starts with a copy of the parent's numbers; send back only this job's
+    bmi_metrics.reset()
+    return fn(*args), bmi_metrics.export()
+
+
+def pool_map(fn: Callable, jobs: Iterable[tuple], workers: int) -> Iterator[Tuple[tuple, object]]:
+    """Run fn(*job) for each job in a pool of worker processes; yields (job, result) in job order.
+
+    Jobs are taken lazily with at most 2 per worker in flight, so memory stays bounded no
+    matter how many there are. Workers get this process's bmi_bot cache setting (they may
+    not be forked from it), and with bmi_metrics enabled their measurements are merged
+    into this process's."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    metrics = "bmi_metrics" in sys.modules and sys.modules["bmi_metrics"].enabled()
+    cache = bmi_bot.cache_info().get("estimate_tdee")
+    it = iter(jobs)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache.maxsize if cache else 0, metrics)) as pool:
+        while True:
+            while len(pending) < workers * 2:
+                job = next(it, None)
+                if job is None:
+                    break
+                pending.append((job, pool.submit(_metered, fn, *job) if metrics else pool.submit(fn, *job)))
+            if not pending:
+                break
+            job, fut = pending.popleft()
+            result = fut.result()
+            if metrics:
+                result, measured = result
+                sys.modules["bmi_metrics"].merge(measured)
+            yield job, result
+
+
+def process_stream_parallel(records: Iterable[dict], writer: RecordWriter, workers: int,
+                            chunk_size: int = 2000, stats: Optional[WorkerStats] = None) -> Tuple[int, int]:
+    """Like process_stream, but shards records into chunks processed by a pool of worker processes.
+
+    Output keeps the input order. At most 2 chunks per worker are in flight, so memory
+    stays bounded no matter how large the input is."""
+    it = iter(records)
+
+    def jobs():
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            writer.prepare(chunk[0])
+            yield chunk, writer.fmt, writer.fields
+
+    n = errors = 0
+    for (chunk, _, _), (text, chunk_errors, pid, seconds) in pool_map(_process_chunk, jobs(), workers):
+        writer.f.write(text)
+        if stats is not None:
+            stats.add(pid, len(chunk), seconds)
+        n += len(chunk)
+        errors += chunk_errors
+    return n, errors
+
+
+def run_batch(input_path: str = "-", output_path: str = "-", in_fmt: Optional[str] = None,
+              out_fmt: Optional[str] = None, workers: int = 1, chunk_size: int = 2000,
+              stats: Optional[WorkerStats] = None, row_group_size: int = 65536,
+              keep_fields: Iterable[str] = ()) -> Tuple[int, int]:
+    """Process a whole file ('-' for stdin/stdout). Formats are guessed from the file names.
+
+    With workers > 1 the records are processed by a process pool (see process_stream_parallel).
+    Output names ending in .parquet/.arrow produce columnar files (see write_columnar); those
+    are written by this process only and hold the input row number, the computed columns,
+    the error message and only the input fields named in `keep_fields` (CSV/JSON Lines
+    output keeps every input field).
+    Binary member snapshots (.bmis, see bmi_snapshot.py) are read as input too; the default
+    output for them is CSV."""
+    in_fmt = in_fmt or guess_input_format(input_path)
+    out_fmt = out_fmt or guess_format(output_path, "csv" if in_fmt == "bmis" else in_fmt)
+    if in_fmt == "bmis":
+        import bmi_snapshot
+
+        if input_path == "-":
+            raise ValueError("Snapshot input needs a file name (--batch members.bmis).")
+        fin = None
+        records = bmi_snapshot.iter_records(input_path)
+    else:
+        fin = sys.stdin if input_path == "-" else open(input_path, newline="", encoding="utf-8")
+        records = read_records(fin, in_fmt)
+    try:
+        if out_fmt in ("parquet", "arrow"):
+            if output_path == "-":
+                raise ValueError("Parquet/Arrow output needs a file name (--output results.parquet).")
+            return write_columnar(records, output_path, out_fmt, row_group_size, keep_fields)
+        fout = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+        try:
+            writer = RecordWriter(fout, out_fmt)
+            if workers > 1:
+                return process_stream_parallel(records, writer, workers, chunk_size, stats)
+            return process_stream(records, writer)
+        finally:
+            if fout is not sys.stdout:
+                fout.close()
+    finally:
+        records.close()
+        if fin is not None and fin is not sys.stdin:
+            fin.close()
@@ -11,7 +11,12 @@ This script runs an interactive command-line chatbot that:
 
 Not medical advice. Consult a healthcare professional for personalized guidance.
 """
-from typing import Optional
+import sys
+from bisect import bisect_right
+
+# Keep module import cheap: this file is also the CLI entry point and is started per
+# request by shell wrappers. Heavier modules (re, argparse, NumPy, the batch/server
+# modules) are imported inside the functions that need them.
 
 ACTIVITY_LEVELS = {
     "1": ("sedentary (little or no exercise)", 1.2),
@@ -37,94 +42,148 @@ def safe_float_input(prompt: str) -> float:
 
 # New helpers: support weight in kg or lb and height in cm or ft/in
 
+class ParseError(ValueError):
+    """Raised by parse_weight_str / parse_height_str.
+
+    str(err) is a message suitable for showing to the user; `reason` is a short
+    machine-readable code ('empty', 'unknown_unit', 'not_positive', 'invalid') and
+    `text` is the original input."""
+
+    def __init__(self, message: str, reason: str, text: str = ''):
+        super().__init__(message)
+        self.reason = reason
+        self.text = text
+
+
+_INF = float("inf")
+
+
+class WeightParseError(ParseError):
+    pass
+
+
+class HeightParseError(ParseError):
+    pass
+
+
+def parse_weight_str(text: str) -> float:
+    """Parse a weight like '70', '70 kg', '70kg' or '154 lb' and return kilograms."""
+    raw = text.strip().lower()
+    if not raw:
+        raise WeightParseError("Please enter your weight.", 'empty', text)
+    try:
+        # allow formats: '70', '70kg', '70 kg', '154 lb'
+        raw = raw.replace('kgs','kg').replace('lbs','lb')
+        parts = raw.replace(',', '.').split()
+        if len(parts) == 1:
+            # maybe '70kg' or just '70'
+            token = parts[0]
+            # separate digits and letters
+            num = ''
+            unit = ''
+            for ch in token:
+                if (ch.isdigit() or ch == '.'):
+                    num += ch
+                else:
+                    unit += ch
+            val = float(num)
+            unit = unit or 'kg'
+        else:
+            val = float(parts[0])
+            unit = parts[1]
+    except (ValueError, IndexError):
+        raise WeightParseError("Couldn't parse weight. Examples: '70', '70 kg', '154 lb'.", 'invalid', text) from None
+    if unit.startswith('k'):
+        kg = val
+    elif unit.startswith('l'):
+        kg = val * 0.45359237
+    else:
+        raise WeightParseError("Unknown unit; use 'kg' or 'lb'.", 'unknown_unit', text)
+    # validate the value callers get: '0.001' rounds to 0.0, which would divide by zero later
+    kg = round(kg, 2)
+    if kg <= 0:
+        raise WeightParseError("Weight must be positive.", 'not_positive', text)
+    if not kg < _INF:  # 'inf', 'nan' or too many digits for a float
+        raise WeightParseError("Weight is out of range.", 'invalid', text)
+    return kg
+
+
+# One pass over the (lower-cased) input instead of repeated replace()/split() copies.
+# Accepts metric ('170', '170 cm', '170cms', '1.75 m', '1.75'), feet/inches
+# ('5 ft 9 in', '5ft9', '5'9"', '5 feet 9 inches', '6'), bare '5 9' and inches only ('69 in').
+_NUM = r"\d+(?:\.\d*)?|\.\d+"
+# Word units may end in an abbreviation dot ('180 cm.', '5 ft. 9 in.').
+_INCH_UNIT = r'(?:(?:inch(?:es)?|in)\.?|"|\'\')'
+_HEIGHT_PATTERN = (
+    r"(?P<num>" + _NUM + r")\s*(?:"
+    r"(?P<metric>cms?|centimet(?:er|re)s?|m|met(?:er|re)s?)?\.?"
+    r"|(?P<ft>ft|feet|foot|')\.?\s*(?:(?P<ft_in>" + _NUM + r")\s*" + _INCH_UNIT + r"?)?"
+    r"|(?P<bare_in>" + _NUM + r")\s*" + _INCH_UNIT + r"?"
+    r"|(?P<inches>" + _INCH_UNIT + r")"
+    r")"
+)
+_height_re = None  # compiled on first use; see _height_regex()
+
+
+def _height_regex():
+    global _height_re
+    if _height_re is None:
+        import re
+        _height_re = re.compile(_HEIGHT_PATTERN)
+    return _height_re
+
+
+def parse_height_str(text: str) -> float:
+    """Parse a height like '170', '170 cm', '1.75 m', '5 ft 9 in', '5'9"' or '5ft9' and return centimetres."""
+    raw = text.strip().lower()
+    if not raw:
+        raise HeightParseError("Please enter your height.", 'empty', text)
+    if raw.isdecimal():
+        # fast path for the most common input: whole centimetres
+        cm = float(raw)
+        if 3 < cm < _INF:
+            return cm
+    m = (_height_re or _height_regex()).fullmatch(raw.replace(',', '.'))
+    if m is None:
+        raise HeightParseError("Couldn't parse height. Examples: '170 cm', '5 ft 9 in', '1.75 m'.", 'invalid', text)
+    num, metric, ft, ft_in, bare_in, inches = m.groups()
+    val = float(num)
+    if metric:
+        cm = val * 100 if metric[0] == 'm' else val
+    elif ft:
+        cm = val * 30.48 + float(ft_in) * 2.54 if ft_in else val * 30.48
+    elif bare_in:
+        # two bare numbers are read as feet and inches ('5 9')
+        cm = val * 30.48 + float(bare_in) * 2.54
+    elif inches:
+        cm = val * 2.54
+    else:
+        # bare number: centimetres, or metres when it is small (e.g. '1.75')
+        cm = val * 100 if val <= 3 else val
+    cm = round(cm, 1)
+    if cm <= 0:
+        raise HeightParseError("Height must be positive.", 'not_positive', text)
+    if not cm < _INF:
+        raise HeightParseError("Height is out of range.", 'invalid', text)
+    return cm
+
+
 def parse_weight(prompt: str) -> float:
     """Ask for weight and return kilograms. Accepts values like '70', '70 kg', '154 lb'."""
     while True:
-        raw = input(prompt + " (e.g. 70 kg or 154 lb): ").strip().lower()
-        if not raw:
-            print("Please enter your weight.")
-            continue
         try:
-            # allow formats: '70', '70kg', '70 kg', '154 lb'
-            raw = raw.replace('kgs','kg').replace('lbs','lb')
-            parts = raw.replace(',', '.').split()
-            if len(parts) == 1:
-                # maybe '70kg' or just '70'
-                token = parts[0]
-                # separate digits and letters
-                num = ''
-                unit = ''
-                for ch in token:
-                    if (ch.isdigit() or ch == '.'):
-                        num += ch
-                    else:
-                        unit += ch
-                val = float(num)
-                unit = unit or 'kg'
-            else:
-                val = float(parts[0])
-                unit = parts[1]
-            if unit.startswith('k'):
-                kg = val
-            elif unit.startswith('l'):
-                kg = val * 0.45359237
-            else:
-                print("Unknown unit; use 'kg' or 'lb'.")
-                continue
-            if kg <= 0:
-                print("Weight must be positive.")
-                continue
-            return round(kg, 2)
-        except Exception:
-            print("Couldn't parse weight. Examples: '70', '70 kg', '154 lb'.")
+            return parse_weight_str(input(prompt + " (e.g. 70 kg or 154 lb): "))
+        except ParseError as e:
+            print(e)
 
 
 def parse_height(prompt: str) -> float:
     """Ask for height and return centimetres. Accepts '170', '170 cm', '5 ft 9 in', '5'9"', '5ft9'."""
     while True:
-        raw = input(prompt + " (e.g. 170 cm or 5 ft 9 in): ").strip().lower()
-        if not raw:
-            print("Please enter your height.")
-            continue
         try:
-            raw = raw.replace('"', ' in').replace("'", ' ft ').replace('feet', 'ft').replace('meter', 'm')
-            raw = raw.replace('cms', 'cm')
-            parts = raw.replace(',', '.').split()
-            # simple numeric cm: '170' or '170 cm'
-            if len(parts) == 1 or (len(parts) == 2 and parts[1].startswith('c')):
-                num = float(parts[0])
-                if len(parts) == 1 and num < 3:  # maybe meters like 1.7
-                    cm = num * 100
-                elif len(parts) == 1 and num <= 3:  # e.g. '1.75' meters
-                    cm = num * 100
-                else:
-                    cm = num
-                return round(cm, 1)
-
-            # ft/in formats: look for 'ft' and 'in'
-            ft = None
-            inch = 0.0
-            if 'ft' in raw or 'foot' in raw:
-                # extract numbers
-                tokens = raw.replace('ft', ' ft ').replace('in', ' in ').split()
-                for i, t in enumerate(tokens):
-                    if t == 'ft' and i > 0:
-                        ft = float(tokens[i-1])
-                    if t == 'in' and i > 0:
-                        inch = float(tokens[i-1])
-            else:
-                # try patterns like '5 9' or '5'9' converted earlier
-                nums = [p for p in parts if all(c.isdigit() or c == '.' for c in p)]
-                if len(nums) >= 2:
-                    ft = float(nums[0])
-                    inch = float(nums[1])
-            if ft is not None:
-                cm = ft * 30.48 + inch * 2.54
-                return round(cm, 1)
-
-            print("Couldn't parse height. Use '170 cm' or '5 ft 9 in' or '1.75 m'.")
-        except Exception:
-            print("Couldn't parse height. Examples: '170 cm', '5 ft 9 in', '1.75 m'.")
+            return parse_height_str(input(prompt + " (e.g. 170 cm or 5 ft 9 in): "))
+        except ParseError as e:
+            print(e)
 
 
 def calculate_bmi(weight_kg: float, height_cm: float) -> float:
@@ -133,42 +192,240 @@ def calculate_bmi(weight_kg: float, height_cm: float) -> float:
     return round(bmi, 1)
 
 
-def bmi_category(bmi: float) -> str:
-    if bmi < 18.5:
-        return "Underweight"
-    elif 18.5 <= bmi < 25:
-        return "Normal (healthy weight)"
-    elif 25 <= bmi < 30:
-        return "Overweight"
-    else:
-        return "Obesity"
+# Category schemes: ascending cut-offs and one label per band (len(labels) == len(thresholds) + 1).
+# A BMI equal to a cut-off belongs to the band above it. Category codes are band indexes.
+BMI_SCHEMES = {
+    "who": ((18.5, 25.0, 30.0),
+            ("Underweight", "Normal (healthy weight)", "Overweight", "Obesity")),
+    "who_obesity_classes": ((18.5, 25.0, 30.0, 35.0, 40.0),
+                            ("Underweight", "Normal (healthy weight)", "Overweight",
+                             "Obesity class I", "Obesity class II", "Obesity class III")),
+    "asian": ((18.5, 23.0, 27.5),
+              ("Underweight", "Normal (healthy weight)", "Overweight", "Obesity")),
+}
+
+# The default (WHO) scheme, kept under the names the batch API has always used.
+BMI_THRESHOLDS, BMI_CATEGORIES = BMI_SCHEMES["who"]
+
+
+def register_bmi_scheme(name: str, thresholds, labels):
+    """Add or replace a named category scheme."""
+    thresholds = tuple(float(t) for t in thresholds)
+    labels = tuple(labels)
+    if list(thresholds) != sorted(thresholds):
+        raise ValueError("BMI thresholds must be in ascending order.")
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError("Need exactly one more label than thresholds.")
+    BMI_SCHEMES[name] = (thresholds, labels)
+
+
+def _scheme(name: str):
+    try:
+        return BMI_SCHEMES[name]
+    except KeyError:
+        raise ValueError(f"Unknown BMI scheme {name!r}; choose from {', '.join(BMI_SCHEMES)}.") from None
+
+
+def bmi_category_code(bmi: float, scheme: str = "who") -> int:
+    return bisect_right(_scheme(scheme)[0], bmi)
+
+
+def bmi_category(bmi: float, scheme: str = "who") -> str:
+    thresholds, labels = _scheme(scheme)
+    return labels[bisect_right(thresholds, bmi)]
+
+
+def bmi_category_codes(bmis, scheme: str = "who"):
+    """Vectorized bmi_category_code: int8 codes for an array of BMI values (needs NumPy)."""
+    import numpy as np
+
+    thresholds = np.asarray(_scheme(scheme)[0])
+    return np.searchsorted(thresholds, np.asarray(bmis, dtype=np.float64), side='right').astype(np.int8)
+
+
+def calculate_bmi_batch(weights_kg, heights_cm, scheme: str = "who"):
+    """Vectorized calculate_bmi + bmi_category over many records.
+
+    Accepts NumPy arrays or anything supporting the buffer protocol (array.array,
+    memoryview, lists). Returns (bmi, codes): a float64 array rounded exactly like
+    calculate_bmi and an int8 array of category codes for `scheme` (index into its
+    labels; BMI_CATEGORIES for the default). NumPy is only needed when this function is used.
+    """
+    import numpy as np
+
+    w = np.asarray(weights_kg, dtype=np.float64)
+    h = np.asarray(heights_cm, dtype=np.float64) / 100.0
+    raw = w / (h * h)
+
+    # np.round scales by 10 and can disagree with Python's round() when the value sits
+    # on a .x5 boundary; recompute only those few entries with the scalar rounding.
+    bmi = np.round(raw, 1)
+    scaled = raw * 10.0
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        idx = np.flatnonzero(ties)
+        bmi[idx] = [round(float(x), 1) for x in raw[idx]]
+
+    return bmi, bmi_category_codes(bmi, scheme)
+
+
+# Integer codes used by the array-based APIs (batch TDEE, binary snapshots, cohort simulation).
+SEX_CODES = {"male": 0, "female": 1, "other": 2}
+
+
+def sex_code(sex: str) -> int:
+    """SEX_CODES value of free-text sex: starting with 'm' is male, with 'f' female, anything else other."""
+    s = sex.lower()
+    return 0 if s.startswith('m') else 1 if s.startswith('f') else 2
 
 
 def bmr_mifflin_sex(weight: float, height_cm: float, age: int, sex: str) -> float:
+    if _bmr_cache is not None:
+        return _bmr_cache(weight, height_cm, age, sex)
+    return _bmr_mifflin_sex(weight, height_cm, age, sex)
+
+
+def _bmr_mifflin_sex(weight: float, height_cm: float, age: int, sex: str) -> float:
     # sex: 'male' or 'female' (case-insensitive); 'other' will use average of male/female
-    s = sex.lower()
-    if s.startswith('m'):
-        bmr = 10 * weight + 6.25 * height_cm - 5 * age + 5
-    elif s.startswith('f'):
-        bmr = 10 * weight + 6.25 * height_cm - 5 * age - 161
-    else:
-        # average of male and female formulas
-        bmr_m = 10 * weight + 6.25 * height_cm - 5 * age + 5
-        bmr_f = 10 * weight + 6.25 * height_cm - 5 * age - 161
-        bmr = (bmr_m + bmr_f) / 2
-    return bmr
+    code = sex_code(sex)
+    bmr = 10 * weight + 6.25 * height_cm - 5 * age
+    if code == 0:
+        return bmr + 5
+    if code == 1:
+        return bmr - 161
+    # average of male and female formulas
+    return ((bmr + 5) + (bmr - 161)) / 2
 
 
 def estimate_tdee(weight: float, height_cm: float, age: int, sex: str, activity_key: str) -> float:
+    if _tdee_cache is not None:
+        return _tdee_cache(weight, height_cm, age, sex, activity_key)
+    return _estimate_tdee(weight, height_cm, age, sex, activity_key)
+
+
+def _estimate_tdee(weight: float, height_cm: float, age: int, sex: str, activity_key: str) -> float:
     bmr = bmr_mifflin_sex(weight, height_cm, age, sex)
     multiplier = ACTIVITY_LEVELS.get(activity_key, (None, 1.2))[1]
     tdee = bmr * multiplier
     return round(tdee)
 
 
+# BMR constant per sex code: the array-based APIs compute 10*w + 6.25*h - 5*age + BMR_SEX_INTERCEPTS[code]
+BMR_SEX_INTERCEPTS = tuple(_bmr_mifflin_sex(0, 0, 0, s) for s in SEX_CODES)
+
+
+def activity_multipliers(overrides: dict = None) -> tuple:
+    """TDEE multipliers indexed by activity code 0-5; code 0 (unknown) gets the sedentary 1.2 like estimate_tdee.
+
+    `overrides` maps activity keys ("1"-"5") to replacement multipliers for what-if runs."""
+    levels = {k: v[1] for k, v in ACTIVITY_LEVELS.items()}
+    if overrides:
+        levels.update({str(k): float(v) for k, v in overrides.items()})
+    return (1.2,) + tuple(levels.get(str(k), 1.2) for k in range(1, 6))
+
+
+def estimate_tdee_batch(weights, heights_cm, ages, sex_codes, activity_codes, multipliers: dict = None):
+    """Vectorized estimate_tdee over arrays (needs NumPy); returns float64 TDEE rounded like the scalar version.
+
+    sex_codes follow SEX_CODES and activity_codes are ints 1-5 (anything else counts as sedentary)."""
+    import numpy as np
+
+    w = np.asarray(weights, dtype=np.float64)
+    act = np.asarray(activity_codes, dtype=np.intp)
+    m = np.asarray(activity_multipliers(multipliers))[np.where((act >= 1) & (act <= 5), act, 0)]
+    bmr = 10 * w + 6.25 * np.asarray(heights_cm, dtype=np.float64) - 5 * np.asarray(ages, dtype=np.float64) \
+        + np.array(BMR_SEX_INTERCEPTS)[np.asarray(sex_codes, dtype=np.intp)]
+    return np.round(bmr * m)
+
+
+# Compact result types. __slots__ keeps instances small (no per-instance __dict__),
+# which matters when batch jobs hold many of them; to_dict() gives the dict shape the
+# rest of the bot has always used.
+
+class Record:
+    """Base for the slotted record types (also bmi_history's): subclasses name their fields in __slots__."""
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class PersonRecord(Record):
+    """Inputs for one person's plan (weights in kg, height in cm)."""
+    __slots__ = ("weight_kg", "height_cm", "age", "sex", "activity_key", "target_weight_kg", "days")
+
+    def __init__(self, weight_kg: float, height_cm: float, age: int, sex: str = "other", activity_key: str = "1",
+                 target_weight_kg: float = None, days: int = None):
+        self.weight_kg = weight_kg
+        self.height_cm = height_cm
+        self.age = age
+        self.sex = sex
+        self.activity_key = activity_key
+        self.target_weight_kg = target_weight_kg
+        self.days = days
+
+
+class PlanResult(Record):
+    """Result of plan_weight_loss. `message` is set (and the numbers are None) when no deficit is needed."""
+    __slots__ = ("kg_to_lose", "total_kcal_needed", "daily_deficit", "suggested_daily_calories",
+                 "warnings", "weekly_loss_kg", "estimated_weeks_needed", "message")
+
+    def __init__(self, kg_to_lose=None, total_kcal_needed=None, daily_deficit=None, suggested_daily_calories=None,
+                 warnings=(), weekly_loss_kg=None, estimated_weeks_needed=None, message=None):
+        self.kg_to_lose = kg_to_lose
+        self.total_kcal_needed = total_kcal_needed
+        self.daily_deficit = daily_deficit
+        self.suggested_daily_calories = suggested_daily_calories
+        self.warnings = tuple(warnings)
+        self.weekly_loss_kg = weekly_loss_kg
+        self.estimated_weeks_needed = estimated_weeks_needed
+        self.message = message
+
+    def to_dict(self) -> dict:
+        if self.message is not None:
+            return {"message": self.message}
+        d = {k: getattr(self, k) for k in self.__slots__[:-1]}
+        d["warnings"] = list(self.warnings)
+        return d
+
+
+class MacroResult(Record):
+    __slots__ = ("protein_g", "fat_g", "carb_g", "protein_kcal", "fat_kcal", "carb_kcal")
+
+    def __init__(self, protein_g: int, fat_g: int, carb_g: int, protein_kcal: int, fat_kcal: int, carb_kcal: int):
+        self.protein_g = protein_g
+        self.fat_g = fat_g
+        self.carb_g = carb_g
+        self.protein_kcal = protein_kcal
+        self.fat_kcal = fat_kcal
+        self.carb_kcal = carb_kcal
+
+
 # New: recommend macronutrients based on activity and goal
 
 def recommend_macros(suggested_calories: int, weight_kg: float, activity_key: str) -> dict:
+    return compute_macros(suggested_calories, weight_kg, activity_key).to_dict()
+
+
+def compute_macros(suggested_calories: int, weight_kg: float, activity_key: str) -> MacroResult:
+    """recommend_macros without building a dict. Each call returns its own MacroResult, cached or not."""
+    if _macros_cache is not None:
+        # copy the shared cached record, so a caller changing its result cannot change later ones
+        m = _macros_cache(suggested_calories, weight_kg, activity_key)
+        return MacroResult(m.protein_g, m.fat_g, m.carb_g, m.protein_kcal, m.fat_kcal, m.carb_kcal)
+    return _compute_macros(suggested_calories, weight_kg, activity_key)
+
+
+def _compute_macros(suggested_calories: int, weight_kg: float, activity_key: str) -> MacroResult:
     # protein: 1.6 g/kg for sedentary up to 2.2 g/kg for very active
     activity_to_protein = {
         "1": 1.6,
@@ -190,197 +447,391 @@ def recommend_macros(suggested_calories: int, weight_kg: float, activity_key: st
     remaining_kcal = suggested_calories - (protein_kcal + fat_kcal)
     carb_g = max(round(remaining_kcal / 4), 0)
 
-    return {
-        'protein_g': protein_g,
-        'fat_g': fat_g,
-        'carb_g': carb_g,
-        'protein_kcal': int(protein_kcal),
-        'fat_kcal': int(fat_kcal),
-        'carb_kcal': int(remaining_kcal if remaining_kcal>0 else 0),
-    }
+    return MacroResult(protein_g, fat_g, carb_g, int(protein_kcal), int(fat_kcal),
+                       int(remaining_kcal if remaining_kcal>0 else 0))
+
+
+# Optional memoization for repetitive workloads (batch jobs, the HTTP service).
+# Off by default; the caches are None until enable_cache() is called.
+_bmr_cache = None
+_tdee_cache = None
+_macros_cache = None
+
+
+def enable_cache(maxsize: int = 4096):
+    """Put bounded LRU caches in front of bmr_mifflin_sex, estimate_tdee and recommend_macros.
+
+    Calling it again replaces the caches (and empties them)."""
+    global _bmr_cache, _tdee_cache, _macros_cache
+    from functools import lru_cache
+
+    _bmr_cache = lru_cache(maxsize)(_bmr_mifflin_sex)
+    _tdee_cache = lru_cache(maxsize)(_estimate_tdee)
+    _macros_cache = lru_cache(maxsize)(_compute_macros)
+
+
+def disable_cache():
+    global _bmr_cache, _tdee_cache, _macros_cache
+    _bmr_cache = _tdee_cache = _macros_cache = None
+
+
+def clear_cache():
+    """Empty the caches (and reset their hit/miss counters) without turning them off."""
+    for cache in (_bmr_cache, _tdee_cache, _macros_cache):
+        if cache is not None:
+            cache.cache_clear()
+
+
+def cache_info() -> dict:
+    """Hit/miss counters per cached function ({} when caching is off)."""
+    caches = {"bmr_mifflin_sex": _bmr_cache, "estimate_tdee": _tdee_cache, "recommend_macros": _macros_cache}
+    return {name: cache.cache_info() for name, cache in caches.items() if cache is not None}
+
 
+# Planning constants (also used by the trajectory simulator in bmi_simulate.py)
+KCAL_PER_KG = 7700          # 1 kg fat ~= 7700 kcal
+MAX_SAFE_DEFICIT = 1000     # kcal/day
+MIN_DAILY_CALORIES = 1200   # kcal/day
+DAY = 86400.0               # seconds; stored timestamps are time.time() values
 
-def recommend_calories_for_weight_loss(current_weight: float, target_weight: float, tdee: float, days: int, sex: str) -> dict:
-    # 1 kg fat ~= 7700 kcal
+
+def recommend_calories_for_weight_loss(current_weight: float, target_weight: float, tdee: float, days: int, sex: str,
+                                       max_safe_deficit: float = MAX_SAFE_DEFICIT, min_cal: float = MIN_DAILY_CALORIES,
+                                       kcal_per_kg: float = KCAL_PER_KG) -> dict:
+    return plan_weight_loss(current_weight, target_weight, tdee, days, sex,
+                            max_safe_deficit, min_cal, kcal_per_kg).to_dict()
+
+
+def plan_weight_loss(current_weight: float, target_weight: float, tdee: float, days: int, sex: str,
+                     max_safe_deficit: float = MAX_SAFE_DEFICIT, min_cal: float = MIN_DAILY_CALORIES,
+                     kcal_per_kg: float = KCAL_PER_KG) -> PlanResult:
+    """recommend_calories_for_weight_loss returning a PlanResult instead of a dict.
+
+    max_safe_deficit (kcal/day), min_cal (kcal/day) and kcal_per_kg default to the module
+    constants; bmi_sweep evaluates grids of them over whole populations."""
     kg_to_lose = current_weight - target_weight
     if kg_to_lose <= 0:
-        return {"message": "Target weight is not less than current weight. No calorie deficit needed."}
+        return PlanResult(message="Target weight is not less than current weight. No calorie deficit needed.")
 
-    total_kcal_needed = kg_to_lose * 7700
+    total_kcal_needed = kg_to_lose * kcal_per_kg
     daily_deficit = total_kcal_needed / max(days, 1)
 
     # Safety caps
-    max_safe_deficit = 1000  # kcal/day
-    weekly_loss_kg = (daily_deficit * 7) / 7700
+    weekly_loss_kg = (daily_deficit * 7) / kcal_per_kg
     if daily_deficit > max_safe_deficit:
         # if unrealistic, recommend using the max safe deficit and compute new timeframe
-        warning = "Required deficit exceeds common safety recommendations; using max safe deficit of 1000 kcal/day. Consider a longer timeframe or consult a professional."
+        warning = f"Required deficit exceeds common safety recommendations; using max safe deficit of {max_safe_deficit:g} kcal/day. Consider a longer timeframe or consult a professional."
         daily_deficit = max_safe_deficit
         suggested_daily = tdee - daily_deficit
-        est_weeks_needed = (kg_to_lose * 7700) / (daily_deficit * 7)
+        est_weeks_needed = (kg_to_lose * kcal_per_kg) / (daily_deficit * 7)
     else:
         warning = None
         suggested_daily = tdee - daily_deficit
         est_weeks_needed = days / 7
 
     # Minimum recommended daily calories (very general); always consult a pro
-    min_cal = 1200
     if suggested_daily < min_cal:
         suggested_daily = min_cal
-        warning_min = f"Calculated intake would fall below minimum recommended calories ({min_cal} kcal/day). Use caution and consult a professional."
+        warning_min = f"Calculated intake would fall below minimum recommended calories ({min_cal:g} kcal/day). Use caution and consult a professional."
     else:
         warning_min = None
 
-    return {
-        "kg_to_lose": round(kg_to_lose, 2),
-        "total_kcal_needed": int(total_kcal_needed),
-        "daily_deficit": int(daily_deficit),
-        "suggested_daily_calories": int(suggested_daily),
-        "warnings": [w for w in (warning, warning_min) if w],
-        "weekly_loss_kg": round(weekly_loss_kg, 3),
-        "estimated_weeks_needed": round(est_weeks_needed, 1),
-    }
+    return PlanResult(
+        kg_to_lose=round(kg_to_lose, 2),
+        total_kcal_needed=int(total_kcal_needed),
+        daily_deficit=int(daily_deficit),
+        suggested_daily_calories=int(suggested_daily),
+        warnings=[w for w in (warning, warning_min) if w],
+        weekly_loss_kg=round(weekly_loss_kg, 3),
+        estimated_weeks_needed=round(est_weeks_needed, 1),
+    )
+
+
+HEALTH_TIPS = (
+    "Aim for 0.5–1 kg (1–2 lb) weight loss per week — it's safer and more sustainable.",
+    "Prioritize protein and vegetables to stay full on fewer calories.",
+    "Do a mix of resistance training and cardio — muscle helps raise metabolic rate.",
+    "Get 7–9 hours of sleep per night; poor sleep increases hunger hormones.",
+    "Stay hydrated and limit sugary drinks.",
+    "Avoid extreme calorie restriction; consult a dietitian for personalized plans.",
+)
+
+MENU_LINES = (
+    "\nBMI Checker Bot",
+    "Options:\n 1) Check BMI\n 2) Create weight-loss calorie plan\n 3) Health tips\n 4) Exit",
+)
+
+DISCLAIMER_LINES = (
+    "\nIMPORTANT — Read before using the calorie planner:",
+    "This tool provides general educational information only. It is NOT a medical diagnosis or a replacement for professional medical, nutritional, or psychiatric advice.",
+    "People who are pregnant or breastfeeding, under 18 years old, have a history of an eating disorder, or have serious medical conditions (heart disease, diabetes, etc.) should consult a healthcare professional before changing diet or exercise.",
+    "If you do not wish to accept these limits, you may still use the BMI calculator and general tips, but personalized calorie plans will be disabled.",
+)
+CONSENT_PROMPT = "\nType 'I AGREE' to acknowledge and continue, or press Enter to continue without personalized plans: "
+
+# extra context shown after a BMI check
+BMI_ADVICE = {
+    "Underweight": "Advice: If underweight, focus on nutritious calorie-dense foods and consider a medical check-up.",
+    "Normal (healthy weight)": "Advice: Maintain balanced nutrition and regular activity to keep your healthy weight.",
+    "Overweight": "Advice: A modest calorie deficit and increased activity can help. Aim for 0.5–1 kg per week.",
+    "Obesity": "Advice: For BMI in the obesity range, consult a healthcare professional for a personalized plan.",
+}
+
+
+def health_tips_lines() -> list:
+    return ["\nGeneral health tips:"] + [f"- {t}" for t in HEALTH_TIPS] + [""]
 
 
 def print_health_tips():
-    tips = [
-        "Aim for 0.5–1 kg (1–2 lb) weight loss per week — it's safer and more sustainable.",
-        "Prioritize protein and vegetables to stay full on fewer calories.",
-        "Do a mix of resistance training and cardio — muscle helps raise metabolic rate.",
-        "Get 7–9 hours of sleep per night; poor sleep increases hunger hormones.",
-        "Stay hydrated and limit sugary drinks.",
-        "Avoid extreme calorie restriction; consult a dietitian for personalized plans.",
-    ]
-    print("\nGeneral health tips:")
-    for t in tips:
-        print("-", t)
-    print()
+    for line in health_tips_lines():
+        print(line)
 
 
 def menu():
-    print("\nBMI Checker Bot")
-    print("Options:\n 1) Check BMI\n 2) Create weight-loss calorie plan\n 3) Health tips\n 4) Exit")
+    for line in MENU_LINES:
+        print(line)
+
+
+# The conversation itself lives in bmi_dialog.ChatSession (a state machine that also
+# backs the chat server); the functions below run pieces of it on the terminal.
+
+_local_history = None
+HISTORY_DB = None  # set by --history-db: keep terminal BMI checks in this SQLite file across runs
+
+
+def local_history():
+    """BMI checks made on this terminal: for this run only, or in HISTORY_DB when set."""
+    global _local_history
+    if _local_history is None:
+        if HISTORY_DB:
+            import getpass
+            from bmi_history import SQLiteHistoryStore
+
+            # batch_size=1: commit each check, the terminal bot never closes the store explicitly
+            _local_history = SQLiteHistoryStore(HISTORY_DB, batch_size=1).user(getpass.getuser())
+        else:
+            from bmi_history import UserHistory
+
+            _local_history = UserHistory()
+    return _local_history
 
 
 def action_check_bmi():
-    print("\n-- BMI Calculator --")
-    weight = parse_weight("Enter weight")
-    height = parse_height("Enter height")
-    bmi = calculate_bmi(weight, height)
-    category = bmi_category(bmi)
-    print(f"\nYour BMI is {bmi} — {category}")
-
-    # extra context
-    if category == 'Underweight':
-        print("Advice: If underweight, focus on nutritious calorie-dense foods and consider a medical check-up.")
-    elif category == 'Normal (healthy weight)':
-        print("Advice: Maintain balanced nutrition and regular activity to keep your healthy weight.")
-    elif category == 'Overweight':
-        print("Advice: A modest calorie deficit and increased activity can help. Aim for 0.5–1 kg per week.")
-    else:
-        print("Advice: For BMI in the obesity range, consult a healthcare professional for a personalized plan.")
+    from bmi_dialog import ChatSession, run_terminal
+
+    session = ChatSession.for_bmi_check()
+    session.history = local_history  # created on the first check
+    run_terminal(session)
 
 
 def show_disclaimer_and_get_consent() -> bool:
     """Present a clear medical disclaimer and require explicit acknowledgement to run personalized plans.
 
     Returns True if the user types 'I AGREE' (case-insensitive)."""
-    print("\nIMPORTANT — Read before using the calorie planner:")
-    print("This tool provides general educational information only. It is NOT a medical diagnosis or a replacement for professional medical, nutritional, or psychiatric advice.")
-    print("People who are pregnant or breastfeeding, under 18 years old, have a history of an eating disorder, or have serious medical conditions (heart disease, diabetes, etc.) should consult a healthcare professional before changing diet or exercise.")
-    print("If you do not wish to accept these limits, you may still use the BMI calculator and general tips, but personalized calorie plans will be disabled.")
-    resp = input("\nType 'I AGREE' to acknowledge and continue, or press Enter to continue without personalized plans: ").strip()
+    for line in DISCLAIMER_LINES:
+        print(line)
+    resp = input(CONSENT_PROMPT).strip()
     return resp.upper() == 'I AGREE'
 
 
 def action_plan(consent: bool = False):
-    # If the user did not consent to the medical disclaimer, block personalized plans
-    if not consent:
-        print("\nPersonalized calorie plans are disabled because you did not acknowledge the disclaimer.")
-        print("You can still use BMI calculation and general health tips. To enable plans, restart the program and type 'I AGREE' when prompted.")
+    from bmi_dialog import ChatSession, run_terminal
+
+    run_terminal(ChatSession.for_plan(consent))
+
+
+def run_interactive():
+    from bmi_dialog import ChatSession, run_terminal
+
+    session = ChatSession()
+    session.history = local_history  # created on the first check, so starting the bot stays cheap
+    run_terminal(session)
+
+
+STARTUP_BUDGET_MS = 20
+
+
+def selftest_startup(runs: int = 15) -> bool:
+    """Time cold starts in fresh interpreters and print a report.
+
+    Measures both `import bmi_bot` and the CLI entry shell wrappers run, `python bmi_bot.py`,
+    up to its first prompt (stdin is at EOF, so it stops there). Returns True when each adds
+    less than STARTUP_BUDGET_MS on top of a bare interpreter start."""
+    import os
+    import statistics
+    import subprocess
+    import time
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def median_ms(*args):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *args], cwd=here, stdin=subprocess.DEVNULL, capture_output=True)
+            times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times)
+
+    bare = median_ms("-c", "pass")
+    imported = median_ms("-c", "import bmi_bot")
+    cli = median_ms("bmi_bot.py")
+    # python -X importtime writes one line per module to stderr: "self | cumulative | name"
+    trace = subprocess.run([sys.executable, "-X", "importtime", "bmi_bot.py"], cwd=here, stdin=subprocess.DEVNULL,
+                           capture_output=True, text=True).stderr
+    rows = [line.split("|") for line in trace.splitlines()[1:] if line.startswith("import time:")]
+    own = sum(int(r[1]) for r in rows if r[2].strip().startswith("bmi_")) / 1000
+
+    import_overhead = imported - bare
+    cli_overhead = cli - bare
+    print(f"Interpreter start (python -c pass): {bare:7.1f} ms (median of {runs})")
+    print(f"python -c 'import bmi_bot':         {imported:7.1f} ms (+{import_overhead:.1f} ms)")
+    print(f"python bmi_bot.py to first prompt:  {cli:7.1f} ms (+{cli_overhead:.1f} ms, budget {STARTUP_BUDGET_MS} ms)")
+    print(f"bmi_* modules imported by the CLI:  {own:7.1f} ms (from -X importtime)")
+    if sys.dont_write_bytecode:
+        print("Note: bytecode caching is off (PYTHONDONTWRITEBYTECODE / -B), so bmi_* modules changed since their "
+              ".pyc was written are recompiled on every start.")
+    ok = import_overhead < STARTUP_BUDGET_MS and cli_overhead < STARTUP_BUDGET_MS
+    print("OK" if ok else "Over budget — check `python -X importtime bmi_bot.py` for eager imports.")
+    return ok
+
+
+def main(argv: list = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        # plain `python bmi_bot.py`: go straight to the chatbot without building the option parser
+        run_interactive()
         return
 
-    print("\n-- Weight-loss calorie planner --")
-    weight = parse_weight("Current weight")
-    target = parse_weight("Target weight")
-    age = int(safe_float_input("Age (years): "))
+    import argparse
 
-    # safety checks
-    if age < 18:
-        print("\nWarning: You are under 18. This tool is not suitable for children or adolescents. Please consult a pediatrician or registered dietitian.")
+    def positive_int(text: str) -> int:
+        # sizes and counts below 1 would silently process nothing (islice(it, 0) is empty)
+        try:
+            n = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+        if n < 1:
+            raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+        return n
+
+    parser = argparse.ArgumentParser(description="BMI Checker Bot. Runs the interactive chatbot unless a mode option is given.")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="process records from a CSV or JSON Lines file (default: stdin) instead of chatting")
+    parser.add_argument("--output", "-o", default="-", metavar="FILE", help="where to write batch results (default: stdout)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format for --batch (default: from file name, else csv)")
+    parser.add_argument("--row-group-size", type=positive_int, default=65536, metavar="N",
+                        help="rows per row group / record batch for .parquet/.arrow output (default: 65536)")
+    parser.add_argument("--keep-fields", default="", metavar="NAMES",
+                        help="comma-separated input fields (e.g. member_id) to copy into .parquet/.arrow output")
+    parser.add_argument("--workers", type=positive_int, default=1, metavar="N", help="worker processes for --batch (default: 1)")
+    parser.add_argument("--chunk-size", type=positive_int, default=2000, metavar="N", help="records per worker shard, or users per --replan batch (default: 2000)")
+    parser.add_argument("--cache-size", type=int, default=0, metavar="N",
+                        help="memoize TDEE/macro results in an LRU cache of N entries for --batch/--serve")
+    parser.add_argument("--to-snapshot", metavar="FILE",
+                        help="convert a CSV/JSON Lines file to a binary snapshot written to --output")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP JSON API instead of chatting")
+    parser.add_argument("--chat-server", action="store_true", help="host chatbot sessions over a line-based TCP/Unix socket")
+    parser.add_argument("--unix", metavar="PATH", help="Unix socket path for --chat-server instead of TCP")
+    parser.add_argument("--session-store", default="memory", metavar="SPEC",
+                        help="where --chat-server keeps resumable sessions: memory or sqlite:PATH (default: memory)")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve/--chat-server (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="port for --serve (default: 8080) or --chat-server (default: 8765)")
+    parser.add_argument("--max-concurrency", type=positive_int, default=256, metavar="N",
+                        help="requests computed at once by --serve (default: 256)")
+    parser.add_argument("--replan", metavar="FILE",
+                        help="refresh saved plans in a history database for users whose weight has drifted")
+    parser.add_argument("--drift-kg", type=float, default=1.0, metavar="KG",
+                        help="weight change that makes a saved plan stale for --replan (default: 1.0)")
+    parser.add_argument("--history-db", metavar="FILE",
+                        help="remember your BMI checks in this SQLite file so later runs can show your trend")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="time the hot-path functions and write Prometheus metrics to FILE on exit "
+                             "(also served at /metrics by --serve; worker processes are included)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile --batch with cProfile and tracemalloc; writes FILE (pstats) and FILE.alloc.txt")
+    parser.add_argument("--profile-top", type=positive_int, default=20, metavar="N",
+                        help="functions and allocation sites to list for --profile (default: 20)")
+    parser.add_argument("--selftest-startup", action="store_true", help="report how long it takes to start this program")
+    args = parser.parse_args(argv)
+    if args.selftest_startup:
+        sys.exit(0 if selftest_startup() else 1)
+    if args.metrics:
+        import atexit
+        import bmi_metrics
+
+        bmi_metrics.enable()
+        atexit.register(bmi_metrics.write_prometheus, args.metrics)
+    if args.cache_size > 0:
+        enable_cache(args.cache_size)
+    if args.history_db:
+        global HISTORY_DB
+        HISTORY_DB = args.history_db
+
+    if args.to_snapshot:
+        from bmi_snapshot import convert_csv
+
+        if args.output == "-":
+            parser.error("--to-snapshot needs --output FILE")
+        n, skipped = convert_csv(args.to_snapshot, args.output, args.format)
+        print(f"Wrote {n} members to {args.output} ({skipped} rows skipped).", file=sys.stderr)
         return
-    if age > 80:
-        print("\nNote: For older adults (80+), metabolic estimates may be less accurate. Consult your doctor for personalized guidance.")
 
-    sex = input("Sex (male/female/other): ").strip() or "other"
+    if args.profile and args.batch is None:
+        parser.error("--profile works with --batch")
+    if args.profile and args.workers > 1:
+        parser.error("--profile only sees this process; use --workers 1")
+
+    if args.batch is not None:
+        import time
+        from bmi_batch import WorkerStats, run_batch
+
+        stats = WorkerStats()
+
+        def batch():
+            return run_batch(args.batch, args.output, args.format, workers=args.workers,
+                             chunk_size=args.chunk_size, stats=stats, row_group_size=args.row_group_size,
+                             keep_fields=[f.strip() for f in args.keep_fields.split(",") if f.strip()])
 
-    # pregnancy/breastfeeding check — only ask where relevant
-    if sex.lower().startswith('f'):
-        preg = input("Are you pregnant or breastfeeding? (y/n): ").strip().lower()
-        if preg.startswith('y'):
-            print("\nBecause you are pregnant/breastfeeding, please consult an obstetrician or registered dietitian before making changes to calories or weight goals.")
-            return
+        start = time.perf_counter()
+        if args.profile:
+            from bmi_profile import profiled
 
-    med = input("Do you have any diagnosed medical condition that affects diet/exercise (e.g., diabetes, heart disease)? (y/n): ").strip().lower()
-    if med.startswith('y'):
-        print("\nBecause of your medical condition, personalized guidance from a clinician or registered dietitian is recommended. This tool cannot safely provide that level of personalization.")
+            n, errors = profiled(batch, args.profile, args.profile_top)
+        else:
+            n, errors = batch()
+        elapsed = time.perf_counter() - start
+        print(f"Processed {n} records ({errors} with errors) in {elapsed:.2f}s, "
+              f"{n / elapsed if elapsed > 0 else 0:,.0f} records/sec.", file=sys.stderr)
+        if args.workers > 1:
+            print(stats.report(), file=sys.stderr)
+        for name, info in cache_info().items():
+            print(f"cache {name}: {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize} entries",
+                  file=sys.stderr)
         return
 
-    height = parse_height("Height")
+    if args.replan:
+        from bmi_scheduler import main_replan
+
+        main_replan(args.replan, args.drift_kg, args.chunk_size, args.workers)
+        return
 
-    print("Select activity level:")
-    for k, v in ACTIVITY_LEVELS.items():
-        print(f" {k}) {v[0]}")
-    activity = input("Choose 1-5 (default 1): ").strip() or "1"
+    if args.serve:
+        from bmi_server import run_server
 
-    tdee = estimate_tdee(weight, height, age, sex, activity)
-    print(f"\nEstimated TDEE (calories/day to maintain current weight): {tdee} kcal")
+        run_server(args.host, args.port or 8080, args.max_concurrency)
+        return
 
-    weeks = safe_float_input("Over how many weeks do you want to reach the target? ")
-    days = int(max(1, round(weeks * 7)))
-    plan = recommend_calories_for_weight_loss(weight, target, tdee, days, sex)
+    if args.chat_server:
+        from bmi_chat import run_chat_server
 
-    if "message" in plan:
-        print(plan["message"])
+        run_chat_server(args.host, args.port or 8765, args.unix, args.session_store)
         return
 
-    print(f"\nTo lose {plan['kg_to_lose']} kg (approx) in {plan['estimated_weeks_needed']} weeks:")
-    print(f" - Total calories to lose: {plan['total_kcal_needed']} kcal")
-    print(f" - Daily calorie deficit needed: {plan['daily_deficit']} kcal/day")
-    print(f" - Suggested daily calorie intake: {plan['suggested_daily_calories']} kcal/day")
-    print(f" - Estimated weekly loss (if followed): {plan['weekly_loss_kg']} kg/week")
-
-    if plan['warnings']:
-        print("\nWarnings:")
-        for w in plan['warnings']:
-            print("-", w)
-
-    # macros
-    macros = recommend_macros(plan['suggested_daily_calories'], weight, activity)
-    print("\nSuggested daily macronutrients (approx):")
-    print(f" - Protein: {macros['protein_g']} g ({macros['protein_kcal']} kcal)")
-    print(f" - Fat: {macros['fat_g']} g ({macros['fat_kcal']} kcal)")
-    print(f" - Carbs: {macros['carb_g']} g ({macros['carb_kcal']} kcal)")
-    print()
-
-
-def main():
-    print("Welcome — this bot gives general guidance about BMI and calories. Not medical advice.")
-    consent = show_disclaimer_and_get_consent()
-    while True:
-        menu()
-        choice = input("Enter choice (1-4): ").strip()
-        if choice == "1":
-            action_check_bmi()
-        elif choice == "2":
-            action_plan(consent)
-        elif choice == "3":
-            print_health_tips()
-        elif choice == "4" or choice.lower() in ("exit", "quit"):
-            print("Goodbye — consult a healthcare professional for medical advice.")
-            break
-        else:
-            print("Invalid choice — try again.")
+    run_interactive()
+
 
 if __name__ == "__main__":
-    main()
+    # Go through the importable module so bmi_batch / bmi_server share its state (e.g. caches).
+    import bmi_bot
+    bmi_bot.main()
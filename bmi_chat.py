@@ -0,0 +1,144 @@
+"""
+Line-protocol chat server: many concurrent chatbot sessions in one process.
+Run with: python bmi_bot.py --chat-server --port 8765   (or --unix /tmp/bmi.sock)
+Try it with: nc localhost 8765
+
+Each connection gets its own bmi_dialog.ChatSession. The server sends the bot's
+output as UTF-8 lines; each prompt is sent as its own line, and every line the
+client sends is one answer. The connection closes when the session ends.
+
+The first line sent names the session id. After every answer the session is saved
+to the session store (bmi_sessions.py) as a ChatSession.to_bytes() snapshot, so a
+client that drops can reconnect and send "/resume <id>" to continue where it left
+off. With a shared store (--session-store sqlite:PATH) that works across processes.
+Sessions are small __slots__ objects and nothing blocks, so one process can hold
+thousands of open conversations.
+"""
+import asyncio
+import secrets
+from typing import Optional
+
+from bmi_dialog import PROMPTS, ChatSession
+from bmi_sessions import MemorySessionStore, SessionStore, open_store
+
+IDLE_TIMEOUT = 600.0
+MAX_LINE = 4096
+BACKLOG = 1024  # asyncio's default of 100 is too small for bursts of new chats
+RESUME = "/resume"
+FLUSH_EVERY = 1.0  # seconds between store flushes when the server is quiet
+PURGE_EVERY = 60.0
+
+
+class ChatServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None,
+                 idle_timeout: float = IDLE_TIMEOUT,
+                 store: Optional[SessionStore] = None):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.idle_timeout = idle_timeout
+        self.store = MemorySessionStore() if store is None else store
+        self.active = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._housekeeper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, self.unix_path, limit=MAX_LINE, backlog=BACKLOG)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_LINE, backlog=BACKLOG)
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._housekeeper = asyncio.ensure_future(self._housekeeping())
+
+    async def _housekeeping(self):
+        # buffered stores only flush on writes; make sure a quiet server still persists its last answers
+        since_purge = 0.0
+        while True:
+            await asyncio.sleep(FLUSH_EVERY)
+            self.store.flush()
+            since_purge += FLUSH_EVERY
+            if since_purge >= PURGE_EVERY:
+                self.store.purge_expired()
+                since_purge = 0.0
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._housekeeper is not None:
+            self._housekeeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.store.flush()
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, lines, prompt: Optional[str]):
+        text = "\n".join(lines)
+        if prompt is not None:
+            text = f"{text}\n{prompt}" if lines else prompt
+        writer.write((text + "\n").encode())
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.active += 1
+        session = ChatSession()
+        session_id = secrets.token_urlsafe(9)
+        try:
+            lines, prompt = session.start()
+            self._send(writer, [f"Session {session_id} (send '{RESUME} {session_id}' after reconnecting to continue)"] + lines, prompt)
+            await writer.drain()
+            while not session.done:
+                try:
+                    raw = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except (asyncio.TimeoutError, ValueError):
+                    # idle too long, or a line longer than MAX_LINE
+                    break
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace")
+                if line.startswith(RESUME):
+                    session_id, session, reply = self._resume(line[len(RESUME):].strip(), session_id, session)
+                else:
+                    reply = session.feed(line)
+                if session.done:
+                    self.store.delete(session_id)
+                else:
+                    self.store.put(session_id, session.to_bytes())
+                self._send(writer, *reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    def _resume(self, wanted: str, session_id: str, session: ChatSession):
+        blob = self.store.get(wanted) if wanted else None
+        if blob is None:
+            return session_id, session, (["Unknown or expired session."], PROMPTS[session.state])
+        restored = ChatSession.from_bytes(blob)
+        self.store.delete(session_id)
+        lines, prompt = restored.resume()
+        return wanted, restored, ([f"Resumed session {wanted}."] + lines, prompt)
+
+
+def run_chat_server(host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None,
+                    session_store: str = "memory"):
+    store = open_store(session_store)
+    server = ChatServer(host, port, unix_path, store=store)
+
+    async def _main():
+        await server.start()
+        where = server.unix_path or f"{server.host}:{server.port}"
+        print(f"Chat server listening on {where} (Ctrl+C to stop)")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
@@ -0,0 +1,372 @@
+"""
+The chatbot conversation as a resumable state machine.
+
+The terminal bot used to be straight-line code full of input() calls, so one process
+could only talk to one user. A ChatSession instead holds one user's position in the
+dialog plus the answers given so far; feed() takes one line of user input and returns
+what to show next. Nothing blocks, so the same session objects drive the terminal
+(run_terminal), the line-protocol chat server (bmi_chat.py), or anything else.
+"""
+from __future__ import annotations  # annotations stay unevaluated, so typing is never imported
+
+import struct
+
+import bmi_bot
+
+# feed()/start()/resume() return a reply: (lines to show, prompt for the next input);
+# the prompt is None once the session has ended
+
+WELCOME = "Welcome — this bot gives general guidance about BMI and calories. Not medical advice."
+GOODBYE = "Goodbye — consult a healthcare professional for medical advice."
+
+PROMPTS = {
+    "consent": bmi_bot.CONSENT_PROMPT,
+    "menu": "Enter choice (1-4): ",
+    "bmi_weight": "Enter weight (e.g. 70 kg or 154 lb): ",
+    "bmi_height": "Enter height (e.g. 170 cm or 5 ft 9 in): ",
+    "plan_weight": "Current weight (e.g. 70 kg or 154 lb): ",
+    "plan_target": "Target weight (e.g. 70 kg or 154 lb): ",
+    "plan_age": "Age (years): ",
+    "plan_sex": "Sex (male/female/other): ",
+    "plan_pregnant": "Are you pregnant or breastfeeding? (y/n): ",
+    "plan_medical": "Do you have any diagnosed medical condition that affects diet/exercise (e.g., diabetes, heart disease)? (y/n): ",
+    "plan_height": "Height (e.g. 170 cm or 5 ft 9 in): ",
+    "plan_activity": "Choose 1-5 (default 1): ",
+    "plan_weeks": "Over how many weeks do you want to reach the target? ",
+    "done": None,
+}
+
+POSITIVE_NUMBER = "Please enter a positive number (e.g. 70 or 70.5)."
+
+# Supported answers. The bounds are generous for people and keep every stored value exact
+# in the float32/uint16 snapshot below (a weight past 65536 kg would lose its 2nd decimal).
+MAX_WEIGHT_KG = 1000.0
+MIN_HEIGHT_CM, MAX_HEIGHT_CM = 30.0, 300.0
+MAX_AGE = 150
+WEIGHT_RANGE = f"Please enter a weight of at most {MAX_WEIGHT_KG:g} kg."
+HEIGHT_RANGE = f"Please enter a height between {MIN_HEIGHT_CM:g} and {MAX_HEIGHT_CM:g} cm."
+AGE_RANGE = f"Please enter an age of at most {MAX_AGE}."
+
+# Snapshot layout (see ChatSession.to_bytes): format version, state, flags, sex, activity,
+# age, then weight/target/height/last BMI as float32 (NaN = not answered yet). 23 bytes.
+STATES = tuple(PROMPTS)
+SNAPSHOT_VERSION = 1
+_SNAPSHOT = struct.Struct("<BBBBBH4f")
+_NO_AGE = 0xFFFF
+_SEXES = tuple(bmi_bot.SEX_CODES)  # indexed by bmi_bot.sex_code()
+_NAN = float("nan")
+_INF = float("inf")
+
+
+def _unfloat(x: float, ndigits: int) -> float | None:
+    # float32 storage: rounding back to the parser's precision restores the exact original value
+    return None if x != x else round(x, ndigits)
+
+
+def _positive_float(text: str) -> float | None:
+    try:
+        f = float(text)
+    except ValueError:
+        return None
+    # 'inf' parses too, and would overflow int()/round() later
+    return f if 0 < f < _INF else None
+
+
+def _weight(text: str, out: list[str]) -> float | None:
+    """Parsed weight in kg, or None after adding the reason to out."""
+    try:
+        kg = bmi_bot.parse_weight_str(text)
+    except bmi_bot.ParseError as e:
+        out.append(str(e))
+        return None
+    if kg > MAX_WEIGHT_KG:
+        out.append(WEIGHT_RANGE)
+        return None
+    return kg
+
+
+def _height(text: str, out: list[str]) -> float | None:
+    """Parsed height in cm, or None after adding the reason to out."""
+    try:
+        cm = bmi_bot.parse_height_str(text)
+    except bmi_bot.ParseError as e:
+        out.append(str(e))
+        return None
+    if not MIN_HEIGHT_CM <= cm <= MAX_HEIGHT_CM:
+        out.append(HEIGHT_RANGE)
+        return None
+    return cm
+
+
+class ChatSession:
+    """One user's conversation. Use start() once, then feed() each line the user types."""
+
+    __slots__ = ("state", "consent", "one_shot", "weight", "target", "age", "sex", "height", "activity", "last_bmi",
+                 "history")
+
+    def __init__(self, state: str = "consent", consent: bool = False, one_shot: bool = False):
+        self.state = state
+        self.consent = consent
+        # one_shot sessions run a single action (see for_bmi_check/for_plan) and end instead of showing the menu
+        self.one_shot = one_shot
+        self.weight = self.target = self.height = self.last_bmi = None
+        self.age = None
+        self.sex = self.activity = None
+        # optional bmi_history.UserHistory that BMI checks are recorded in, or a function returning
+        # one that is called on the first check (so sessions that never check don't create it);
+        # not part of to_bytes()
+        self.history = None
+
+    @classmethod
+    def for_bmi_check(cls) -> "ChatSession":
+        return cls("bmi_weight", one_shot=True)
+
+    @classmethod
+    def for_plan(cls, consent: bool) -> "ChatSession":
+        return cls("plan_weight", consent=consent, one_shot=True)
+
+    @property
+    def done(self) -> bool:
+        return self.state == "done"
+
+    def to_bytes(self) -> bytes:
+        """Serialize the session to a compact blob that from_bytes() can resume anywhere.
+
+        Sex and activity are stored as codes. That loses nothing: the planner only looks
+        at the first letter of sex, and unknown activity keys behave exactly like "1".
+        Numbers round-trip exactly for answers in the supported range (MAX_WEIGHT_KG etc.),
+        which the dialog enforces."""
+        flags = (1 if self.consent else 0) | (2 if self.one_shot else 0)
+        sex = 0 if self.sex is None else 1 + bmi_bot.sex_code(self.sex)
+        activity = 0 if self.activity is None else int(self.activity if self.activity in bmi_bot.ACTIVITY_LEVELS else "1")
+        return _SNAPSHOT.pack(
+            SNAPSHOT_VERSION, STATES.index(self.state), flags, sex, activity,
+            _NO_AGE if self.age is None else self.age,
+            *(_NAN if v is None else v for v in (self.weight, self.target, self.height, self.last_bmi)),
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "ChatSession":
+        try:
+            version, state, flags, sex, activity, age, weight, target, height, last_bmi = _SNAPSHOT.unpack(blob)
+        except struct.error:
+            raise ValueError("Not a chat session snapshot.") from None
+        if version != SNAPSHOT_VERSION or state >= len(STATES):
+            raise ValueError("Unsupported chat session snapshot.")
+        session = cls(STATES[state], consent=bool(flags & 1), one_shot=bool(flags & 2))
+        session.sex = None if sex == 0 else _SEXES[sex - 1]
+        session.activity = None if activity == 0 else str(activity)
+        session.age = None if age == _NO_AGE else age
+        session.weight = _unfloat(weight, 2)
+        session.target = _unfloat(target, 2)
+        session.height = _unfloat(height, 1)
+        session.last_bmi = _unfloat(last_bmi, 1)
+        return session
+
+    def resume(self) -> tuple[list[str], str | None]:
+        """Output for picking a restored session back up: the current question again."""
+        out = []
+        if self.state == "menu":
+            out.extend(bmi_bot.MENU_LINES)
+        elif self.state == "plan_activity":
+            out.append("Select activity level:")
+            out.extend(f" {k}) {v[0]}" for k, v in bmi_bot.ACTIVITY_LEVELS.items())
+        return out, PROMPTS[self.state]
+
+    def start(self) -> tuple[list[str], str | None]:
+        """Output for the beginning of the session (greeting, or the header of a one-shot action)."""
+        out = []
+        if self.state == "consent":
+            out.append(WELCOME)
+            out.extend(bmi_bot.DISCLAIMER_LINES)
+        elif self.state == "menu":
+            out.extend(bmi_bot.MENU_LINES)
+        elif self.state == "bmi_weight":
+            out.append("\n-- BMI Calculator --")
+        elif self.state == "plan_weight":
+            self._start_plan(out)
+        return out, PROMPTS[self.state]
+
+    def feed(self, line: str) -> tuple[list[str], str | None]:
+        """Handle one line of user input and return what to show next."""
+        out = []
+        if self.state != "done":
+            getattr(self, "_on_" + self.state)(line.strip(), out)
+        return out, PROMPTS[self.state]
+
+    # -- transitions -------------------------------------------------------------------
+
+    def _to_menu(self, out: list[str]):
+        if self.one_shot:
+            self.state = "done"
+        else:
+            out.extend(bmi_bot.MENU_LINES)
+            self.state = "menu"
+
+    def _start_plan(self, out: list[str]):
+        # If the user did not consent to the medical disclaimer, block personalized plans
+        if not self.consent:
+            out.append("\nPersonalized calorie plans are disabled because you did not acknowledge the disclaimer.")
+            out.append("You can still use BMI calculation and general health tips. To enable plans, restart the program and type 'I AGREE' when prompted.")
+            self._to_menu(out)
+            return
+        out.append("\n-- Weight-loss calorie planner --")
+        self.state = "plan_weight"
+
+    def _on_consent(self, text: str, out: list[str]):
+        self.consent = text.upper() == 'I AGREE'
+        self._to_menu(out)
+
+    def _on_menu(self, choice: str, out: list[str]):
+        if choice == "1":
+            out.append("\n-- BMI Calculator --")
+            self.state = "bmi_weight"
+        elif choice == "2":
+            self._start_plan(out)
+        elif choice == "3":
+            out.extend(bmi_bot.health_tips_lines())
+            self._to_menu(out)
+        elif choice == "4" or choice.lower() in ("exit", "quit"):
+            out.append(GOODBYE)
+            self.state = "done"
+        else:
+            out.append("Invalid choice — try again.")
+            self._to_menu(out)
+
+    def _on_bmi_weight(self, text: str, out: list[str]):
+        weight = _weight(text, out)
+        if weight is None:
+            return
+        self.weight = weight
+        self.state = "bmi_height"
+
+    def _on_bmi_height(self, text: str, out: list[str]):
+        height = _height(text, out)
+        if height is None:
+            return
+        self.height = height
+        bmi = bmi_bot.calculate_bmi(self.weight, self.height)
+        category = bmi_bot.bmi_category(bmi)
+        self.last_bmi = bmi
+        out.append(f"\nYour BMI is {bmi} — {category}")
+        out.append(bmi_bot.BMI_ADVICE[category])
+        if self.history is not None:
+            if callable(self.history):
+                self.history = self.history()
+            self.history.add(self.weight, self.height, bmi=bmi)
+            out.extend(self.history.summary_lines())
+        self._to_menu(out)
+
+    def _on_plan_weight(self, text: str, out: list[str]):
+        weight = _weight(text, out)
+        if weight is None:
+            return
+        self.weight = weight
+        self.state = "plan_target"
+
+    def _on_plan_target(self, text: str, out: list[str]):
+        target = _weight(text, out)
+        if target is None:
+            return
+        self.target = target
+        self.state = "plan_age"
+
+    def _on_plan_age(self, text: str, out: list[str]):
+        age = _positive_float(text)
+        if age is None:
+            out.append(POSITIVE_NUMBER)
+            return
+        if age > MAX_AGE:
+            out.append(AGE_RANGE)
+            return
+        self.age = int(age)
+        # safety checks
+        if self.age < 18:
+            out.append("\nWarning: You are under 18. This tool is not suitable for children or adolescents. Please consult a pediatrician or registered dietitian.")
+            self._to_menu(out)
+            return
+        if self.age > 80:
+            out.append("\nNote: For older adults (80+), metabolic estimates may be less accurate. Consult your doctor for personalized guidance.")
+        self.state = "plan_sex"
+
+    def _on_plan_sex(self, text: str, out: list[str]):
+        self.sex = text or "other"
+        # pregnancy/breastfeeding check — only ask where relevant
+        self.state = "plan_pregnant" if bmi_bot.sex_code(self.sex) == bmi_bot.SEX_CODES["female"] else "plan_medical"
+
+    def _on_plan_pregnant(self, text: str, out: list[str]):
+        if text.lower().startswith('y'):
+            out.append("\nBecause you are pregnant/breastfeeding, please consult an obstetrician or registered dietitian before making changes to calories or weight goals.")
+            self._to_menu(out)
+            return
+        self.state = "plan_medical"
+
+    def _on_plan_medical(self, text: str, out: list[str]):
+        if text.lower().startswith('y'):
+            out.append("\nBecause of your medical condition, personalized guidance from a clinician or registered dietitian is recommended. This tool cannot safely provide that level of personalization.")
+            self._to_menu(out)
+            return
+        self.state = "plan_height"
+
+    def _on_plan_height(self, text: str, out: list[str]):
+        height = _height(text, out)
+        if height is None:
+            return
+        self.height = height
+        out.append("Select activity level:")
+        for k, v in bmi_bot.ACTIVITY_LEVELS.items():
+            out.append(f" {k}) {v[0]}")
+        self.state = "plan_activity"
+
+    def _on_plan_activity(self, text: str, out: list[str]):
+        self.activity = text or "1"
+        tdee = bmi_bot.estimate_tdee(self.weight, self.height, self.age, self.sex, self.activity)
+        out.append(f"\nEstimated TDEE (calories/day to maintain current weight): {tdee} kcal")
+        self.state = "plan_weeks"
+
+    def _on_plan_weeks(self, text: str, out: list[str]):
+        weeks = _positive_float(text)
+        if weeks is None:
+            out.append(POSITIVE_NUMBER)
+            return
+        days = int(max(1, round(weeks * 7)))
+        tdee = bmi_bot.estimate_tdee(self.weight, self.height, self.age, self.sex, self.activity)
+        plan = bmi_bot.plan_weight_loss(self.weight, self.target, tdee, days, self.sex)
+        if plan.message is not None:
+            out.append(plan.message)
+        else:
+            macros = bmi_bot.compute_macros(plan.suggested_daily_calories, self.weight, self.activity)
+            out.extend(plan_report_lines(plan, macros))
+        self._to_menu(out)
+
+
+def plan_report_lines(plan: "bmi_bot.PlanResult", macros: "bmi_bot.MacroResult") -> list[str]:
+    out = [
+        f"\nTo lose {plan.kg_to_lose} kg (approx) in {plan.estimated_weeks_needed} weeks:",
+        f" - Total calories to lose: {plan.total_kcal_needed} kcal",
+        f" - Daily calorie deficit needed: {plan.daily_deficit} kcal/day",
+        f" - Suggested daily calorie intake: {plan.suggested_daily_calories} kcal/day",
+        f" - Estimated weekly loss (if followed): {plan.weekly_loss_kg} kg/week",
+    ]
+    if plan.warnings:
+        out.append("\nWarnings:")
+        out.extend(f"- {w}" for w in plan.warnings)
+    out += [
+        "\nSuggested daily macronutrients (approx):",
+        f" - Protein: {macros.protein_g} g ({macros.protein_kcal} kcal)",
+        f" - Fat: {macros.fat_g} g ({macros.fat_kcal} kcal)",
+        f" - Carbs: {macros.carb_g} g ({macros.carb_kcal} kcal)",
+        "",
+    ]
+    return out
+
+
+def run_terminal(session: ChatSession) -> ChatSession:
+    """Drive a session from stdin/stdout until it ends."""
+    lines, prompt = session.start()
+    while True:
+        for line in lines:
+            print(line)
+        if prompt is None:
+            return session
+        lines, prompt = session.feed(input(prompt))
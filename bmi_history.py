@@ -0,0 +1,440 @@
+"""
+Per-user measurement history: timestamped weight/height/BMI readings plus running
+statistics that are updated in O(1) per reading (nothing is recomputed from the
+full history).
+
+    history = HistoryStore()
+    stats = history.add("alice", 82.5, 178.0)       # timestamp defaults to now
+    stats.mean_weight_kg, stats.trend_weight_kg, stats.weekly_rate_kg
+
+SQLiteHistoryStore keeps the same data in a SQLite file, with indexed time-range
+queries and SQL-side downsampling (e.g. weekly averages) for long histories.
+
+Timestamps are seconds since the epoch (time.time()). The trend and weekly rate
+weight recent readings more heavily, so HistoryStats takes readings in time order.
+A reading older than the user's latest one (a late entry or a bulk import of past
+days) makes the stores rebuild that user's stats from all their stored readings,
+which costs O(readings) for that user once.
+"""
+import math
+import struct
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Dict, List, Optional
+
+import bmi_sqlite
+from bmi_bot import DAY, Record, calculate_bmi
+
+TREND_HALF_LIFE_DAYS = 7.0  # EWMA trend: a reading's weight halves after a week
+RATE_HALF_LIFE_DAYS = 14.0  # weekly rate: least-squares slope over roughly the last month
+MIN_RATE_SPAN_DAYS = 1.0  # below this the slope is noise, so weekly_rate_kg stays None
+
+# HistoryStats.to_bytes(): the count, then every float slot in order (NaN = None)
+_STATS = struct.Struct("<q14d")
+_NAN = float("nan")
+
+
+class Reading(Record):
+    """One check-in: when, weight (kg), height (cm) and the resulting BMI."""
+    __slots__ = ("ts", "weight_kg", "height_cm", "bmi")
+
+    def __init__(self, ts: float, weight_kg: float, height_cm: float, bmi: float):
+        self.ts = ts
+        self.weight_kg = weight_kg
+        self.height_cm = height_cm
+        self.bmi = bmi
+
+
+class HistoryStats:
+    """Running aggregates over a user's readings, updated by add() in constant time.
+
+    - mean/stdev of weight: Welford's algorithm
+    - trend_weight_kg: exponentially weighted moving average with a time-based half-life
+    - weekly_rate_kg: slope of an exponentially weighted least-squares line through
+      weight over time, in kg/week (negative = losing weight)
+    """
+    __slots__ = ("count", "first_ts", "last_ts", "mean_weight_kg", "_m2", "min_weight_kg", "max_weight_kg",
+                 "min_bmi", "max_bmi", "trend_weight_kg", "_rw", "_rt", "_ry", "_sxx", "_sxy")
+
+    def __init__(self):
+        self.count = 0
+        self.first_ts = self.last_ts = None
+        self.mean_weight_kg = self._m2 = 0.0
+        self.min_weight_kg = self.max_weight_kg = None
+        self.min_bmi = self.max_bmi = None
+        self.trend_weight_kg = None
+        # weighted running means and co-moments of (days since first reading, weight) for the rate
+        self._rw = self._rt = self._ry = self._sxx = self._sxy = 0.0
+
+    def add(self, ts: float, weight_kg: float, bmi: float):
+        """Fold in a reading no older than last_ts (for older ones, rebuild() from all readings)."""
+        self.count += 1
+        delta = weight_kg - self.mean_weight_kg
+        self.mean_weight_kg += delta / self.count
+        self._m2 += delta * (weight_kg - self.mean_weight_kg)
+        if self.count == 1:
+            self.first_ts = self.last_ts = ts
+            self.min_weight_kg = self.max_weight_kg = self.trend_weight_kg = weight_kg
+            self.min_bmi = self.max_bmi = bmi
+        else:
+            self.min_weight_kg = min(self.min_weight_kg, weight_kg)
+            self.max_weight_kg = max(self.max_weight_kg, weight_kg)
+            self.min_bmi = min(self.min_bmi, bmi)
+            self.max_bmi = max(self.max_bmi, bmi)
+            elapsed = max(ts - self.last_ts, 0.0) / DAY
+            alpha = 1.0 - 0.5 ** (elapsed / TREND_HALF_LIFE_DAYS)
+            self.trend_weight_kg += alpha * (weight_kg - self.trend_weight_kg)
+            # age the regression weights; uniform scaling leaves the means alone
+            decay = 0.5 ** (elapsed / RATE_HALF_LIFE_DAYS)
+            self._rw *= decay
+            self._sxx *= decay
+            self._sxy *= decay
+            self.last_ts = max(self.last_ts, ts)
+        # weighted Welford update of the (t, weight) co-moments, t in days since the first reading
+        t = (ts - self.first_ts) / DAY
+        self._rw += 1.0
+        dt = t - self._rt
+        self._rt += dt / self._rw
+        self._ry += (weight_kg - self._ry) / self._rw
+        self._sxx += dt * (t - self._rt)
+        self._sxy += dt * (weight_kg - self._ry)
+
+    def rebuild(self, readings):
+        """Start over from (ts, weight_kg, bmi) tuples in time order. Updates in place, so
+        references to these stats stay valid."""
+        self.__init__()
+        for ts, weight_kg, bmi in readings:
+            self.add(ts, weight_kg, bmi)
+
+    @property
+    def stdev_weight_kg(self) -> Optional[float]:
+        """Sample standard deviation; None until there are two readings."""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else None
+
+    @property
+    def span_days(self) -> float:
+        return 0.0 if self.count == 0 else (self.last_ts - self.first_ts) / DAY
+
+    @property
+    def weekly_rate_kg(self) -> Optional[float]:
+        if self.span_days < MIN_RATE_SPAN_DAYS or self._sxx <= 0.0:
+            return None
+        return 7.0 * self._sxy / self._sxx
+
+    def to_bytes(self) -> bytes:
+        """The full running state, so the stats can be persisted and continued later."""
+        return _STATS.pack(self.count, *(_NAN if v is None else v
+                                         for v in (getattr(self, k) for k in self.__slots__[1:])))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "HistoryStats":
+        values = _STATS.unpack(blob)
+        stats = cls()
+        stats.count = values[0]
+        for k, v in zip(cls.__slots__[1:], values[1:]):
+            setattr(stats, k, None if v != v else v)
+        return stats
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "mean_weight_kg": self.mean_weight_kg if self.count else None,
+            "stdev_weight_kg": self.stdev_weight_kg,
+            "min_weight_kg": self.min_weight_kg,
+            "max_weight_kg": self.max_weight_kg,
+            "min_bmi": self.min_bmi,
+            "max_bmi": self.max_bmi,
+            "trend_weight_kg": self.trend_weight_kg,
+            "weekly_rate_kg": self.weekly_rate_kg,
+        }
+
+
+def summary_lines(s: HistoryStats) -> List[str]:
+    """A few lines for the chatbot after a BMI check; empty until there is something to compare."""
+    if s.count < 2:
+        return []
+    lines = [f"Your history: {s.count} checks, weight {s.min_weight_kg:.1f}-{s.max_weight_kg:.1f} kg "
+             f"(average {s.mean_weight_kg:.1f} kg), BMI {s.min_bmi}-{s.max_bmi}."]
+    rate = s.weekly_rate_kg
+    if rate is not None:
+        direction = "losing" if rate < 0 else "gaining"
+        lines.append(f"Trend weight {s.trend_weight_kg:.1f} kg, {direction} about {abs(rate):.2f} kg/week.")
+    return lines
+
+
+class UserHistory:
+    """One user's readings (kept sorted by time) and their running stats."""
+    __slots__ = ("readings", "_ts", "stats")
+
+    def __init__(self):
+        self.readings: List[Reading] = []
+        self._ts: List[float] = []
+        self.stats = HistoryStats()
+
+    def add(self, weight_kg: float, height_cm: float, ts: float = None, bmi: float = None) -> HistoryStats:
+        """Record a reading and return the updated stats. A second reading at the same ts is ignored."""
+        if ts is None:
+            ts = time.time()
+        if bmi is None:
+            bmi = calculate_bmi(weight_kg, height_cm)
+        if self._ts and ts < self._ts[-1]:
+            i = bisect_right(self._ts, ts)
+        else:
+            i = len(self._ts)
+        if i and self._ts[i - 1] == ts:
+            # the first reading at a timestamp wins, as in SQLiteHistoryStore
+            return self.stats
+        self._ts.insert(i, ts)
+        self.readings.insert(i, Reading(ts, weight_kg, height_cm, bmi))
+        if i == len(self._ts) - 1:
+            self.stats.add(ts, weight_kg, bmi)
+        else:
+            self.stats.rebuild((r.ts, r.weight_kg, r.bmi) for r in self.readings)
+        return self.stats
+
+    def between(self, start: float = None, end: float = None) -> List[Reading]:
+        """Readings with start <= ts < end (either bound may be left open)."""
+        lo = 0 if start is None else bisect_left(self._ts, start)
+        hi = len(self._ts) if end is None else bisect_left(self._ts, end)
+        return self.readings[lo:hi]
+
+    def summary_lines(self) -> List[str]:
+        return summary_lines(self.stats)
+
+    def __len__(self) -> int:
+        return len(self.readings)
+
+
+class HistoryStore:
+    """Histories for many users, kept in memory and keyed by user id."""
+
+    def __init__(self):
+        self._users: Dict[str, UserHistory] = {}
+
+    def user(self, user_id: str) -> UserHistory:
+        """The user's history, created empty on first use."""
+        history = self._users.get(user_id)
+        if history is None:
+            history = self._users[user_id] = UserHistory()
+        return history
+
+    def add(self, user_id: str, weight_kg: float, height_cm: float, ts: float = None,
+            bmi: float = None) -> HistoryStats:
+        return self.user(user_id).add(weight_kg, height_cm, ts, bmi)
+
+    def stats(self, user_id: str) -> Optional[HistoryStats]:
+        history = self._users.get(user_id)
+        return None if history is None else history.stats
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class Bucket(Record):
+    """Aggregates of one user's readings over one downsampling interval."""
+    __slots__ = ("start_ts", "count", "mean_weight_kg", "min_weight_kg", "max_weight_kg", "mean_bmi")
+
+    def __init__(self, start_ts: float, count: int, mean_weight_kg: float, min_weight_kg: float,
+                 max_weight_kg: float, mean_bmi: float):
+        self.start_ts = start_ts
+        self.count = count
+        self.mean_weight_kg = mean_weight_kg
+        self.min_weight_kg = min_weight_kg
+        self.max_weight_kg = max_weight_kg
+        self.mean_bmi = mean_bmi
+
+
+class SQLiteHistoryStore:
+    """Histories persisted in a SQLite file (WAL mode), for years of daily weigh-ins.
+
+    Readings live in a WITHOUT ROWID table whose primary key is (user_id, ts), so the
+    table itself is the covering index: a time-range query for one user is a single
+    B-tree range scan that never touches another user's rows. A second reading at
+    the same timestamp is ignored (the first one wins), and does not count in the
+    stats. Each user's HistoryStats state is stored alongside, so stats() stays O(1)
+    however long the history is.
+
+    add() buffers rows and writes them with executemany in one transaction once
+    `batch_size` are pending (or on flush()/close()); queries flush first. The stats
+    of at most `cache_size` recently used users are kept in memory.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, cache_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.cache_size = max(cache_size, 1)
+        self._db = bmi_sqlite.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS readings (user_id TEXT NOT NULL, ts REAL NOT NULL, weight_kg REAL NOT NULL,"
+            " height_cm REAL NOT NULL, bmi REAL NOT NULL, PRIMARY KEY (user_id, ts)) WITHOUT ROWID"
+        )
+        # trend_weight_kg is duplicated out of the state blob so SQL can compare it (see bmi_scheduler)
+        self._db.execute("CREATE TABLE IF NOT EXISTS user_stats (user_id TEXT PRIMARY KEY, trend_weight_kg REAL,"
+                         " state BLOB NOT NULL) WITHOUT ROWID")
+        self._pending: List[tuple] = []
+        self._pending_keys = set()
+        # LRU of loaded stats; users with unflushed changes (_dirty) are written out before being dropped
+        self._stats: "OrderedDict[str, HistoryStats]" = OrderedDict()
+        self._dirty = set()
+
+    def stats(self, user_id: str) -> HistoryStats:
+        """Running stats for the user (empty stats for an unknown user)."""
+        cache = self._stats
+        stats = cache.get(user_id)
+        if stats is not None:
+            cache.move_to_end(user_id)
+            return stats
+        row = self._db.execute("SELECT state FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        stats = cache[user_id] = HistoryStats() if row is None else HistoryStats.from_bytes(row[0])
+        while len(cache) > self.cache_size:
+            if next(iter(cache)) in self._dirty:
+                self.flush()
+            cache.popitem(last=False)
+        return stats
+
+    def _has_reading(self, user_id: str, ts: float, stats: HistoryStats) -> bool:
+        # readings newer than the last one cannot be duplicates, so in-order adds skip the lookup
+        if not stats.count or ts > stats.last_ts:
+            return False
+        if (user_id, ts) in self._pending_keys:
+            return True
+        return self._db.execute("SELECT 1 FROM readings WHERE user_id = ? AND ts = ?", (user_id, ts)).fetchone() is not None
+
+    def add(self, user_id: str, weight_kg: float, height_cm: float, ts: float = None,
+            bmi: float = None) -> HistoryStats:
+        """Record a reading and return the updated stats. A second reading at the same ts is ignored."""
+        if ts is None:
+            ts = time.time()
+        stats = self.stats(user_id)
+        if self._has_reading(user_id, ts, stats):
+            return stats
+        if bmi is None:
+            bmi = calculate_bmi(weight_kg, height_cm)
+        backfill = stats.count and ts < stats.last_ts
+        if not backfill:
+            stats.add(ts, weight_kg, bmi)
+        self._dirty.add(user_id)
+        self._pending.append((user_id, ts, weight_kg, height_cm, bmi))
+        self._pending_keys.add((user_id, ts))
+        if backfill:
+            self._rebuild(user_id, stats)
+        elif len(self._pending) >= self.batch_size:
+            self.flush()
+        return stats
+
+    def add_many(self, user_id: str, readings) -> HistoryStats:
+        """Bulk import (ts, weight_kg, height_cm) tuples, e.g. a wearable's export, in one transaction.
+
+        Readings at a timestamp the user already has (or that repeat within the import) are skipped.
+        Readings older than the user's latest one make the stats be rebuilt once, at the end."""
+        stats = self.stats(user_id)
+        backfill = False
+        # stable sort on ts only: of two readings at one ts, the earlier in the import wins
+        for ts, weight_kg, height_cm in sorted(readings, key=itemgetter(0)):
+            if (user_id, ts) in self._pending_keys or self._has_reading(user_id, ts, stats):
+                continue
+            bmi = calculate_bmi(weight_kg, height_cm)
+            backfill = backfill or (stats.count and ts < stats.last_ts)
+            if not backfill:
+                stats.add(ts, weight_kg, bmi)
+            self._pending.append((user_id, ts, weight_kg, height_cm, bmi))
+            self._pending_keys.add((user_id, ts))
+        self._dirty.add(user_id)
+        if backfill:
+            self._rebuild(user_id, stats)
+        else:
+            self.flush()
+        return stats
+
+    def _rebuild(self, user_id: str, stats: HistoryStats):
+        """Recompute the user's stats from their stored readings (after one older than the latest arrived)."""
+        self.flush()
+        stats.rebuild(self._db.execute("SELECT ts, weight_kg, bmi FROM readings WHERE user_id = ? ORDER BY ts",
+                                       (user_id,)).fetchall())
+        self._dirty.add(user_id)
+        self.flush()
+
+    def flush(self):
+        if not self._pending and not self._dirty:
+            return
+        states = [(uid, self._stats[uid].trend_weight_kg, self._stats[uid].to_bytes()) for uid in self._dirty]
+        bmi_sqlite.write_many(self._db, (
+            ("INSERT OR IGNORE INTO readings (user_id, ts, weight_kg, height_cm, bmi) VALUES (?, ?, ?, ?, ?)",
+             self._pending),
+            ("INSERT OR REPLACE INTO user_stats (user_id, trend_weight_kg, state) VALUES (?, ?, ?)", states),
+        ))
+        self._pending.clear()
+        self._pending_keys.clear()
+        self._dirty.clear()
+
+    def between(self, user_id: str, start: float = None, end: float = None) -> List[Reading]:
+        """Readings with start <= ts < end, oldest first (either bound may be left open)."""
+        self.flush()
+        cur = self._db.execute(
+            "SELECT ts, weight_kg, height_cm, bmi FROM readings WHERE user_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (user_id, -math.inf if start is None else start, math.inf if end is None else end),
+        )
+        return [Reading(*row) for row in cur]
+
+    def last_days(self, user_id: str, days: float, now: float = None) -> List[Reading]:
+        """Readings from the last `days` days, e.g. last_days(uid, 90)."""
+        if now is None:
+            now = time.time()
+        return self.between(user_id, now - days * DAY, math.inf)
+
+    def downsample(self, user_id: str, bucket_days: float = 7.0, start: float = None,
+                   end: float = None) -> List[Bucket]:
+        """Per-interval aggregates (e.g. weekly averages) computed by SQLite with GROUP BY.
+
+        Only one row per bucket reaches Python. Buckets are `bucket_days` long and counted
+        from `start` (default: the user's earliest reading); empty buckets are left out."""
+        self.flush()
+        if start is None:
+            # the earliest stored reading, which a backfill may have put before the first one added
+            start = self._db.execute("SELECT MIN(ts) FROM readings WHERE user_id = ?", (user_id,)).fetchone()[0]
+            if start is None:
+                return []
+        width = bucket_days * DAY
+        cur = self._db.execute(
+            "SELECT CAST((ts - ?1) / ?2 AS INTEGER) AS b, COUNT(*), AVG(weight_kg), MIN(weight_kg),"
+            " MAX(weight_kg), AVG(bmi) FROM readings WHERE user_id = ?3 AND ts >= ?1 AND ts < ?4"
+            " GROUP BY b ORDER BY b",
+            (start, width, user_id, math.inf if end is None else end),
+        )
+        return [Bucket(start + b * width, *rest) for b, *rest in cur]
+
+    def user(self, user_id: str) -> "SQLiteUserHistory":
+        return SQLiteUserHistory(self, user_id)
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+class SQLiteUserHistory:
+    """One user's view of a SQLiteHistoryStore, usable wherever a UserHistory is (e.g. ChatSession.history)."""
+    __slots__ = ("store", "user_id")
+
+    def __init__(self, store: SQLiteHistoryStore, user_id: str):
+        self.store = store
+        self.user_id = user_id
+
+    @property
+    def stats(self) -> HistoryStats:
+        return self.store.stats(self.user_id)
+
+    def add(self, weight_kg: float, height_cm: float, ts: float = None, bmi: float = None) -> HistoryStats:
+        return self.store.add(self.user_id, weight_kg, height_cm, ts, bmi)
+
+    def between(self, start: float = None, end: float = None) -> List[Reading]:
+        return self.store.between(self.user_id, start, end)
+
+    def summary_lines(self) -> List[str]:
+        return summary_lines(self.stats)
@@ -0,0 +1,183 @@
+"""
+Optional latency instrumentation for the bmi_bot hot path, exported in the
+Prometheus text format.
+
+Nothing is measured until enable() is called. enable() replaces the functions
+in INSTRUMENTED with timing wrappers on the bmi_bot module, and disable() puts
+the originals back. While disabled the code runs exactly as if this module did
+not exist. Callers that go through the module (bmi_bot.estimate_tdee(...), which
+is how bmi_batch, bmi_server, bmi_dialog and bmi_scheduler call it) are measured.
+Names bound earlier with `from bmi_bot import ...` are not.
+
+    import bmi_metrics
+    bmi_metrics.enable()
+    ...                                   # run a batch, serve requests, chat
+    bmi_metrics.write_prometheus("/var/lib/node_exporter/bmi.prom")
+
+Ad-hoc sections can be timed with `with bmi_metrics.timer("load_members"):`;
+that is a shared no-op context manager while instrumentation is disabled.
+The HTTP API serves the same text at GET /metrics when enabled. Worker processes
+started by bmi_batch.pool_map measure too and send their numbers back with each
+result (export() / merge()), so --workers runs report every process.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List
+
+import bmi_bot
+
+# plan_weight_loss/compute_macros are the typed cores of the recommend_* dict APIs and what the batch path calls
+INSTRUMENTED = ("parse_weight", "parse_height", "parse_weight_str", "parse_height_str", "estimate_tdee",
+                "recommend_calories_for_weight_loss", "recommend_macros", "plan_weight_loss", "compute_macros")
+
+# upper bounds in seconds; the calls being timed take from about a microsecond to (interactive) seconds
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+class Histogram:
+    """Call count, error count, total time and a latency histogram for one function."""
+    __slots__ = ("counts", "sum", "count", "errors")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_histograms: Dict[str, Histogram] = {}
+_originals: Dict[str, object] = {}
+
+
+def _timed(name: str, fn):
+    hist = _histograms.setdefault(name, Histogram())
+    clock = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            hist.errors += 1
+            raise
+        finally:
+            hist.observe(clock() - start)
+
+    wrapper.__name__ = fn.__name__
+    wrapper.__qualname__ = fn.__qualname__
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+
+def enable(names=INSTRUMENTED):
+    """Start timing the named bmi_bot functions (idempotent)."""
+    for name in names:
+        if name not in _originals:
+            fn = getattr(bmi_bot, name)
+            _originals[name] = fn
+            setattr(bmi_bot, name, _timed(name, fn))
+
+
+def disable():
+    """Put the original functions back. Collected numbers are kept until reset()."""
+    for name, fn in _originals.items():
+        setattr(bmi_bot, name, fn)
+    _originals.clear()
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def reset():
+    """Forget everything measured so far."""
+    for hist in _histograms.values():
+        hist.__init__()
+
+
+def export() -> Dict[str, tuple]:
+    """Everything measured so far as plain (counts, sum, count, errors) tuples, e.g. to send
+    from a worker process to the parent, which adds them in with merge()."""
+    return {name: (list(h.counts), h.sum, h.count, h.errors) for name, h in _histograms.items() if h.count}
+
+
+def merge(data: Dict[str, tuple]):
+    """Add numbers from export() (of another process) to this process's histograms."""
+    for name, (counts, total, count, errors) in data.items():
+        hist = _histograms.setdefault(name, Histogram())
+        for i, n in enumerate(counts):
+            hist.counts[i] += n
+        hist.sum += total
+        hist.count += count
+        hist.errors += errors
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def _timer(name: str):
+    hist = _histograms.setdefault(name, Histogram())
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        hist.errors += 1
+        raise
+    finally:
+        hist.observe(time.perf_counter() - start)
+
+
+def timer(name: str):
+    """Context manager timing a block under `name`; does nothing while instrumentation is disabled."""
+    return _timer(name) if _originals else _NULL_TIMER
+
+
+def prometheus_text() -> str:
+    """All histograms in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = [
+        "# HELP bmi_function_duration_seconds Time spent in instrumented bmi_bot functions.",
+        "# TYPE bmi_function_duration_seconds histogram",
+    ]
+    for name in sorted(_histograms):
+        hist = _histograms[name]
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), hist.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'bmi_function_duration_seconds_bucket{{function="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'bmi_function_duration_seconds_sum{{function="{name}"}} {hist.sum!r}')
+        lines.append(f'bmi_function_duration_seconds_count{{function="{name}"}} {hist.count}')
+    lines.append("# HELP bmi_function_calls_total Calls to instrumented bmi_bot functions.")
+    lines.append("# TYPE bmi_function_calls_total counter")
+    for name in sorted(_histograms):
+        lines.append(f'bmi_function_calls_total{{function="{name}"}} {_histograms[name].count}')
+    lines.append("# HELP bmi_function_errors_total Calls that raised an exception.")
+    lines.append("# TYPE bmi_function_errors_total counter")
+    for name in sorted(_histograms):
+        lines.append(f'bmi_function_errors_total{{function="{name}"}} {_histograms[name].errors}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str):
+    """Write prometheus_text() to path atomically (for node_exporter's textfile collector)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
@@ -0,0 +1,154 @@
+"""
+Profiling mode for batch runs: cProfile for time, tracemalloc for memory.
+Run with: python bmi_bot.py --batch people.csv -o results.csv --profile batch.pstats
+
+profiled() runs a function under both profilers, then:
+- writes the cProfile data to a pstats file (open it with `python -m pstats FILE`
+  or snakeviz),
+- prints the top functions by cumulative time, limited to the bmi_* modules,
+- writes FILE.alloc.txt and prints the top allocation sites. Each allocation is
+  attributed to the innermost bmi_* function on its stack, so memory allocated
+  inside csv/json/re still shows up under the parse or plan function that asked
+  for it. A batch run streams, so little is alive once it finishes; the report
+  uses the largest working set seen by a sampler thread during the run.
+
+Both profilers slow the run down a lot (tracemalloc most); compare profiled runs
+with each other, not with normal ones. Only this process is profiled, so the
+CLI refuses --profile with --workers above 1.
+"""
+import ast
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from bisect import bisect_right
+from typing import Callable, Dict, List, Tuple
+
+# Frames kept per allocation. 4 reaches the bmi_* caller from csv/json/re internals. More gets expensive
+# fast: cProfile allocates as it records calls, and tracemalloc captures a traceback for each of those.
+TRACE_FRAMES = 4
+SAMPLE_INTERVAL = 0.5  # seconds between working-set checks
+RESNAPSHOT_GROWTH = 1.1  # snapshots are expensive; only take a new one when the working set grew 10%
+
+
+def _is_ours(filename: str) -> bool:
+    return os.path.basename(filename).startswith("bmi_") and filename.endswith(".py")
+
+
+# filename -> (sorted start lines, (start, end, qualified name) spans)
+_function_index: Dict[str, Tuple[List[int], List[Tuple[int, int, str]]]] = {}
+
+
+def _function_at(filename: str, lineno: int) -> str:
+    """Name of the innermost function or method defined around lineno ('<module>' outside any)."""
+    index = _function_index.get(filename)
+    if index is None:
+        spans = []
+        try:
+            with open(filename, encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError):
+            tree = None
+        if tree is not None:
+            def visit(node, prefix):
+                for child in ast.iter_child_nodes(node):
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                        name = prefix + child.name
+                        if not isinstance(child, ast.ClassDef):
+                            spans.append((child.lineno, child.end_lineno, name))
+                        visit(child, name + ".")
+            visit(tree, "")
+        spans.sort()
+        starts = [s[0] for s in spans]
+        index = _function_index[filename] = (starts, spans)
+    starts, spans = index
+    # walking back from the latest start at or before lineno, the first enclosing span is the innermost
+    for i in range(bisect_right(starts, lineno) - 1, -1, -1):
+        start, end, name = spans[i]
+        if start <= lineno <= end:
+            return name
+    return "<module>"
+
+
+class _PeakSampler(threading.Thread):
+    """Keeps the tracemalloc snapshot taken at the largest traced size seen so far."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.snapshot = None
+        self.size = -1
+        self._done = threading.Event()
+
+    def sample(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size > self.size * RESNAPSHOT_GROWTH:
+            self.size = size
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def run(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        if self.snapshot is None:
+            self.sample()
+
+
+def allocation_report(snapshot: tracemalloc.Snapshot, top: int = 20) -> str:
+    """Allocation sites alive in snapshot, grouped by innermost bmi_* function, largest first."""
+    sites: Dict[Tuple[str, int], List[int]] = {}
+    for stat in snapshot.statistics("traceback"):
+        # tracemalloc tracebacks are most recent call last
+        frame = next((f for f in reversed(stat.traceback) if _is_ours(f.filename)), None)
+        key = ("<other>", 0) if frame is None else (frame.filename, frame.lineno)
+        entry = sites.setdefault(key, [0, 0])
+        entry[0] += stat.size
+        entry[1] += stat.count
+    total = sum(e[0] for e in sites.values())
+    lines = [f"Top {top} allocation sites by size (working set of {total / 1024:,.1f} KiB):"]
+    ranked = sorted(sites.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    for (filename, lineno), (size, count) in ranked:
+        if filename == "<other>":
+            where = "(no bmi_* frame on the stack)"
+        else:
+            module = os.path.splitext(os.path.basename(filename))[0]
+            where = f"{module}.{_function_at(filename, lineno)} ({os.path.basename(filename)}:{lineno})"
+        lines.append(f"{size / 1024:12,.1f} KiB {count:9,} blocks  {where}")
+    return "\n".join(lines)
+
+
+def profiled(fn: Callable, pstats_path: str, top: int = 20, out=sys.stderr):
+    """Call fn() under cProfile and tracemalloc, write the reports, and return fn's result."""
+    profiler = cProfile.Profile()
+    tracemalloc.start(TRACE_FRAMES)
+    sampler = _PeakSampler()
+    try:
+        sampler.start()
+        profiler.enable()
+        try:
+            result = fn()
+        finally:
+            profiler.disable()
+            sampler.stop()
+        snapshot = sampler.snapshot
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    profiler.dump_stats(pstats_path)
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats("cumulative").print_stats(r"bmi_", top)
+    print(text.getvalue().strip(), file=out)
+
+    report = allocation_report(snapshot, top)
+    with open(pstats_path + ".alloc.txt", "w", encoding="utf-8") as f:
+        f.write(f"Peak traced memory: {peak / 1024:,.1f} KiB\n{report}\n")
+    print(f"\nPeak traced memory: {peak / 1024:,.1f} KiB\n{report}", file=out)
+    print(f"\nWrote {pstats_path} and {pstats_path}.alloc.txt", file=out)
+    return result
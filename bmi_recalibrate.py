@@ -0,0 +1,140 @@
+"""
+Recalibrate a user's TDEE from what actually happened, and re-issue their plan.
+
+The formula TDEE (estimate_tdee) is only a starting guess; people differ from it by
+a few hundred kcal/day. Given logged weights and the average daily intake between
+weigh-ins, energy balance says
+
+    weight change (kg) = (intake - TDEE) * days / KCAL_PER_KG
+
+so a run of readings reveals the real TDEE. TDEERecalibrator tracks (weight, TDEE)
+with a two-state Kalman filter: each reading is one O(1) predict/update step, no
+refit over the history. Day-to-day scale noise (water, food in the gut) is what
+the filter smooths away, and TDEE is allowed to drift slowly as the body adapts.
+
+    cal = TDEERecalibrator.from_person(person)          # prior from estimate_tdee
+    cal.add_reading(81.6, ts, intake_kcal=1800)         # once per weigh-in
+    cal.tdee, cal.tdee_sd                                # current estimate
+    cal.plan(target_weight_kg=75, days=84, sex="male")   # plan_weight_loss on the estimate
+"""
+import math
+import time
+from typing import Optional
+
+from bmi_bot import DAY, KCAL_PER_KG, PersonRecord, PlanResult, estimate_tdee, plan_weight_loss
+
+PRIOR_TDEE_SD = 300.0  # kcal/day; Mifflin-St Jeor x activity is typically within ~10-15%
+SCALE_NOISE_SD = 0.6  # kg; typical day-to-day fluctuation of a bathroom-scale reading
+WEIGHT_DRIFT_SD = 0.05  # kg per sqrt(day) of real weight change the energy model does not explain
+TDEE_DRIFT_SD = 10.0  # kcal/day per sqrt(day): metabolic adaptation, activity changes
+
+
+class TDEERecalibrator:
+    """Kalman filter over (true weight, TDEE) fed by weigh-ins and logged intake."""
+    __slots__ = ("weight", "tdee", "_pww", "_pwt", "_ptt", "last_ts", "intake_kcal", "readings",
+                 "kcal_per_kg", "scale_noise_sd")
+
+    def __init__(self, weight_kg: float, prior_tdee: float, ts: float = None, prior_tdee_sd: float = PRIOR_TDEE_SD,
+                 intake_kcal: float = None, kcal_per_kg: float = KCAL_PER_KG, scale_noise_sd: float = SCALE_NOISE_SD):
+        self.weight = float(weight_kg)
+        self.tdee = float(prior_tdee)
+        # covariance of the (weight, tdee) estimate
+        self._pww = scale_noise_sd * scale_noise_sd
+        self._pwt = 0.0
+        self._ptt = prior_tdee_sd * prior_tdee_sd
+        self.last_ts = time.time() if ts is None else ts
+        # assumed daily intake until the user logs one (None: eating at maintenance)
+        self.intake_kcal = intake_kcal
+        self.readings = 0
+        self.kcal_per_kg = kcal_per_kg
+        self.scale_noise_sd = scale_noise_sd
+
+    @classmethod
+    def from_person(cls, person: PersonRecord, ts: float = None, **kwargs) -> "TDEERecalibrator":
+        """Start from the formula TDEE for the person's current weight, height, age, sex and activity."""
+        tdee = estimate_tdee(person.weight_kg, person.height_cm, person.age, person.sex, person.activity_key)
+        return cls(person.weight_kg, tdee, ts, **kwargs)
+
+    @property
+    def tdee_sd(self) -> float:
+        """Standard deviation of the TDEE estimate (kcal/day); shrinks as readings come in."""
+        return math.sqrt(self._ptt)
+
+    def add_reading(self, weight_kg: float, ts: float = None, intake_kcal: float = None) -> float:
+        """Fold in one weigh-in and return the updated TDEE estimate.
+
+        intake_kcal is the average daily intake since the previous reading; when it is
+        None the last logged intake is assumed to continue. Until an intake has been
+        logged the readings only smooth the weight and the TDEE stays at the prior. Readings must arrive in time
+        order; one timestamped earlier than the last is treated as simultaneous."""
+        if ts is None:
+            ts = time.time()
+        if intake_kcal is not None:
+            self.intake_kcal = intake_kcal
+        days = max(ts - self.last_ts, 0.0) / DAY
+        self.last_ts = max(self.last_ts, ts)
+        self._predict(days)
+        self._update(weight_kg)
+        self.readings += 1
+        return self.tdee
+
+    def _predict(self, days: float):
+        if days <= 0.0:
+            return
+        # weight += (intake - tdee) * days / K. Without a logged intake, TDEE is unobservable: the user is
+        # assumed to eat at the estimate and weight does not depend on it (F = I, so k = 0 below), otherwise
+        # every weight change would be read as a TDEE error.
+        if self.intake_kcal is None:
+            k = 0.0
+        else:
+            k = days / self.kcal_per_kg
+            self.weight += (self.intake_kcal - self.tdee) * k
+        # P = F P F^T + Q with F = [[1, -k], [0, 1]]
+        pww, pwt, ptt = self._pww, self._pwt, self._ptt
+        self._pww = pww - 2.0 * k * pwt + k * k * ptt + WEIGHT_DRIFT_SD * WEIGHT_DRIFT_SD * days
+        self._pwt = pwt - k * ptt
+        self._ptt = ptt + TDEE_DRIFT_SD * TDEE_DRIFT_SD * days
+
+    def _update(self, weight_kg: float):
+        pww, pwt, ptt = self._pww, self._pwt, self._ptt
+        s = pww + self.scale_noise_sd * self.scale_noise_sd
+        gw = pww / s
+        gt = pwt / s
+        resid = weight_kg - self.weight
+        self.weight += gw * resid
+        self.tdee += gt * resid
+        self._pww = (1.0 - gw) * pww
+        self._pwt = (1.0 - gw) * pwt
+        self._ptt = ptt - gt * pwt
+
+    def plan(self, target_weight_kg: float, days: int, sex: str, **kwargs) -> PlanResult:
+        """plan_weight_loss re-run from the filtered weight and the recalibrated TDEE.
+
+        Keyword arguments (max_safe_deficit, min_cal, kcal_per_kg) pass through."""
+        return plan_weight_loss(round(self.weight, 2), target_weight_kg, round(self.tdee), days, sex, **kwargs)
+
+    def to_dict(self) -> dict:
+        return {
+            "weight_kg": round(self.weight, 2),
+            "tdee": round(self.tdee),
+            "tdee_sd": round(self.tdee_sd),
+            "readings": self.readings,
+            "intake_kcal": self.intake_kcal,
+            "last_ts": self.last_ts,
+        }
+
+
+def recalibrate(person: PersonRecord, readings, intake_kcal: Optional[float] = None) -> TDEERecalibrator:
+    """Run a filter over (ts, weight_kg[, intake_kcal]) readings, oldest first.
+
+    The first reading fixes the starting time; the prior comes from the person's
+    formula TDEE. Returns the filter so callers can keep feeding it."""
+    it = iter(readings)
+    first = next(it, None)
+    if first is None:
+        return TDEERecalibrator.from_person(person, intake_kcal=intake_kcal)
+    cal = TDEERecalibrator.from_person(person, first[0], intake_kcal=first[2] if len(first) > 2 else intake_kcal)
+    cal.add_reading(first[1], first[0])
+    for r in it:
+        cal.add_reading(r[1], r[0], r[2] if len(r) > 2 else None)
+    return cal
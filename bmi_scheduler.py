@@ -0,0 +1,202 @@
+"""
+Batch re-planning: refresh the saved plans of every user whose weight has moved
+since their plan was made.
+
+Plans live in a `plans` table next to the readings in the history database
+(bmi_history.SQLiteHistoryStore). Each row keeps the plan's inputs, including the
+weight it was computed for, plus the results. A user is stale when their smoothed
+trend weight (user_stats.trend_weight_kg) differs from the planned weight by at
+least `drift_kg`. SQLite finds those users itself, in bounded pages keyed by
+user_id. The stale users are re-run through estimate_tdee, plan_weight_loss and
+compute_macros in a worker pool and written back one transaction per batch.
+
+Run with: python bmi_bot.py --replan history.db [--drift-kg 1.0] [--workers N] [--chunk-size N]
+"""
+import math
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+import bmi_bot
+import bmi_sqlite
+from bmi_batch import RECORD_ERRORS, WorkerStats, evaluate_person, pool_map
+from bmi_bot import DAY
+
+DEFAULT_DRIFT_KG = 1.0
+DEFAULT_BATCH_SIZE = 1000
+
+PLAN_COLUMNS = ("user_id", "planned_ts", "weight_kg", "height_cm", "age", "sex", "activity_key",
+                "target_weight_kg", "goal_ts", "tdee", "suggested_daily_calories", "protein_g", "fat_g", "carb_g")
+
+
+class PlanStore:
+    """The plans table of a history database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = bmi_sqlite.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plans (user_id TEXT PRIMARY KEY, planned_ts REAL NOT NULL,"
+            " weight_kg REAL NOT NULL, height_cm REAL NOT NULL, age INTEGER, sex TEXT NOT NULL,"
+            " activity_key TEXT NOT NULL, target_weight_kg REAL, goal_ts REAL, tdee INTEGER,"
+            " suggested_daily_calories INTEGER, protein_g INTEGER, fat_g INTEGER, carb_g INTEGER) WITHOUT ROWID"
+        )
+        # the user_stats table is normally created by SQLiteHistoryStore; make sure the scan can join it
+        self._db.execute("CREATE TABLE IF NOT EXISTS user_stats (user_id TEXT PRIMARY KEY, trend_weight_kg REAL,"
+                         " state BLOB NOT NULL) WITHOUT ROWID")
+
+    def save_many(self, people, now: float = None):
+        """Compute and store plans for (user_id, PersonRecord) pairs in one transaction.
+
+        The goal date is now + person.days, so later re-plans keep aiming at the same date."""
+        if now is None:
+            now = time.time()
+        rows = []
+        for user_id, p in people:
+            goal_ts = None if p.days is None else now + p.days * DAY
+            rows.append(_plan_row(user_id, now, p.weight_kg, p.height_cm, p.age, p.sex, p.activity_key,
+                                  p.target_weight_kg, goal_ts))
+        self._write(rows)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        row = self._db.execute(f"SELECT {', '.join(PLAN_COLUMNS)} FROM plans WHERE user_id = ?", (user_id,)).fetchone()
+        return None if row is None else dict(zip(PLAN_COLUMNS, row))
+
+    def stale_page(self, after: str, drift_kg: float, limit: int) -> List[tuple]:
+        """Up to `limit` stale plans with user_id > after, as (plan row..., trend weight) tuples.
+
+        Keyset pagination: each page is one primary-key range scan, so the whole table is
+        never held in memory and writes between pages are safe."""
+        return self._db.execute(
+            f"SELECT {', '.join('p.' + c for c in PLAN_COLUMNS)}, s.trend_weight_kg"
+            " FROM plans p JOIN user_stats s ON s.user_id = p.user_id"
+            " WHERE p.user_id > ? AND abs(s.trend_weight_kg - p.weight_kg) >= ?"
+            " ORDER BY p.user_id LIMIT ?",
+            (after, drift_kg, limit),
+        ).fetchall()
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+    def _write(self, rows: List[tuple]):
+        bmi_sqlite.write_many(self._db, [(f"INSERT OR REPLACE INTO plans ({', '.join(PLAN_COLUMNS)})"
+                                          f" VALUES ({', '.join('?' * len(PLAN_COLUMNS))})", rows)])
+
+    def close(self):
+        self._db.close()
+
+
+def _plan_row(user_id, now, weight_kg, height_cm, age, sex, activity_key, target_weight_kg, goal_ts) -> tuple:
+    days = None if goal_ts is None else max(math.ceil((goal_ts - now) / DAY), 1)
+    person = bmi_bot.PersonRecord(weight_kg, height_cm, age, sex, activity_key, target_weight_kg, days)
+    _, tdee, plan, macros = evaluate_person(person)
+    suggested = None if tdee is None else (plan.suggested_daily_calories if plan is not None else tdee)
+    return (user_id, now, weight_kg, height_cm, age, sex, activity_key, target_weight_kg, goal_ts, tdee, suggested,
+            *((macros.protein_g, macros.fat_g, macros.carb_g) if macros is not None else (None, None, None)))
+
+
+def _replan_batch(rows: List[tuple], now: float):
+    """Worker side: new plan rows for a page of stale users; returns (rows, errors, pid, seconds)."""
+    start = time.perf_counter()
+    out = []
+    errors = 0
+    for r in rows:
+        plan = dict(zip(PLAN_COLUMNS, r))
+        try:
+            out.append(_plan_row(plan["user_id"], now, round(r[-1], 2), plan["height_cm"], plan["age"], plan["sex"],
+                                 plan["activity_key"], plan["target_weight_kg"], plan["goal_ts"]))
+        except RECORD_ERRORS:
+            errors += 1
+    return out, errors, os.getpid(), time.perf_counter() - start
+
+
+class ReplanStats:
+    """Progress and throughput of a replan_stale() run."""
+
+    def __init__(self):
+        self.stale = 0
+        self.replanned = 0
+        self.errors = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.workers = WorkerStats()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def plans_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.replanned / elapsed if elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        return (f"batch {self.batches}: {self.stale} stale, {self.replanned} re-planned, {self.errors} errors, "
+                f"{self.elapsed:.2f}s, {self.plans_per_sec:,.0f} plans/sec")
+
+
+def replan_stale(store: PlanStore, drift_kg: float = DEFAULT_DRIFT_KG, batch_size: int = DEFAULT_BATCH_SIZE,
+                 workers: int = 1, now: float = None,
+                 progress: Optional[Callable[[ReplanStats], None]] = None) -> ReplanStats:
+    """Re-plan every user whose trend weight drifted `drift_kg` or more from their plan.
+
+    Pages of at most batch_size users are computed by a pool of `workers` processes
+    (in this process when workers is 1), with at most 2 pages per worker in flight, and
+    written back in one transaction per page. progress, if given, is called after each page."""
+    if now is None:
+        now = time.time()
+    stats = ReplanStats()
+    pages = _pages(store, drift_kg, batch_size)
+
+    def finish(result):
+        rows, errors, pid, seconds = result
+        store._write(rows)
+        stats.replanned += len(rows)
+        stats.errors += errors
+        stats.batches += 1
+        stats.workers.add(pid, len(rows) + errors, seconds)
+        if progress is not None:
+            progress(stats)
+
+    if workers <= 1:
+        for page in pages:
+            stats.stale += len(page)
+            finish(_replan_batch(page, now))
+        return stats
+
+    def jobs():
+        for page in pages:
+            stats.stale += len(page)
+            yield page, now
+
+    for _, result in pool_map(_replan_batch, jobs(), workers):
+        finish(result)
+    return stats
+
+
+def _pages(store: PlanStore, drift_kg: float, batch_size: int):
+    after = ""
+    while True:
+        # re-planned rows no longer drift, so paging by user_id never revisits them
+        page = store.stale_page(after, drift_kg, batch_size)
+        if not page:
+            return
+        after = page[-1][0]
+        yield page
+
+
+def main_replan(path: str, drift_kg: float = DEFAULT_DRIFT_KG, batch_size: int = DEFAULT_BATCH_SIZE,
+                workers: int = 1) -> ReplanStats:
+    """CLI entry: re-plan a history database and print progress to stderr."""
+    store = PlanStore(path)
+    try:
+        stats = replan_stale(store, drift_kg, batch_size, workers,
+                             progress=lambda s: print(s.report(), file=sys.stderr))
+    finally:
+        store.close()
+    print(f"Re-planned {stats.replanned} of {stats.stale} stale users ({stats.errors} errors) in "
+          f"{stats.elapsed:.2f}s, {stats.plans_per_sec:,.0f} plans/sec.", file=sys.stderr)
+    if workers > 1:
+        print(stats.workers.report(), file=sys.stderr)
+    return stats
@@ -0,0 +1,273 @@
+"""
+HTTP JSON service for the BMI Checker Bot (standard library only).
+Run with: python bmi_bot.py --serve --port 8080
+
+Endpoints (POST a JSON object, or a JSON list of objects to batch several calls):
+- /bmi     {"weight_kg", "height_cm"}                       -> {"bmi", "category"}
+- /tdee    {"weight", "height_cm", "age", "sex", "activity_key"} -> {"tdee"}
+- /plan    {"current_weight", "target_weight", "tdee", "days", "sex"}
+- /macros  {"suggested_calories", "weight_kg", "activity_key"}
+- GET /health
+- GET /metrics  Prometheus text (only when started with --metrics; see bmi_metrics.py)
+
+Field names match the parameters of the bmi_bot functions. Numbers must be finite;
+age and days must be whole numbers; activity_key may be a string or a number.
+Bad input gets a 400 with {"error": ...}; in a list, each bad item gets its own
+{"error": ...} in "results". Connections are kept alive (HTTP/1.1) and at most
+--max-concurrency requests are computed and answered at once. A body that does not
+arrive within IDLE_TIMEOUT seconds gets a 408 and the connection is closed.
+"""
+import asyncio
+import inspect
+import json
+import math
+import typing
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import bmi_bot
+
+MAX_BODY_BYTES = 1 << 20
+IDLE_TIMEOUT = 30.0
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _bmi(weight_kg: float, height_cm: float) -> dict:
+    bmi = bmi_bot.calculate_bmi(weight_kg, height_cm)
+    return {"bmi": bmi, "category": bmi_bot.bmi_category(bmi)}
+
+
+def _tdee(weight: float, height_cm: float, age: int, sex: str, activity_key: Union[str, int] = "1") -> dict:
+    return {"tdee": bmi_bot.estimate_tdee(weight, height_cm, age, sex, str(activity_key))}
+
+
+def _plan(current_weight: float, target_weight: float, tdee: float, days: int, sex: str = "other") -> dict:
+    return bmi_bot.recommend_calories_for_weight_loss(current_weight, target_weight, tdee, days, sex)
+
+
+def _macros(suggested_calories: int, weight_kg: float, activity_key: Union[str, int] = "1") -> dict:
+    return bmi_bot.recommend_macros(suggested_calories, weight_kg, str(activity_key))
+
+
+ENDPOINTS: Dict[str, Callable[..., dict]] = {
+    "/bmi": _bmi,
+    "/tdee": _tdee,
+    "/plan": _plan,
+    "/macros": _macros,
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _field_specs(fn: Callable[..., dict]) -> Dict[str, Tuple[tuple, bool]]:
+    """name -> (accepted annotation types, required) from an endpoint's signature."""
+    specs = {}
+    for name, param in inspect.signature(fn).parameters.items():
+        types = typing.get_args(param.annotation) or (param.annotation,)
+        specs[name] = (types, param.default is inspect.Parameter.empty)
+    return specs
+
+
+_SPECS = {path: _field_specs(fn) for path, fn in ENDPOINTS.items()}
+_TYPE_NAMES = {float: "a number", int: "a whole number", str: "a string"}
+
+
+def _check_field(name: str, value, types: tuple):
+    """Return value converted to the first matching type, or raise HTTPError(400)."""
+    for t in types:
+        if t is str and isinstance(value, str):
+            return value
+        # bool is an int subclass, but true/false is never a valid number here
+        if t in (float, int) and isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                finite = math.isfinite(value)
+            except OverflowError:  # an integer too large for a float
+                finite = False
+            if not finite:
+                break
+            if t is float or isinstance(value, int):
+                return value
+            if value.is_integer():
+                return int(value)
+    expected = " or ".join(_TYPE_NAMES[t] for t in types)
+    raise HTTPError(400, f"Field '{name}' must be {expected}.")
+
+
+def _validate(path: str, params) -> dict:
+    if not isinstance(params, dict):
+        raise HTTPError(400, "Each request must be a JSON object.")
+    specs = _SPECS[path]
+    unknown = sorted(k for k in params if k not in specs)
+    if unknown:
+        raise HTTPError(400, "Unknown fields: " + ", ".join(unknown))
+    missing = [k for k, (_, required) in specs.items() if required and k not in params]
+    if missing:
+        raise HTTPError(400, "Missing fields: " + ", ".join(missing))
+    return {k: _check_field(k, v, specs[k][0]) for k, v in params.items()}
+
+
+def _call(path: str, params) -> dict:
+    kwargs = _validate(path, params)
+    try:
+        result = ENDPOINTS[path](**kwargs)
+    except (ValueError, ArithmeticError) as e:
+        raise HTTPError(400, str(e) or type(e).__name__) from None
+    # finite inputs can still overflow (e.g. a tiny height); NaN/Infinity are not valid JSON
+    if any(isinstance(v, float) and not math.isfinite(v) for v in result.values()):
+        raise HTTPError(400, "Result out of range; check the input values.")
+    return result
+
+
+def _call_or_error(path: str, params) -> dict:
+    try:
+        return _call(path, params)
+    except HTTPError as e:
+        return {"error": str(e)}
+
+
+def handle_request(method: str, path: str, body: bytes) -> Tuple[int, Union[dict, str]]:
+    """Dispatch one request; returns (status, JSON-able payload, or text for /metrics). Does no I/O."""
+    if path == "/health":
+        return 200, {"status": "ok"}
+    if path == "/metrics":
+        import bmi_metrics
+
+        if not bmi_metrics.enabled():
+            return 404, {"error": "Metrics are disabled; start the server with --metrics FILE."}
+        return 200, bmi_metrics.prometheus_text()
+    if path not in ENDPOINTS:
+        return 404, {"error": f"Unknown endpoint {path}"}
+    if method != "POST":
+        return 405, {"error": "Use POST with a JSON body."}
+    try:
+        params = json.loads(body or b"null")
+        if isinstance(params, list):
+            # batched calls: a bad item gets its own error instead of failing the batch
+            return 200, {"results": [_call_or_error(path, p) for p in params]}
+        return 200, _call(path, params)
+    except json.JSONDecodeError as e:
+        return 400, {"error": f"Invalid JSON: {e}"}
+    except HTTPError as e:
+        return e.status, {"error": str(e)}
+
+
+class BMIServer:
+    """asyncio HTTP/1.1 server with keep-alive and a bound on concurrent requests."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, max_concurrency: int = 256):
+        self.host = host
+        self.port = port
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # pick up the real port when started with port 0
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, dict, int]]:
+        """Request line and headers; returns (method, path, headers, content length), or None at EOF/idle."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.") from None
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        headers[":version"] = version
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise HTTPError(411, "Chunked bodies are not supported; send Content-Length.")
+        length = headers.get("content-length", "") or "0"
+        if not length.isdigit():
+            raise HTTPError(400, "Content-Length must be a non-negative integer.")
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large.")
+        return method, target.split("?", 1)[0], headers, length
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    req = await self._read_head(reader)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if req is None:
+                    break
+                method, path, headers, length = req
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if headers[":version"] == "HTTP/1.1" else conn == "keep-alive"
+                # The body is read before taking a slot, so a client that stalls mid-upload only
+                # holds its own connection. A slot covers computing the answer and draining it.
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), IDLE_TIMEOUT) if length else b""
+                except asyncio.TimeoutError:
+                    self._write_response(writer, 408, {"error": "Timed out reading the request body."}, False)
+                    await asyncio.wait_for(writer.drain(), IDLE_TIMEOUT)
+                    break
+                async with self._limit:
+                    try:
+                        status, payload = handle_request(method, path, body)
+                    except Exception:
+                        status, payload, keep_alive = 500, {"error": "Internal server error."}, False
+                    self._write_response(writer, status, payload, keep_alive)
+                    # a client that stops reading must not keep the slot either
+                    await asyncio.wait_for(writer.drain(), IDLE_TIMEOUT)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Union[dict, str], keep_alive: bool):
+        if isinstance(payload, str):
+            data, ctype = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            data, ctype = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {ctype}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8080, max_concurrency: int = 256):
+    server = BMIServer(host, port, max_concurrency)
+
+    async def _main():
+        await server.start()
+        print(f"Serving BMI API on http://{server.host}:{server.port} (Ctrl+C to stop)")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,159 @@
+"""
+Session stores for the chat server: where ChatSession.to_bytes() snapshots live
+between answers, so a dropped connection (or another server process) can resume them.
+
+Every store has the same small interface: get(id), put(id, blob), delete(id),
+flush() and close(). Pick one with open_store(spec):
+
+    "memory"        MemorySessionStore: in-process LRU with a time-to-live (default)
+    "sqlite:PATH"   SQLiteSessionStore: a WAL-mode SQLite file that several server
+                    processes on one host can share
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import bmi_sqlite
+
+DEFAULT_TTL = 3600.0  # seconds a paused conversation can be resumed
+DEFAULT_MAXSIZE = 100_000  # 23-byte snapshots, so a full memory store is a few MB
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.05  # seconds; bounds how stale other processes' reads can be
+
+
+class SessionStore:
+    """Interface shared by the stores. Blobs are opaque bytes keyed by session id."""
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def put(self, session_id: str, blob: bytes):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def flush(self):
+        """Write out anything buffered. A no-op for stores that do not buffer."""
+
+    def purge_expired(self) -> int:
+        """Drop expired sessions now; returns how many were removed."""
+        return 0
+
+    def close(self):
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """Least-recently-used snapshots in this process, expiring `ttl` seconds after the last put."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        item = self._items.get(session_id)
+        if item is None:
+            return None
+        if item[0] <= self._clock():
+            del self._items[session_id]
+            return None
+        self._items.move_to_end(session_id)
+        return item[1]
+
+    def put(self, session_id: str, blob: bytes):
+        items = self._items
+        items[session_id] = (self._clock() + self.ttl, blob)
+        items.move_to_end(session_id)
+        while len(items) > self.maxsize:
+            items.popitem(last=False)
+
+    def delete(self, session_id: str):
+        self._items.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        now = self._clock()
+        expired = [sid for sid, (expires, _) in self._items.items() if expires <= now]
+        for sid in expired:
+            del self._items[sid]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Snapshots in a SQLite file in WAL mode, with writes batched into one transaction.
+
+    put() and delete() only buffer; the buffer is written when it holds `batch_size`
+    sessions or `flush_interval` seconds have passed since the last write, and on
+    flush()/close(). A crash loses at most that window of answers. Reads check the
+    buffer first, so this process always sees its own latest writes.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._db = bmi_sqlite.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, expires REAL NOT NULL, blob BLOB NOT NULL) WITHOUT ROWID"
+        )
+        # session id -> blob to write, or None to delete
+        self._pending: Dict[str, Optional[bytes]] = {}
+        self._last_flush = time.monotonic()
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        if session_id in self._pending:
+            return self._pending[session_id]
+        row = self._db.execute(
+            "SELECT blob FROM sessions WHERE id = ? AND expires > ?", (session_id, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, session_id: str, blob: bytes):
+        self._pending[session_id] = blob
+        self._maybe_flush()
+
+    def delete(self, session_id: str):
+        self._pending[session_id] = None
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        expires = time.time() + self.ttl
+        puts = [(sid, expires, blob) for sid, blob in self._pending.items() if blob is not None]
+        deletes = [(sid,) for sid, blob in self._pending.items() if blob is None]
+        self._pending.clear()
+        bmi_sqlite.write_many(self._db, (
+            ("INSERT OR REPLACE INTO sessions (id, expires, blob) VALUES (?, ?, ?)", puts),
+            ("DELETE FROM sessions WHERE id = ?", deletes),
+        ))
+
+    def purge_expired(self) -> int:
+        self.flush()
+        return self._db.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),)).rowcount
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def open_store(spec: str = "memory", ttl: float = DEFAULT_TTL) -> SessionStore:
+    """Build a store from a spec string: "memory" or "sqlite:PATH"."""
+    kind, _, arg = spec.partition(":")
+    if kind == "memory" and not arg:
+        return MemorySessionStore(ttl=ttl)
+    if kind == "sqlite" and arg:
+        return SQLiteSessionStore(arg, ttl=ttl)
+    raise ValueError(f"Unknown session store {spec!r}; use 'memory' or 'sqlite:PATH'.")
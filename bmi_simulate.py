@@ -0,0 +1,132 @@
+"""
+Weight-loss trajectory simulation with an adaptive TDEE.
+
+recommend_calories_for_weight_loss assumes TDEE stays fixed, but TDEE falls as weight
+falls (Mifflin-St Jeor is linear in weight), so long plans lose weight more slowly
+than the linear 7700 kcal/kg estimate suggests.
+
+With a fixed daily intake I, one day of the energy balance is
+
+    w[n+1] = w[n] - (m * (10 * w[n] + c) - I) / KCAL_PER_KG
+
+where m is the activity multiplier and c the non-weight part of the BMR. This is a
+linear recurrence with the closed form
+
+    w[n] = w_eq + (w[0] - w_eq) * a**n,   a = 1 - 10 * m / KCAL_PER_KG,   w_eq = (I - m * c) / (10 * m)
+
+so any day can be computed in O(1) and a trajectory sampled every `step` days costs
+one multiplication per sample. Age is held at its starting value.
+"""
+import math
+from typing import List, Optional
+
+import bmi_bot
+
+
+def _model(height_cm: float, age: int, sex: str, activity_key: str, daily_calories: float):
+    """Return (a, w_eq) for the closed-form recurrence described in the module docstring."""
+    m = bmi_bot.ACTIVITY_LEVELS.get(activity_key, (None, 1.2))[1]
+    c = bmi_bot.bmr_mifflin_sex(0, height_cm, age, sex)
+    a = 1 - 10 * m / bmi_bot.KCAL_PER_KG
+    w_eq = (daily_calories - m * c) / (10 * m)
+    return a, w_eq
+
+
+def weight_after_days(weight: float, height_cm: float, age: int, sex: str, activity_key: str,
+                      daily_calories: float, days: float) -> float:
+    """Predicted weight (kg) after eating `daily_calories` every day for `days` days."""
+    a, w_eq = _model(height_cm, age, sex, activity_key, daily_calories)
+    return w_eq + (weight - w_eq) * a ** days
+
+
+def simulate_weight_trajectory(weight: float, height_cm: float, age: int, sex: str, activity_key: str,
+                               daily_calories: float, days: int, step: int = 1) -> List[float]:
+    """Predicted weight every `step` days from day 0 up to and including `days`."""
+    a, w_eq = _model(height_cm, age, sex, activity_key, daily_calories)
+    factor = a ** step
+    gap = weight - w_eq
+    out = []
+    for _ in range(0, days + 1, step):
+        out.append(round(w_eq + gap, 2))
+        gap *= factor
+    return out
+
+
+def days_to_reach_target(weight: float, target_weight: float, height_cm: float, age: int, sex: str,
+                         activity_key: str, daily_calories: float) -> Optional[float]:
+    """Days until weight first reaches `target_weight`, or None if this intake never gets there.
+
+    The weight only approaches w_eq, so targets at or beyond it are unreachable."""
+    if target_weight >= weight:
+        return 0.0
+    a, w_eq = _model(height_cm, age, sex, activity_key, daily_calories)
+    if target_weight <= w_eq:
+        return None
+    return math.log((target_weight - w_eq) / (weight - w_eq)) / math.log(a)
+
+
+def simulate_plan(current_weight: float, target_weight: float, height_cm: float, age: int, sex: str,
+                  activity_key: str, days: int) -> dict:
+    """Run the usual plan, then simulate it with an adaptive TDEE.
+
+    Returns the plan dict from recommend_calories_for_weight_loss with extra keys:
+    'adaptive_weeks_needed' (None if the target is never reached at the suggested intake)
+    and 'adaptive_weight_at_end' (predicted weight after the planned number of days)."""
+    tdee = bmi_bot.estimate_tdee(current_weight, height_cm, age, sex, activity_key)
+    plan = bmi_bot.recommend_calories_for_weight_loss(current_weight, target_weight, tdee, days, sex)
+    if "message" in plan:
+        return plan
+    intake = plan["suggested_daily_calories"]
+    needed = days_to_reach_target(current_weight, target_weight, height_cm, age, sex, activity_key, intake)
+    plan["adaptive_weeks_needed"] = None if needed is None else round(needed / 7, 1)
+    plan["adaptive_weight_at_end"] = round(
+        weight_after_days(current_weight, height_cm, age, sex, activity_key, intake, days), 2)
+    return plan
+
+
+def simulate_cohort(weights, heights_cm, ages, sex_codes, activity_keys, target_weights, days, weeks: int):
+    """Project weekly weights for a whole cohort at once (needs NumPy).
+
+    Each member gets the intake recommend_calories_for_weight_loss would suggest
+    (deficit capped at MAX_SAFE_DEFICIT, intake floored at MIN_DAILY_CALORIES; members
+    already at or below target eat at maintenance), and then all members are stepped
+    forward one week at a time with the closed-form adaptive-TDEE model.
+
+    Inputs are 1-D arrays of equal length (scalars broadcast): sex_codes per bmi_bot.SEX_CODES,
+    activity_keys as ints 1-5, days = planned duration. Returns a float32 array of shape
+    (members, weeks + 1); column 0 is the starting weight.
+
+    Memory: the result takes 4 * (weeks + 1) bytes per member, i.e. 212 MB per million
+    members for a one-year (52-week) projection. Working arrays add about 100 MB per
+    million members (a dozen float64 columns), independent of the horizon.
+    """
+    import numpy as np
+
+    w0 = np.asarray(weights, dtype=np.float64)
+    n = w0.shape[0]
+    h = np.broadcast_to(np.asarray(heights_cm, dtype=np.float64), (n,))
+    age = np.broadcast_to(np.asarray(ages, dtype=np.float64), (n,))
+    sex = np.broadcast_to(np.asarray(sex_codes, dtype=np.intp), (n,))
+    act = np.broadcast_to(np.asarray(activity_keys, dtype=np.intp), (n,))
+    target = np.broadcast_to(np.asarray(target_weights, dtype=np.float64), (n,))
+    plan_days = np.maximum(np.broadcast_to(np.asarray(days, dtype=np.float64), (n,)), 1)
+
+    multipliers = np.asarray(bmi_bot.activity_multipliers())
+    m = multipliers[np.where((act >= 1) & (act <= 5), act, 0)]
+    c = 6.25 * h - 5 * age + np.array(bmi_bot.BMR_SEX_INTERCEPTS)[sex]
+
+    # same rounding as estimate_tdee, then the plan's caps (the plan truncates to whole kcal)
+    tdee = np.round((10 * w0 + c) * m)
+    deficit = np.minimum((w0 - target) * bmi_bot.KCAL_PER_KG / plan_days, bmi_bot.MAX_SAFE_DEFICIT)
+    intake = np.where(w0 > target, np.floor(np.maximum(tdee - deficit, bmi_bot.MIN_DAILY_CALORIES)), tdee)
+
+    a7 = (1 - 10 * m / bmi_bot.KCAL_PER_KG) ** 7
+    w_eq = (intake - m * c) / (10 * m)
+    gap = w0 - w_eq
+
+    out = np.empty((n, weeks + 1), dtype=np.float32)
+    out[:, 0] = w0
+    for week in range(1, weeks + 1):
+        gap *= a7
+        out[:, week] = w_eq + gap
+    return out
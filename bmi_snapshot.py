@@ -0,0 +1,144 @@
+"""
+Compact binary member snapshots for repeated what-if runs.
+Convert with: python bmi_bot.py --to-snapshot members.csv --output members.bmis
+
+Parsing free-text CSV is the slow part of a batch run. A snapshot stores each member
+once, already parsed, as a fixed-width 12-byte little-endian record:
+
+    weight_kg float32 | height_cm float32 | age uint16 | sex uint8 | activity uint8
+
+after a 16-byte header (magic b"BMIS", uint16 version, uint16 record size, uint64 count).
+Sex codes follow bmi_bot.SEX_CODES (see bmi_bot.sex_code) and activity codes are 1-5. Snapshots are opened
+with mmap, so repeated runs read the file in place without copying or re-parsing it.
+"""
+import os
+import struct
+from typing import Dict, Iterator, Optional, Tuple
+
+import bmi_bot
+
+MAGIC = b"BMIS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<ffHBB")
+
+# NumPy view of RECORD (built lazily so this module doesn't need NumPy to convert files)
+_DTYPE_FIELDS = [("weight_kg", "<f4"), ("height_cm", "<f4"), ("age", "<u2"), ("sex", "u1"), ("activity", "u1")]
+
+
+def convert_csv(csv_path: str, snapshot_path: str, fmt: Optional[str] = None) -> Tuple[int, int]:
+    """Write a snapshot from a CSV / JSON Lines batch input file. Returns (members written, rows skipped).
+
+    Rows need weight, height and age; rows that fail to parse (or don't fit a record) are
+    skipped. The file is written under a temporary name and renamed when complete, so a
+    failed run never leaves a partial snapshot behind."""
+    import bmi_batch
+
+    fmt = fmt or bmi_batch.guess_format(csv_path)
+    n = skipped = 0
+    tmp = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(csv_path, newline="", encoding="utf-8") as fin, open(tmp, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+            for rec in bmi_batch.read_records(fin, fmt):
+                try:
+                    p = bmi_batch.person_from_record(rec)
+                    if p.age is None:
+                        raise ValueError("age is required")
+                    activity = int(p.activity_key) if p.activity_key in bmi_bot.ACTIVITY_LEVELS else 0
+                    out.write(RECORD.pack(p.weight_kg, p.height_cm, p.age, bmi_bot.sex_code(p.sex), activity))
+                except bmi_batch.RECORD_ERRORS + (struct.error,):
+                    skipped += 1
+                    continue
+                n += 1
+            # now that the count is known, fill it into the header
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, RECORD.size, n))
+        os.replace(tmp, snapshot_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n, skipped
+
+
+def _check_header(buf) -> int:
+    magic, version, size, count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError("Not a BMI snapshot file (or an unsupported version).")
+    if len(buf) < HEADER.size + count * size:
+        raise ValueError("Snapshot file is truncated.")
+    return count
+
+
+def open_snapshot(path: str):
+    """Memory-map a snapshot as a read-only NumPy structured array (no copy, needs NumPy)."""
+    import numpy as np
+
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    count = _check_header(mm)
+    return np.ndarray((count,), dtype=np.dtype(_DTYPE_FIELDS), buffer=mm, offset=HEADER.size)
+
+
+def iter_snapshot(path: str) -> Iterator[Tuple[float, float, int, int, int]]:
+    """Yield (weight_kg, height_cm, age, sex_code, activity_code) tuples without NumPy, reading via mmap."""
+    import mmap
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        count = _check_header(mm)
+        view = memoryview(mm)[HEADER.size:HEADER.size + count * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+
+def is_snapshot(path: str) -> bool:
+    """True when the file starts with the snapshot magic bytes."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Yield the members as batch input records (bmi_batch.ParsedRecord), so run_batch can process
+    a snapshot like a CSV without formatting and re-parsing the stored numbers.
+
+    Snapshots hold no goal, so the results have BMI, TDEE and maintenance macros only."""
+    import bmi_batch
+
+    sexes = tuple(bmi_bot.SEX_CODES)
+    for weight, height, age, sex, activity in iter_snapshot(path):
+        sex = sexes[sex] if sex < len(sexes) else "other"
+        # float32 -> the parsers' precision (0.01 kg, 0.1 cm), as in snapshot_bmi_tdee
+        person = bmi_bot.PersonRecord(round(weight, 2), round(height, 1), age, sex, str(activity or 1))
+        yield bmi_batch.ParsedRecord(person, {"age": age, "sex": sex, "activity": activity or None})
+
+
+def snapshot_bmi_tdee(snap, multipliers: Optional[Dict[str, float]] = None):
+    """BMI, category codes and TDEE for every member of an open snapshot.
+
+    `multipliers` overrides ACTIVITY_LEVELS multipliers for what-if runs, e.g. {"1": 1.15}.
+    Returns (bmi, category_codes, tdee) arrays."""
+    import numpy as np
+
+    # values are stored as float32; round back to the parsers' precision (0.01 kg, 0.1 cm)
+    # so results match what the text pipeline computes for the same member
+    weights = np.round(snap["weight_kg"].astype(np.float64), 2)
+    heights = np.round(snap["height_cm"].astype(np.float64), 1)
+    bmi, codes = bmi_bot.calculate_bmi_batch(weights, heights)
+    tdee = bmi_bot.estimate_tdee_batch(weights, heights, snap["age"], snap["sex"], snap["activity"], multipliers)
+    return bmi, codes, tdee
+
+
+def snapshot_intake(snap, max_safe_deficit: float = None, min_cal: float = None,
+                    multipliers: Optional[Dict[str, float]] = None):
+    """Daily intake at the largest allowed deficit: TDEE minus the deficit cap, floored at the
+    minimum calories (defaults: bmi_bot.MAX_SAFE_DEFICIT and MIN_DAILY_CALORIES)."""
+    import numpy as np
+
+    max_safe_deficit = bmi_bot.MAX_SAFE_DEFICIT if max_safe_deficit is None else max_safe_deficit
+    min_cal = bmi_bot.MIN_DAILY_CALORIES if min_cal is None else min_cal
+    _, _, tdee = snapshot_bmi_tdee(snap, multipliers)
+    return np.maximum(tdee - max_safe_deficit, min_cal)
@@ -0,0 +1,35 @@
+"""
+SQLite plumbing shared by the on-disk stores (bmi_sessions, bmi_history, bmi_scheduler).
+
+Connections run in autocommit mode with WAL journaling, so readers never block the
+writer, and writes are grouped explicitly with write_many().
+"""
+from typing import Iterable, Sequence, Tuple
+
+BUSY_TIMEOUT_MS = 5000
+
+
+def connect(path: str, check_same_thread: bool = True):
+    """Open (creating if needed) the database at path, configured for the stores."""
+    import sqlite3
+
+    # isolation_level=None: no implicit transactions; write_many() opens them
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=check_same_thread)
+    db.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across application crashes in WAL mode; only an OS crash can drop the last commits
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return db
+
+
+def write_many(db, statements: Iterable[Tuple[str, Sequence[tuple]]]):
+    """Run executemany(sql, rows) for each pair in one transaction; nothing is written if any fails."""
+    db.execute("BEGIN")
+    try:
+        for sql, rows in statements:
+            if rows:
+                db.executemany(sql, rows)
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
@@ -0,0 +1,84 @@
+"""
+What-if parameter sweeps for the calorie planner (needs NumPy).
+
+Answers questions like "what if the max safe deficit were 750 instead of 1000, or the
+minimum intake 1500 instead of 1200?" for a whole population at once. Every grid point
+applies exactly the rules of bmi_bot.plan_weight_loss; the grid and the population are
+broadcast against each other so each chunk of members is evaluated for all grid points
+in one vectorized pass.
+"""
+from itertools import product
+from typing import Iterable, List, Sequence, Tuple
+
+import bmi_bot
+
+GridPoint = Tuple[float, float, float]  # (max_safe_deficit, min_cal, kcal_per_kg)
+
+
+def make_grid(max_safe_deficits: Iterable[float] = (bmi_bot.MAX_SAFE_DEFICIT,),
+              min_cals: Iterable[float] = (bmi_bot.MIN_DAILY_CALORIES,),
+              kcal_per_kgs: Iterable[float] = (bmi_bot.KCAL_PER_KG,)) -> List[GridPoint]:
+    """Cartesian product of the parameter values, in (max_safe_deficit, min_cal, kcal_per_kg) order."""
+    return list(product(max_safe_deficits, min_cals, kcal_per_kgs))
+
+
+def sweep(current_weights, target_weights, tdees, days, grid: Sequence[GridPoint], chunk_size: int = 65536) -> List[dict]:
+    """Evaluate the weight-loss plan for every member at every grid point and aggregate.
+
+    Members whose target is not below their current weight need no plan and are left
+    out of the statistics. Returns one dict per grid point with the parameters and:
+    members, mean_suggested_calories, mean_daily_deficit, mean_estimated_weeks,
+    share_deficit_capped and share_at_min_calories.
+
+    Work is done in chunks of `chunk_size` members, so memory is about
+    8 * len(grid) * chunk_size bytes per temporary array regardless of population size.
+    """
+    import numpy as np
+
+    cw = np.asarray(current_weights, dtype=np.float64)
+    tw = np.broadcast_to(np.asarray(target_weights, dtype=np.float64), cw.shape)
+    tdee = np.broadcast_to(np.asarray(tdees, dtype=np.float64), cw.shape)
+    d = np.maximum(np.broadcast_to(np.asarray(days, dtype=np.float64), cw.shape), 1)
+
+    params = np.asarray(grid, dtype=np.float64).reshape(-1, 3)
+    max_def, min_cal, k = (params[:, i:i + 1] for i in range(3))  # (G, 1) columns
+    g = params.shape[0]
+    sums = {name: np.zeros(g) for name in ("suggested", "deficit", "weeks", "capped", "at_min")}
+    members = 0
+
+    for start in range(0, cw.shape[0], chunk_size):
+        sl = slice(start, start + chunk_size)
+        kg = cw[sl] - tw[sl]
+        keep = kg > 0
+        kg, t, dd = kg[keep], tdee[sl][keep], d[sl][keep]
+        members += kg.shape[0]
+
+        needed = kg * k / dd                      # (G, n) kcal/day
+        capped = needed > max_def
+        deficit = np.where(capped, max_def, needed)
+        weeks = np.where(capped, kg * k / (max_def * 7), dd / 7)
+        suggested = t - deficit
+        at_min = suggested < min_cal
+        suggested = np.floor(np.where(at_min, min_cal, suggested))  # the plan truncates to whole kcal
+
+        sums["suggested"] += suggested.sum(axis=1)
+        sums["deficit"] += np.floor(deficit).sum(axis=1)
+        sums["weeks"] += weeks.sum(axis=1)
+        sums["capped"] += capped.sum(axis=1)
+        sums["at_min"] += at_min.sum(axis=1)
+
+    denom = max(members, 1)
+    return [
+        {
+            "max_safe_deficit": float(params[i, 0]),
+            "min_cal": float(params[i, 1]),
+            "kcal_per_kg": float(params[i, 2]),
+            "members": members,
+            "mean_suggested_calories": sums["suggested"][i] / denom,
+            "mean_daily_deficit": sums["deficit"][i] / denom,
+            "mean_estimated_weeks": sums["weeks"][i] / denom,
+            "share_deficit_capped": sums["capped"][i] / denom,
+            "share_at_min_calories": sums["at_min"][i] / denom,
+        }
+        for i in range(g)
+    ]
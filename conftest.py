@@ -0,0 +1 @@
+# Lets pytest import the bmi_* modules from the repository root when run from any directory.
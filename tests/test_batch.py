@@ -0,0 +1,153 @@
+import io
+import json
+
+import pytest
+
+import bmi_batch
+
+GOOD = {"weight": "80 kg", "height": "180 cm", "age": "30", "sex": "male", "activity": "2",
+        "target_weight": "75", "weeks": "10"}
+
+
+def _run_jsonl(lines, workers=1, tmp_path=None):
+    text = "\n".join(lines) + "\n"
+    if workers == 1:
+        out = io.StringIO()
+        n, errors = bmi_batch.process_stream(bmi_batch.read_records(io.StringIO(text), "jsonl"),
+                                             bmi_batch.RecordWriter(out, "jsonl"))
+        rows = out.getvalue()
+    else:
+        src, dst = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        src.write_text(text)
+        n, errors = bmi_batch.run_batch(str(src), str(dst), workers=workers, chunk_size=2)
+        rows = dst.read_text()
+    return n, errors, [json.loads(line) for line in rows.splitlines()]
+
+
+BAD_LINES = [
+    json.dumps({**GOOD, "height": "0.0001"}),
+    json.dumps({**GOOD, "weeks": "inf"}),
+    json.dumps({**GOOD, "weeks": "nan"}),
+    '{"weight": 80,',
+    "[1, 2]",
+    json.dumps({**GOOD, "age": "abc"}),
+]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_rows_do_not_stop_the_run(workers, tmp_path):
+    lines = [json.dumps(GOOD)] + BAD_LINES + [json.dumps(GOOD)]
+    n, errors, rows = _run_jsonl(lines, workers, tmp_path)
+    assert (n, errors) == (len(lines), len(BAD_LINES))
+    assert [bool(r["error"]) for r in rows] == [False] + [True] * len(BAD_LINES) + [False]
+    assert rows[0]["suggested_daily_calories"] == rows[-1]["suggested_daily_calories"]
+    assert "invalid JSON" in rows[4]["error"]
+    assert "expected a JSON object" in rows[5]["error"]
+
+
+def test_process_record_rejects_non_objects():
+    assert bmi_batch.process_record([1, 2])["error"] == "Record is not an object."
+
+
+def test_columnar_keeps_bad_rows_with_their_error():
+    lines = [json.dumps({**GOOD, "member_id": "m0"})] + BAD_LINES
+    records = bmi_batch.read_records(io.StringIO("\n".join(lines)), "jsonl")
+    columns, errors = bmi_batch.process_records_columnar(records, bmi_batch.PlanColumns(["member_id"]), start=10)
+    assert (len(columns), errors) == (len(lines), len(BAD_LINES))
+    rows = columns.to_dicts()
+    assert [r["row"] for r in rows] == list(range(10, 10 + len(lines)))
+    assert rows[0]["member_id"] == "m0" and rows[0]["error"] is None
+    assert rows[0]["tdee"] == bmi_batch.process_record(GOOD)["tdee"]
+    assert rows[1]["member_id"] is None and rows[1]["error"]
+    assert rows[1]["category_code"] == -1 and rows[1]["bmi"] != rows[1]["bmi"]  # missing: -1 / NaN
+
+
+@pytest.mark.parametrize("name", ["members.bmis", "members.dat"])
+def test_snapshot_input_matches_csv_input(name, tmp_path, monkeypatch):
+    import csv
+
+    import bmi_snapshot
+
+    src = tmp_path / "members.csv"
+    src.write_text("weight,height,age,sex,activity\n80 kg,180 cm,30,male,2\n154 lb,5 ft 9 in,41,F,\n"
+                   "70.55,1.62 m,25,x,5\n")
+    bmi_snapshot.convert_csv(str(src), str(tmp_path / name))
+    bmi_batch.run_batch(str(src), str(tmp_path / "from_csv.csv"))
+    with open(tmp_path / "from_csv.csv") as a:
+        expected = [[row[f] for f in bmi_batch.RESULT_FIELDS] for row in csv.DictReader(a)]
+
+    def no_parsing(text):
+        raise AssertionError("snapshot values were parsed again")
+    monkeypatch.setattr(bmi_batch.bmi_bot, "parse_weight_str", no_parsing)
+    monkeypatch.setattr(bmi_batch.bmi_bot, "parse_height_str", no_parsing)
+    for workers in (1, 2):
+        out = tmp_path / f"from_snapshot_{workers}.csv"
+        n, errors = bmi_batch.run_batch(str(tmp_path / name), str(out), workers=workers, chunk_size=2)
+        assert (n, errors) == (3, 0)
+        with open(out) as b:
+            assert expected == [[row[f] for f in bmi_batch.RESULT_FIELDS] for row in csv.DictReader(b)]
+
+
+def _cache_sizes():
+    return {name: info.maxsize for name, info in bmi_batch.bmi_bot.cache_info().items()}
+
+
+def test_pool_workers_get_the_cache_setting():
+    bmi_batch.bmi_bot.enable_cache(123)
+    try:
+        results = list(bmi_batch.pool_map(_cache_sizes, [()] * 4, 2))
+    finally:
+        bmi_batch.bmi_bot.disable_cache()
+    assert [job for job, _ in results] == [()] * 4
+    assert all(sizes and set(sizes.values()) == {123} for _, sizes in results)
+
+
+def test_snapshot_conversion_skips_overflowing_rows(tmp_path):
+    import bmi_snapshot
+
+    src, dst = tmp_path / "members.jsonl", tmp_path / "members.bmis"
+    src.write_text("\n".join(json.dumps(r) for r in [
+        GOOD, {**GOOD, "age": "inf"}, {**GOOD, "weeks": "inf"}, {**GOOD, "age": "70000"}, GOOD]) + "\n")
+    assert bmi_snapshot.convert_csv(str(src), str(dst)) == (2, 3)
+    assert len(list(bmi_snapshot.iter_snapshot(str(dst)))) == 2
+    # a run that fails leaves the previous snapshot alone and no temporary file behind
+    with pytest.raises(ValueError):
+        bmi_snapshot.convert_csv(str(src), str(dst), fmt="xml")
+    assert len(list(bmi_snapshot.iter_snapshot(str(dst)))) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["members.bmis", "members.jsonl"]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_file_round_trip(fmt, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    records = [
+        {**GOOD, "member_id": "a"},
+        {"member_id": "b", "weight": "70", "height": "170"},  # no age: no TDEE or macros
+        {"member_id": "c", "weight": "heavy", "height": "170"},
+        {**GOOD, "member_id": "d", "target_weight": "90"},  # no deficit needed: maintenance
+        {**GOOD, "weight": "90"},  # no member_id
+    ]
+    path = str(tmp_path / f"out.{fmt}")
+    assert bmi_batch.write_columnar(iter(records), path, fmt, row_group_size=2, fields=["member_id"]) == (5, 1)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(path).metadata.num_row_groups == 3
+        table = pq.read_table(path)
+    else:
+        with pa.ipc.open_file(path) as f:
+            assert f.num_record_batches == 3
+            table = f.read_all()
+    assert table.column_names[:2] == ["row", "member_id"] and table.column_names[-1] == "error"
+    assert table.schema.field("category_code").type == pa.int8()
+    rows = table.to_pylist()
+    assert [r["row"] for r in rows] == [0, 1, 2, 3, 4]
+    assert [r["member_id"] for r in rows] == ["a", "b", "c", "d", None]
+    for rec, row in zip(records, rows):
+        expected = bmi_batch.process_record(rec)
+        assert row["error"] == expected["error"]
+        for name in ("weight_kg", "height_cm", "bmi", "tdee", "suggested_daily_calories", "daily_deficit",
+                     "estimated_weeks_needed", "protein_g", "fat_g", "carb_g"):
+            assert row[name] == expected[name], name  # None on both sides when missing
+    assert rows[2]["category_code"] is None
+    assert rows[0]["category_code"] == bmi_batch.bmi_bot.bmi_category_code(rows[0]["bmi"])
@@ -0,0 +1,66 @@
+import pytest
+
+import bmi_bot
+
+
+def test_batch_bmi_matches_the_scalar_function():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(20250101)
+    n = 50_000
+    # the parsers' precision (0.01 kg, 0.1 cm), unrounded values, and values built to land on .x5 ties
+    weights = np.concatenate([np.round(rng.uniform(30, 300, n), 2), rng.uniform(1, 500, n)])
+    heights = np.concatenate([np.round(rng.uniform(100, 220, n), 1), rng.uniform(50, 250, n)])
+    # at 100 cm the BMI is the weight itself, so these hit .x5 ties exactly (where np.round alone
+    # disagrees with round() about 40% of the time)
+    ties = rng.integers(100, 5000, n) / 10 + 0.05
+    weights = np.concatenate([weights, ties])
+    heights = np.concatenate([heights, np.full(n, 100.0)])
+
+    expected = [bmi_bot.calculate_bmi(w, h) for w, h in zip(weights.tolist(), heights.tolist())]
+    for scheme in bmi_bot.BMI_SCHEMES:
+        bmi, codes = bmi_bot.calculate_bmi_batch(weights, heights, scheme)
+        assert bmi.tolist() == expected
+        assert codes.tolist() == [bmi_bot.bmi_category_code(b, scheme) for b in expected]
+
+
+def test_batch_bmi_accepts_buffers_and_lists():
+    pytest.importorskip("numpy")
+    from array import array
+
+    bmi, codes = bmi_bot.calculate_bmi_batch(array("d", [70.0, 120.0]), [170, 180])
+    assert bmi.tolist() == [bmi_bot.calculate_bmi(70.0, 170), bmi_bot.calculate_bmi(120.0, 180)]
+    assert codes.tolist() == [1, 3]
+
+
+@pytest.mark.parametrize("scheme, bmi, label", [
+    ("who", 18.4, "Underweight"), ("who", 18.5, "Normal (healthy weight)"), ("who", 24.9, "Normal (healthy weight)"),
+    ("who", 25.0, "Overweight"), ("who", 30.0, "Obesity"),
+    ("asian", 22.9, "Normal (healthy weight)"), ("asian", 23.0, "Overweight"), ("asian", 27.4, "Overweight"),
+    ("asian", 27.5, "Obesity"),
+    ("who_obesity_classes", 29.9, "Overweight"), ("who_obesity_classes", 30.0, "Obesity class I"),
+    ("who_obesity_classes", 34.9, "Obesity class I"), ("who_obesity_classes", 35.0, "Obesity class II"),
+    ("who_obesity_classes", 39.9, "Obesity class II"), ("who_obesity_classes", 40.0, "Obesity class III"),
+])
+def test_a_bmi_on_a_cut_off_goes_to_the_band_above(scheme, bmi, label):
+    assert bmi_bot.bmi_category(bmi, scheme) == label
+    labels = bmi_bot.BMI_SCHEMES[scheme][1]
+    assert labels[bmi_bot.bmi_category_code(bmi, scheme)] == label
+
+
+def test_unknown_scheme_is_a_value_error():
+    with pytest.raises(ValueError, match="Unknown BMI scheme 'nope'"):
+        bmi_bot.bmi_category(22.0, "nope")
+
+
+def test_register_bmi_scheme(monkeypatch):
+    monkeypatch.setattr(bmi_bot, "BMI_SCHEMES", dict(bmi_bot.BMI_SCHEMES))
+    bmi_bot.register_bmi_scheme("two_bands", [25], ["Lower", "Upper"])
+    assert bmi_bot.BMI_SCHEMES["two_bands"] == ((25.0,), ("Lower", "Upper"))
+    assert [bmi_bot.bmi_category(b, "two_bands") for b in (24.9, 25.0)] == ["Lower", "Upper"]
+    with pytest.raises(ValueError, match="ascending"):
+        bmi_bot.register_bmi_scheme("bad", [25, 18.5], ["a", "b", "c"])
+    with pytest.raises(ValueError, match="one more label"):
+        bmi_bot.register_bmi_scheme("bad", [18.5, 25], ["a", "b"])
+    with pytest.raises(ValueError, match="one more label"):
+        bmi_bot.register_bmi_scheme("bad", [18.5], ["a", "b", "c"])
+    assert "bad" not in bmi_bot.BMI_SCHEMES
@@ -0,0 +1,26 @@
+import pytest
+
+import bmi_bot
+
+
+@pytest.fixture
+def cache():
+    bmi_bot.enable_cache(16)
+    yield
+    bmi_bot.disable_cache()
+
+
+def test_cached_results_match_uncached(cache):
+    cached = [bmi_bot.compute_macros(1800, 80, "3"), bmi_bot.estimate_tdee(80, 180, 30, "m", "3")]
+    bmi_bot.disable_cache()
+    assert cached == [bmi_bot.compute_macros(1800, 80, "3"), bmi_bot.estimate_tdee(80, 180, 30, "m", "3")]
+
+
+def test_changing_a_cached_macro_result_does_not_leak(cache):
+    first = bmi_bot.compute_macros(1800, 80, "3")
+    expected = first.to_dict()
+    first.protein_g = -1
+    again = bmi_bot.compute_macros(1800, 80, "3")
+    assert again.to_dict() == expected
+    assert again is not first
+    assert bmi_bot.cache_info()["recommend_macros"].hits == 1
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bmi_bot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("argv", [
+    ["--batch", "in.csv", "--workers", "2", "--chunk-size", "0"],
+    ["--batch", "in.csv", "--row-group-size", "0"],
+    ["--batch", "in.csv", "--workers", "0"],
+    ["--serve", "--max-concurrency", "-1"],
+])
+def test_sizes_below_one_are_rejected(argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        bmi_bot.main(argv)
+    assert e.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_profile_rejects_worker_pool(capsys):
+    with pytest.raises(SystemExit) as e:
+        bmi_bot.main(["--batch", "in.csv", "--profile", "out.pstats", "--workers", "2"])
+    assert e.value.code == 2
+    assert "--workers 1" in capsys.readouterr().err
+
+
+def test_interactive_start_stays_light():
+    # python -X importtime writes one line per module to stderr: "self | cumulative | name"
+    trace = subprocess.run([sys.executable, "-X", "importtime", "bmi_bot.py"], cwd=ROOT, stdin=subprocess.DEVNULL,
+                           capture_output=True, text=True).stderr
+    modules = {line.split("|")[2].strip() for line in trace.splitlines() if line.startswith("import time:")}
+    assert "bmi_dialog" in modules
+    assert not modules & {"typing", "re", "argparse", "bmi_history", "bmi_sqlite", "sqlite3"}
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import bmi_dialog
+from bmi_dialog import ChatSession
+
+
+def feed_all(session, answers):
+    replies = []
+    for answer in answers:
+        replies.append(session.feed(answer))
+    return replies
+
+
+@pytest.mark.parametrize("answers,message", [
+    (["1" * 41 + " kg"], bmi_dialog.WEIGHT_RANGE),
+    (["70000 kg"], bmi_dialog.WEIGHT_RANGE),
+    (["70", "0.1"], bmi_dialog.HEIGHT_RANGE),
+    (["70", "5000 cm"], bmi_dialog.HEIGHT_RANGE),
+])
+def test_out_of_range_bmi_answers_are_asked_again(answers, message):
+    session = ChatSession.for_bmi_check()
+    lines, prompt = feed_all(session, answers)[-1]
+    assert lines == [message]
+    assert prompt == bmi_dialog.PROMPTS[session.state]
+    assert ChatSession.from_bytes(session.to_bytes()).state == session.state
+
+
+@pytest.mark.parametrize("age,message", [("70000", bmi_dialog.AGE_RANGE), ("inf", bmi_dialog.POSITIVE_NUMBER),
+                                         ("1e400", bmi_dialog.POSITIVE_NUMBER)])
+def test_out_of_range_age_is_asked_again(age, message):
+    session = ChatSession.for_plan(consent=True)
+    assert feed_all(session, ["90", "80", age])[-1] == ([message], bmi_dialog.PROMPTS["plan_age"])
+
+
+def test_infinite_weeks_are_asked_again():
+    session = ChatSession.for_plan(consent=True)
+    replies = feed_all(session, ["90", "80", "30", "m", "n", "180", "3", "inf"])
+    assert replies[-1] == ([bmi_dialog.POSITIVE_NUMBER], bmi_dialog.PROMPTS["plan_weeks"])
+
+
+def test_history_factory_is_called_on_the_first_check_only():
+    from bmi_history import UserHistory
+
+    created = []
+
+    def factory():
+        created.append(UserHistory())
+        return created[-1]
+
+    session = ChatSession(consent=True)
+    session.history = factory
+    feed_all(session, ["I AGREE", "3"])  # health tips: no BMI check, no history
+    assert created == []
+    feed_all(session, ["1", "70", "170", "1", "72", "170"])
+    assert len(created) == 1
+    assert session.history is created[0]
+    assert len(created[0]) == 2
+
+
+# answers for every state, valid and not, including the extremes the snapshot has to survive
+ANSWERS = ["I AGREE", "no", "1", "2", "3", "4", "9", "", "abc", "70", "70.55 kg", "154 lb", "0.001", "999.99 kg",
+           "1000.01 kg", "1" * 41 + " kg", "170", "5 ft 9 in", "1.75 m", "30 cm", "300 cm", "0.1", "17", "18",
+           "150", "151", "inf", "male", "f", "x", "y", "n", "5", "12", "0.5"]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_snapshot_resume_matches_uninterrupted_session(seed):
+    rng = random.Random(seed)
+    straight = ChatSession()
+    resumed = ChatSession()
+    assert straight.start() == resumed.start()
+    for _ in range(40):
+        if straight.done:
+            break
+        resumed = ChatSession.from_bytes(resumed.to_bytes())
+        answer = rng.choice(ANSWERS)
+        assert resumed.feed(answer) == straight.feed(answer), answer
+        assert resumed.to_bytes() == straight.to_bytes()
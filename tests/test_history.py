@@ -0,0 +1,153 @@
+import statistics
+
+import pytest
+
+from bmi_history import DAY, HistoryStats, HistoryStore, SQLiteHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SQLiteHistoryStore(str(tmp_path / "history.db"), batch_size=4, cache_size=3)
+    yield s
+    s.close()
+
+
+def test_duplicate_timestamp_is_ignored(store):
+    store.add("alice", 80.0, 180.0, ts=DAY)
+    store.add("alice", 79.0, 180.0, ts=2 * DAY)
+    store.add("alice", 70.0, 180.0, ts=DAY)  # same ts, still pending
+    store.flush()
+    store.add("alice", 60.0, 180.0, ts=2 * DAY)  # same ts, already written
+    store.add_many("alice", [(3 * DAY, 78.0, 180.0), (3 * DAY, 50.0, 180.0), (DAY, 40.0, 180.0)])
+    readings = store.between("alice")
+    assert [(r.ts, r.weight_kg) for r in readings] == [(DAY, 80.0), (2 * DAY, 79.0), (3 * DAY, 78.0)]
+    stats = store.stats("alice")
+    assert stats.count == 3
+    assert stats.min_weight_kg == 78.0
+
+
+def test_in_memory_store_ignores_duplicates_too():
+    store = HistoryStore()
+    store.add("alice", 80.0, 180.0, ts=DAY)
+    stats = store.add("alice", 70.0, 180.0, ts=DAY)
+    assert stats.count == 1
+    assert len(store.user("alice")) == 1
+
+
+def test_stats_cache_is_bounded_and_keeps_unflushed_changes(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = SQLiteHistoryStore(path, batch_size=1000, cache_size=3)
+    for i in range(10):
+        store.add(f"user{i}", 80.0 + i, 180.0, ts=DAY)
+        store.add(f"user{i}", 79.0 + i, 180.0, ts=2 * DAY)
+    assert len(store._stats) <= 3
+    assert store.stats("user0").count == 2
+    store.close()
+    reopened = SQLiteHistoryStore(path)
+    assert [reopened.stats(f"user{i}").count for i in range(10)] == [2] * 10
+    assert reopened.stats("user9").min_weight_kg == 88.0
+    reopened.close()
+
+
+def test_downsample_starts_at_the_earliest_backfilled_reading(store):
+    now = 200 * DAY
+    store.add("alice", 80.0, 180.0, ts=now)
+    # a wearable export of the 100 days before the first check
+    store.add_many("alice", [(now - d * DAY, 80.0 + d / 10, 180.0) for d in range(1, 101)])
+    buckets = store.downsample("alice")
+    assert buckets[0].start_ts == now - 100 * DAY
+    assert sum(b.count for b in buckets) == 101
+    assert len(buckets) == 15
+    assert store.downsample("nobody") == []
+
+
+def test_mean_and_stdev_match_statistics_module():
+    weights = [80.0, 81.5, 79.2, 78.8, 80.3]
+    stats = HistoryStats()
+    for i, w in enumerate(weights):
+        stats.add(i * DAY, w, 25.0)
+    assert stats.mean_weight_kg == pytest.approx(statistics.mean(weights))
+    assert stats.stdev_weight_kg == pytest.approx(statistics.stdev(weights))
+    assert (stats.min_weight_kg, stats.max_weight_kg) == (78.8, 81.5)
+
+
+def test_trend_moves_halfway_after_one_half_life():
+    stats = HistoryStats()
+    stats.add(0.0, 80.0, 25.0)
+    stats.add(7 * DAY, 78.0, 24.4)  # TREND_HALF_LIFE_DAYS later
+    assert stats.trend_weight_kg == pytest.approx(79.0)
+
+
+def test_weekly_rate_of_a_straight_line():
+    stats = HistoryStats()
+    stats.add(0.0, 90.0, 27.8)
+    assert stats.weekly_rate_kg is None
+    stats.add(0.5 * DAY, 89.95, 27.8)
+    assert stats.weekly_rate_kg is None  # under MIN_RATE_SPAN_DAYS
+    for day in range(1, 60):
+        stats.add(day * DAY, 90.0 - 0.1 * day, 27.0)
+    assert stats.span_days == 59
+    assert stats.weekly_rate_kg == pytest.approx(-0.7)
+
+
+def test_stats_survive_a_bytes_round_trip():
+    stats = HistoryStats()
+    for day in range(10):
+        stats.add(day * DAY, 80.0 - 0.2 * day, 25.0)
+    restored = HistoryStats.from_bytes(stats.to_bytes())
+    assert restored.to_dict() == stats.to_dict()
+    restored.add(10 * DAY, 78.0, 24.1)
+    stats.add(10 * DAY, 78.0, 24.1)
+    assert restored.to_dict() == stats.to_dict()
+
+
+READINGS = [(day * DAY, 90.0 - 0.1 * day + (0.3 if day % 3 else -0.2), 180.0) for day in range(101)]
+
+
+def _in_order_stats():
+    stats = HistoryStore()
+    for ts, w, h in READINGS:
+        stats.add("alice", w, h, ts=ts)
+    return stats.stats("alice").to_dict()
+
+
+def _assert_same_stats(actual, expected):
+    assert actual.keys() == expected.keys()
+    for k in expected:
+        assert actual[k] == pytest.approx(expected[k], rel=1e-12, abs=1e-12), k
+
+
+def test_in_memory_backfill_rebuilds_the_stats():
+    store = HistoryStore()
+    ts, w, h = READINGS[-1]
+    store.add("alice", w, h, ts=ts)
+    for ts, w, h in READINGS[:-1]:
+        store.add("alice", w, h, ts=ts)
+    _assert_same_stats(store.stats("alice").to_dict(), _in_order_stats())
+
+
+def test_sqlite_backfill_rebuilds_the_stats(store, tmp_path):
+    ts, w, h = READINGS[-1]
+    stats = store.add("alice", w, h, ts=ts)
+    store.add_many("alice", READINGS[:-1])
+    expected = _in_order_stats()
+    assert stats.span_days == 100
+    assert stats.weekly_rate_kg is not None
+    _assert_same_stats(store.stats("alice").to_dict(), expected)
+    # a single late entry is folded in the same way, and the rebuilt state is what gets persisted
+    store.add("bob", 80.0, 180.0, ts=2 * DAY)
+    store.add("bob", 82.0, 180.0, ts=0.0)
+    assert store.stats("bob").first_ts == 0.0
+    assert store.stats("bob").trend_weight_kg == pytest.approx(80.0 + 2.0 * 0.5 ** (2 / 7))
+    store.close()
+    reopened = SQLiteHistoryStore(str(tmp_path / "history.db"))
+    _assert_same_stats(reopened.stats("alice").to_dict(), expected)
+    assert reopened.stats("bob").first_ts == 0.0
+    reopened.close()
+
+
+def test_backfill_still_skips_duplicates_within_the_import(store):
+    store.add("alice", 80.0, 180.0, ts=10 * DAY)
+    stats = store.add_many("alice", [(DAY, 82.0, 180.0), (20 * DAY, 79.0, 180.0), (20 * DAY, 60.0, 180.0)])
+    assert stats.count == 3
+    assert stats.min_weight_kg == 79.0
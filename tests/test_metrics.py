@@ -0,0 +1,108 @@
+import pytest
+
+import bmi_batch
+import bmi_bot
+import bmi_metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(bmi_metrics, "_histograms", {})
+    yield bmi_metrics
+    bmi_metrics.disable()
+
+
+def test_enable_wraps_and_disable_restores(metrics):
+    original = bmi_bot.calculate_bmi, bmi_bot.estimate_tdee
+    metrics.enable(["estimate_tdee"])
+    assert metrics.enabled()
+    assert bmi_bot.estimate_tdee is not original[1]
+    assert bmi_bot.estimate_tdee.__wrapped__ is original[1]
+    assert bmi_bot.calculate_bmi is original[0]
+    metrics.enable(["estimate_tdee"])  # idempotent: not wrapped twice
+    assert bmi_bot.estimate_tdee.__wrapped__ is original[1]
+    metrics.disable()
+    assert not metrics.enabled()
+    assert (bmi_bot.calculate_bmi, bmi_bot.estimate_tdee) == original
+
+
+def test_observations_land_in_the_first_bucket_that_holds_them():
+    hist = bmi_metrics.Histogram()
+    for seconds in (5e-7, 1e-6, 1.5e-6, 0.05, 99.0):
+        hist.observe(seconds)
+    expected = [0] * (len(bmi_metrics.BUCKETS) + 1)
+    expected[0] = 2  # le="1e-06" includes 1e-06 itself
+    expected[1] += 1
+    expected[bmi_metrics.BUCKETS.index(0.1)] += 1
+    expected[-1] += 1  # +Inf
+    assert hist.counts == expected
+    assert hist.count == 5
+    assert hist.sum == pytest.approx(99.050003)
+
+
+def test_calls_and_errors_are_counted(metrics):
+    metrics.enable(["parse_weight_str"])
+    bmi_bot.parse_weight_str("70 kg")
+    with pytest.raises(bmi_bot.ParseError):
+        bmi_bot.parse_weight_str("heavy")
+    hist = metrics._histograms["parse_weight_str"]
+    assert (hist.count, hist.errors) == (2, 1)
+    with pytest.raises(KeyError):
+        with metrics.timer("section"):
+            raise KeyError
+    assert (metrics._histograms["section"].count, metrics._histograms["section"].errors) == (1, 1)
+    metrics.reset()
+    assert (hist.count, hist.errors, sum(hist.counts)) == (0, 0, 0)
+
+
+def test_timer_is_a_no_op_while_disabled(metrics):
+    with metrics.timer("section"):
+        pass
+    assert "section" not in metrics._histograms
+
+
+def test_prometheus_text_format(metrics):
+    metrics.enable(["estimate_tdee"])
+    for _ in range(3):
+        bmi_bot.estimate_tdee(80, 180, 30, "male", "2")
+    lines = metrics.prometheus_text().splitlines()
+    assert lines[:2] == ["# HELP bmi_function_duration_seconds Time spent in instrumented bmi_bot functions.",
+                         "# TYPE bmi_function_duration_seconds histogram"]
+    buckets = [line for line in lines if line.startswith('bmi_function_duration_seconds_bucket{function="estimate_tdee"')]
+    assert len(buckets) == len(bmi_metrics.BUCKETS) + 1
+    assert buckets[0].startswith('bmi_function_duration_seconds_bucket{function="estimate_tdee",le="1e-06"} ')
+    assert buckets[-1] == 'bmi_function_duration_seconds_bucket{function="estimate_tdee",le="+Inf"} 3'
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)  # cumulative
+    assert 'bmi_function_duration_seconds_count{function="estimate_tdee"} 3' in lines
+    assert 'bmi_function_calls_total{function="estimate_tdee"} 3' in lines
+    assert 'bmi_function_errors_total{function="estimate_tdee"} 0' in lines
+    assert "# TYPE bmi_function_calls_total counter" in lines
+    assert "# TYPE bmi_function_errors_total counter" in lines
+
+
+def test_write_prometheus_replaces_the_file(metrics, tmp_path):
+    path = tmp_path / "bmi.prom"
+    path.write_text("old")
+    metrics.write_prometheus(str(path))
+    assert path.read_text() == metrics.prometheus_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["bmi.prom"]
+
+
+def test_export_and_merge_add_up(metrics):
+    metrics.enable(["parse_weight_str"])
+    bmi_bot.parse_weight_str("70")
+    exported = metrics.export()
+    metrics.merge(exported)
+    hist = metrics._histograms["parse_weight_str"]
+    assert hist.count == 2
+    assert sum(hist.counts) == 2
+
+
+def test_worker_processes_are_measured(metrics, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("weight,height,age\n" + "80 kg,180 cm,30\n" * 10)
+    metrics.enable()
+    bmi_batch.run_batch(str(src), str(tmp_path / "out.csv"), workers=2, chunk_size=3)
+    assert metrics._histograms["estimate_tdee"].count == 10
+    assert metrics._histograms["parse_weight_str"].count == 10
@@ -0,0 +1,108 @@
+import pytest
+
+import bmi_bot
+from bmi_bot import HeightParseError, WeightParseError, parse_height_str, parse_weight_str
+
+
+@pytest.mark.parametrize("text, kg", [("70", 70.0), ("70 kg", 70.0), ("70kg", 70.0), ("154 lb", 69.85),
+                                      ("70,5", 70.5), ("0.01", 0.01)])
+def test_parse_weight(text, kg):
+    assert parse_weight_str(text) == kg
+
+
+@pytest.mark.parametrize("text", ["0", "0.001", "0.004 kg", "0.01 lb"])
+def test_weight_that_rounds_to_zero_is_rejected(text):
+    with pytest.raises(WeightParseError) as e:
+        parse_weight_str(text)
+    assert e.value.reason == "not_positive"
+
+
+@pytest.mark.parametrize("text", ["0", "0.0001", "0.04 cm", "0.0004 m"])
+def test_height_that_rounds_to_zero_is_rejected(text):
+    with pytest.raises(HeightParseError) as e:
+        parse_height_str(text)
+    assert e.value.reason == "not_positive"
+
+
+@pytest.mark.parametrize("weight, height", [("0.001", "170"), ("70", "0.0001")])
+def test_parsed_values_never_divide_by_zero(weight, height):
+    with pytest.raises(bmi_bot.ParseError):
+        bmi_bot.calculate_bmi(parse_weight_str(weight), parse_height_str(height))
+
+
+@pytest.mark.parametrize("text", ["1" * 400, "1" * 400 + " lb", "inf kg", "nan kg", "1e400 kg"])
+def test_weight_out_of_float_range_is_rejected(text):
+    with pytest.raises(WeightParseError) as e:
+        parse_weight_str(text)
+    assert e.value.reason == "invalid"
+
+
+@pytest.mark.parametrize("text", ["1" * 400, "1" * 400 + " cm", "1" * 400 + " ft", "1" * 400 + " in"])
+def test_height_out_of_float_range_is_rejected(text):
+    with pytest.raises(HeightParseError) as e:
+        parse_height_str(text)
+    assert e.value.reason == "invalid"
+
+
+@pytest.mark.parametrize("text, reason", [("", "empty"), ("   ", "empty"), ("70 st", "unknown_unit"),
+                                          ("abc", "invalid")])
+def test_weight_errors(text, reason):
+    with pytest.raises(WeightParseError) as e:
+        parse_weight_str(text)
+    assert e.value.reason == reason
+
+
+# parse_height_str replaced a replace()/split() parser, kept in benchmarks/bench_parse_height.py.
+# Every input the old parser handled must give the same centimetres.
+SAME_AS_LEGACY = ["170", "170 cm", "170 cm.", "180 cm.", "170.5 cm", "1.75", "5'9\"", "5' 9\"", "5 ft 9 in",
+                  "5 ft. 9 in.", "5 feet 9 inches", "6 ft", "6 ft.", "6'", "5 9", "5 11", "182 cm", "182", "2",
+                  "1,75", "170,5 cm", "170 centimeters", "5'11\"", "4 ft 11 in", "6 ft 0 in", "190 cms",
+                  "5 ft 9in", "5ft 9in", " 170 ", "170 CM"]
+# The old parser ignored the inches in '5 ft 9' (152.4); reading them is intended.
+LEGACY_BUGS = {"5 ft 9": 175.3}
+# Inputs the old parser rejected.
+EXTENSIONS = {"170cm": 170.0, "190cms": 190.0, "1.75 m": 175.0, "1.75 m.": 175.0, "1.8 meters": 180.0,
+              "5ft9": 175.3, "5 foot 9": 175.3, "69 in": 175.3, "69 in.": 175.3, "69 inches": 175.3,
+              "5' 9''": 175.3}
+
+
+@pytest.fixture(scope="module")
+def legacy_parse_height_str():
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+    from bench_parse_height import legacy_parse_height_str
+    return legacy_parse_height_str
+
+
+@pytest.mark.parametrize("text", SAME_AS_LEGACY)
+def test_height_matches_legacy_parser(text, legacy_parse_height_str):
+    assert parse_height_str(text) == legacy_parse_height_str(text)
+
+
+@pytest.mark.parametrize("text, cm", sorted(LEGACY_BUGS.items()))
+def test_height_fixes_legacy_bugs(text, cm, legacy_parse_height_str):
+    assert legacy_parse_height_str(text) != cm
+    assert parse_height_str(text) == cm
+
+
+@pytest.mark.parametrize("text, cm", sorted(EXTENSIONS.items()))
+def test_height_extensions(text, cm, legacy_parse_height_str):
+    with pytest.raises(ValueError):
+        legacy_parse_height_str(text)
+    assert parse_height_str(text) == cm
+
+
+@pytest.mark.parametrize("text", ["abc", "5 ft 9 in 3", "170 kg", "cm"])
+def test_height_invalid(text):
+    with pytest.raises(HeightParseError) as e:
+        parse_height_str(text)
+    assert e.value.reason == "invalid"
+
+
+@pytest.mark.parametrize("sex, code", [("male", 0), ("M", 0), ("Female", 1), ("f", 1), ("other", 2), ("", 2), ("x", 2)])
+def test_sex_code(sex, code):
+    assert bmi_bot.sex_code(sex) == code
+    # the BMR formula and the array APIs' intercepts read sex the same way
+    assert bmi_bot.bmr_mifflin_sex(0, 0, 0, sex) == bmi_bot.BMR_SEX_INTERCEPTS[code]
@@ -0,0 +1,21 @@
+import bmi_bot
+from bmi_recalibrate import DAY, TDEERecalibrator, recalibrate
+
+PERSON = bmi_bot.PersonRecord(90, 180, 30, "male", "3")
+
+
+def test_weight_change_without_intake_leaves_tdee_alone():
+    cal = TDEERecalibrator.from_person(PERSON, ts=0)
+    prior = cal.tdee
+    for day in range(1, 29):
+        cal.add_reading(90 - 3 * day / 28, day * DAY)
+    assert cal.tdee == prior
+    assert cal.weight < 90
+
+
+def test_logged_intake_reveals_tdee():
+    true_tdee, intake = 2600.0, 2000.0
+    readings = [(day * DAY, 90 - (true_tdee - intake) * day / bmi_bot.KCAL_PER_KG, intake) for day in range(121)]
+    cal = recalibrate(PERSON, readings)
+    assert abs(cal.tdee - true_tdee) < 50
+    assert cal.tdee_sd < 100
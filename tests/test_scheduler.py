@@ -0,0 +1,94 @@
+import pytest
+
+from bmi_bot import DAY, PersonRecord
+from bmi_history import SQLiteHistoryStore
+from bmi_scheduler import PlanStore, replan_stale
+
+NOW = 1000 * DAY
+
+
+@pytest.fixture
+def path(tmp_path):
+    """A history database with planned users u00-u19 (planned at 90 kg, 60 days to 80 kg) whose
+    latest weigh-in is 90 + i/4 kg: users u04 and up drifted by 1 kg or more."""
+    path = str(tmp_path / "history.db")
+    history = SQLiteHistoryStore(path)
+    plans = PlanStore(path)
+    plans.save_many([(f"u{i:02d}", PersonRecord(90.0, 180.0, 40, "male", "2", 80.0, 60)) for i in range(20)],
+                    now=NOW - 10 * DAY)
+    for i in range(20):
+        history.add(f"u{i:02d}", 90.0 + i / 4, 180.0, ts=NOW - DAY)
+    history.close()
+    plans.close()
+    return path
+
+
+def _plans(path):
+    store = PlanStore(path)
+    try:
+        return {f"u{i:02d}": store.get(f"u{i:02d}") for i in range(20)}
+    finally:
+        store.close()
+
+
+def test_only_drifted_users_are_replanned_page_by_page(path):
+    before = _plans(path)
+    store = PlanStore(path)
+    pages = []
+    stats = replan_stale(store, drift_kg=1.0, batch_size=3, now=NOW, progress=lambda s: pages.append(s.replanned))
+    store.close()
+    assert (stats.stale, stats.replanned, stats.errors) == (16, 16, 0)
+    assert pages == [3, 6, 9, 12, 15, 16]
+    after = _plans(path)
+    for i in range(20):
+        uid = f"u{i:02d}"
+        if i < 4:  # drift below 1 kg (u04 is exactly 1 kg: stale)
+            assert after[uid] == before[uid]
+        else:
+            assert after[uid]["weight_kg"] == 90.0 + i / 4
+            assert after[uid]["planned_ts"] == NOW
+    # a second run finds nothing left to do
+    store = PlanStore(path)
+    assert replan_stale(store, drift_kg=1.0, batch_size=3, now=NOW).stale == 0
+    store.close()
+
+
+def test_replan_keeps_the_goal_date(path):
+    goal_ts = _plans(path)["u10"]["goal_ts"]
+    assert goal_ts == NOW + 50 * DAY
+    store = PlanStore(path)
+    replan_stale(store, now=NOW)
+    plan = store.get("u10")
+    store.close()
+    assert plan["goal_ts"] == goal_ts
+    # the same plan made from scratch today with the 50 days that are left
+    fresh = PlanStore(path)
+    fresh.save_many([("check", PersonRecord(92.5, 180.0, 40, "male", "2", 80.0, 50))], now=NOW)
+    expected = fresh.get("check")
+    fresh.close()
+    for name in ("tdee", "suggested_daily_calories", "protein_g", "fat_g", "carb_g"):
+        assert plan[name] == expected[name], name
+
+
+def test_workers_give_the_same_plans(path, tmp_path):
+    import shutil
+
+    other = str(tmp_path / "copy.db")
+    shutil.copy(path, other)
+    for p, workers in ((path, 1), (other, 2)):
+        store = PlanStore(p)
+        stats = replan_stale(store, batch_size=3, workers=workers, now=NOW)
+        store.close()
+        assert (stats.stale, stats.replanned) == (16, 16)
+    assert _plans(path) == _plans(other)
+
+
+def test_bad_plans_are_counted_not_fatal(path):
+    store = PlanStore(path)
+    # an infinite goal date overflows when the remaining days are worked out
+    store._db.execute("UPDATE plans SET goal_ts = ? WHERE user_id = 'u05'", (float("inf"),))
+    store._db.commit()
+    stats = replan_stale(store, batch_size=3, now=NOW)
+    assert (stats.stale, stats.replanned, stats.errors) == (16, 15, 1)
+    assert store.get("u05")["planned_ts"] == NOW - 10 * DAY
+    store.close()
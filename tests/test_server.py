@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+import bmi_server
+from bmi_server import handle_request
+
+
+def post(path, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return handle_request("POST", path, body)
+
+
+def test_bmi():
+    assert post("/bmi", {"weight_kg": 70, "height_cm": 170}) == (200, {"bmi": 24.2, "category": "Normal (healthy weight)"})
+
+
+@pytest.mark.parametrize("path,payload,message", [
+    ("/tdee", {"weight": 80, "height_cm": 180, "age": 30, "sex": 1}, "Field 'sex' must be a string."),
+    ("/tdee", {"sex": "m"}, "Missing fields: weight, height_cm, age"),
+    ("/tdee", {"weight": 80, "height_cm": 180, "age": 30.5, "sex": "m"}, "Field 'age' must be a whole number."),
+    ("/plan", b'{"current_weight": 90, "target_weight": 80, "tdee": 2500, "days": 1e400}',
+     "Field 'days' must be a whole number."),
+    ("/bmi", b'{"weight_kg": NaN, "height_cm": 170}', "Field 'weight_kg' must be a number."),
+    ("/bmi", {"weight_kg": "70", "height_cm": 170}, "Field 'weight_kg' must be a number."),
+    ("/bmi", {"weight_kg": True, "height_cm": 170}, "Field 'weight_kg' must be a number."),
+    ("/bmi", {"weight_kg": 70, "height_cm": 170, "age": 3}, "Unknown fields: age"),
+    ("/bmi", {"weight_kg": 1e308, "height_cm": 1e-5}, "Result out of range; check the input values."),
+    ("/bmi", {"weight_kg": 70, "height_cm": 0}, "float division by zero"),
+])
+def test_bad_fields_are_400(path, payload, message):
+    assert post(path, payload) == (400, {"error": message})
+
+
+def test_activity_key_accepts_numbers():
+    fields = {"weight": 80, "height_cm": 180, "age": 30, "sex": "m"}
+    assert post("/tdee", dict(fields, activity_key=2)) == post("/tdee", dict(fields, activity_key="2"))
+
+
+def test_bad_item_does_not_fail_the_list():
+    status, payload = post("/tdee", [{"weight": 80, "height_cm": 180, "age": 30, "sex": "m"}, {"sex": 1}, 3])
+    assert status == 200
+    ok, missing, not_object = payload["results"]
+    assert "tdee" in ok
+    assert missing == {"error": "Missing fields: weight, height_cm, age"}
+    assert not_object == {"error": "Each request must be a JSON object."}
+
+
+async def _exchange(port, raw: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def _serve(coro_fn, max_concurrency=4):
+    async def run():
+        server = bmi_server.BMIServer("127.0.0.1", 0, max_concurrency)
+        await server.start()
+        try:
+            return await coro_fn(server)
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_400(length):
+    raw = f"POST /bmi HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+    data = _serve(lambda server: _exchange(server.port, raw))
+    assert data.startswith(b"HTTP/1.1 400 ")
+    assert b"Content-Length must be a non-negative integer." in data
+
+
+def test_nan_never_reaches_the_wire():
+    body = b'[{"weight_kg": NaN, "height_cm": 170}]'
+    raw = b"POST /bmi HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+    data = _serve(lambda server: _exchange(server.port, raw))
+    json.loads(data.split(b"\r\n\r\n", 1)[1])  # strict JSON: NaN would fail to parse in other clients
+
+
+def test_stalled_body_does_not_block_other_requests(monkeypatch):
+    monkeypatch.setattr(bmi_server, "IDLE_TIMEOUT", 0.3)
+
+    async def scenario(server):
+        # the first connection sends its head but never its body; with one slot the second must still run
+        stalled_reader, stalled_writer = await asyncio.open_connection("127.0.0.1", server.port)
+        stalled_writer.write(b"POST /bmi HTTP/1.1\r\nContent-Length: 50\r\n\r\n")
+        await stalled_writer.drain()
+        await asyncio.sleep(0.05)
+        body = json.dumps({"weight_kg": 70, "height_cm": 170}).encode()
+        raw = b"POST /bmi HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+        second = await asyncio.wait_for(_exchange(server.port, raw), 0.2)
+        assert second.startswith(b"HTTP/1.1 200 ")
+        stalled = await asyncio.wait_for(stalled_reader.read(), 5)
+        stalled_writer.close()
+        assert stalled.startswith(b"HTTP/1.1 408 ")
+        assert b"Connection: close" in stalled
+    _serve(scenario, max_concurrency=1)
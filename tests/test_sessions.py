@@ -0,0 +1,130 @@
+import pytest
+
+from bmi_sessions import MemorySessionStore, SQLiteSessionStore, open_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_sessions_expire_after_ttl():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=10.0, clock=clock)
+    store.put("a", b"1")
+    clock.now = 9.5
+    assert store.get("a") == b"1"
+    store.put("a", b"2")  # a put restarts the clock
+    clock.now = 19.0
+    assert store.get("a") == b"2"
+    clock.now = 19.5
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(maxsize=2, clock=FakeClock())
+    store.put("a", b"1")
+    store.put("b", b"2")
+    assert store.get("a") == b"1"  # a is now more recent than b
+    store.put("c", b"3")
+    assert (store.get("a"), store.get("b"), store.get("c")) == (b"1", None, b"3")
+    store.delete("a")
+    store.delete("missing")
+    assert len(store) == 1
+
+
+def test_memory_purge_expired():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=10.0, clock=clock)
+    store.put("old", b"1")
+    clock.now = 5.0
+    store.put("new", b"2")
+    clock.now = 10.0
+    assert store.purge_expired() == 1
+    assert store.get("new") == b"2"
+    assert len(store) == 1
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def _buffered(path, **kwargs):
+    # no time-based flushes: writes stay buffered until batch_size or flush()
+    return SQLiteSessionStore(path, flush_interval=1e9, **kwargs)
+
+
+def test_sqlite_reads_its_own_buffered_writes(db_path):
+    writer, reader = _buffered(db_path), _buffered(db_path)
+    writer.put("a", b"1")
+    assert writer.get("a") == b"1"
+    assert reader.get("a") is None  # not written yet
+    writer.flush()
+    assert reader.get("a") == b"1"
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_delete_then_get(db_path):
+    writer, reader = _buffered(db_path), _buffered(db_path)
+    writer.put("a", b"1")
+    writer.flush()
+    writer.delete("a")
+    assert writer.get("a") is None  # the buffered delete hides the stored row
+    assert reader.get("a") == b"1"
+    writer.flush()
+    assert reader.get("a") is None
+    writer.put("a", b"2")  # a put after a delete wins
+    assert writer.get("a") == b"2"
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_writes_in_batches(db_path):
+    writer, reader = _buffered(db_path, batch_size=3), _buffered(db_path)
+    writer.put("a", b"1")
+    writer.put("b", b"2")
+    assert (reader.get("a"), reader.get("b")) == (None, None)
+    writer.put("c", b"3")  # third pending session: the whole batch is written
+    assert (reader.get("a"), reader.get("b"), reader.get("c")) == (b"1", b"2", b"3")
+    assert writer._pending == {}
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_flush_interval(db_path):
+    writer, reader = SQLiteSessionStore(db_path, flush_interval=0.0), _buffered(db_path)
+    writer.put("a", b"1")
+    assert reader.get("a") == b"1"
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_purge_expired(db_path):
+    expired = SQLiteSessionStore(db_path, ttl=-1.0)
+    kept = SQLiteSessionStore(db_path)
+    expired.put("old", b"1")
+    kept.put("new", b"2")
+    expired.flush()
+    kept.flush()
+    assert expired.get("old") is None  # expired rows are never returned
+    assert expired.purge_expired() == 1
+    assert expired.purge_expired() == 0
+    assert kept.get("new") == b"2"
+    expired.close()
+    kept.close()
+
+
+def test_open_store(db_path):
+    assert isinstance(open_store("memory"), MemorySessionStore)
+    store = open_store("sqlite:" + db_path, ttl=5.0)
+    assert isinstance(store, SQLiteSessionStore) and store.ttl == 5.0
+    store.close()
+    for spec in ("memory:x", "sqlite:", "redis:host"):
+        with pytest.raises(ValueError):
+            open_store(spec)
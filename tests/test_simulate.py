@@ -0,0 +1,56 @@
+import pytest
+
+import bmi_bot
+import bmi_simulate
+
+CASES = [
+    # weight, height, age, sex, activity, daily calories
+    (95.0, 180.0, 40, "male", "3", 1900.0),
+    (70.0, 165.0, 30, "female", "1", 1300.0),
+    (120.0, 175.0, 55, "other", "5", 2600.0),
+    (60.0, 160.0, 25, "female", "2", 2400.0),  # surplus: gains towards w_eq
+]
+
+
+def _day_loop(weight, height_cm, age, sex, activity_key, daily_calories, days):
+    m = bmi_bot.ACTIVITY_LEVELS[activity_key][1]
+    for _ in range(days):
+        tdee = m * bmi_bot.bmr_mifflin_sex(weight, height_cm, age, sex)
+        weight -= (tdee - daily_calories) / bmi_bot.KCAL_PER_KG
+    return weight
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_closed_form_matches_day_loop(case):
+    for days in (0, 1, 30, 365):
+        assert bmi_simulate.weight_after_days(*case, days) == pytest.approx(_day_loop(*case, days), abs=1e-12)
+
+
+@pytest.mark.parametrize("case", CASES[:3])
+def test_days_to_reach_target_lands_on_target(case):
+    weight = case[0]
+    days = bmi_simulate.days_to_reach_target(weight, weight - 5, *case[1:])
+    assert bmi_simulate.weight_after_days(*case, days) == pytest.approx(weight - 5, abs=1e-9)
+
+
+def test_cohort_matches_scalar_model():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(12)
+    n, weeks = 2000, 52
+    weights = rng.uniform(60, 140, n).round(2)
+    heights = rng.uniform(150, 200, n).round(1)
+    ages = rng.integers(18, 80, n)
+    sexes = rng.integers(0, 3, n)
+    activity = rng.integers(1, 6, n)
+    targets = (weights - rng.uniform(-5, 30, n)).round(2)
+    days = rng.integers(7, 400, n)
+    out = bmi_simulate.simulate_cohort(weights, heights, ages, sexes, activity, targets, days, weeks)
+    sex_names = tuple(bmi_bot.SEX_CODES)
+    for i in range(0, n, 40):
+        sex, act = sex_names[sexes[i]], str(activity[i])
+        tdee = bmi_bot.estimate_tdee(weights[i], heights[i], int(ages[i]), sex, act)
+        plan = bmi_bot.plan_weight_loss(weights[i], targets[i], tdee, int(days[i]), sex)
+        intake = tdee if plan.message is not None else plan.suggested_daily_calories
+        for week in (1, 13, 52):
+            expected = bmi_simulate.weight_after_days(weights[i], heights[i], int(ages[i]), sex, act, intake, 7 * week)
+            assert out[i, week] == pytest.approx(expected, abs=1e-5)
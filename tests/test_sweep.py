@@ -0,0 +1,30 @@
+import pytest
+
+import bmi_bot
+
+np = pytest.importorskip("numpy")
+import bmi_sweep  # noqa: E402
+
+
+def test_sweep_matches_plan_weight_loss():
+    rng = np.random.default_rng(16)
+    n = 5000
+    current = rng.uniform(60, 140, n).round(2)
+    target = (current - rng.uniform(-5, 40, n)).round(2)
+    tdee = rng.integers(1400, 3500, n).astype(float)
+    days = rng.integers(1, 400, n)
+    grid = bmi_sweep.make_grid((500, 750, 1000), (1200, 1500), (7000, 7700))
+    results = bmi_sweep.sweep(current, target, tdee, days, grid, chunk_size=1024)
+    assert len(results) == len(grid)
+    for (max_def, min_cal, k), got in zip(grid, results):
+        plans = [bmi_bot.plan_weight_loss(current[i], target[i], tdee[i], int(days[i]), "other",
+                                          max_safe_deficit=max_def, min_cal=min_cal, kcal_per_kg=k)
+                 for i in range(n)]
+        plans = [p for p in plans if p.message is None]
+        assert got["members"] == len(plans)
+        assert got["mean_suggested_calories"] == sum(p.suggested_daily_calories for p in plans) / len(plans)
+        assert got["mean_daily_deficit"] == sum(p.daily_deficit for p in plans) / len(plans)
+        assert got["share_deficit_capped"] == sum(any("max safe deficit" in w for w in p.warnings)
+                                                  for p in plans) / len(plans)
+        assert got["share_at_min_calories"] == sum(any("minimum recommended" in w for w in p.warnings)
+                                                   for p in plans) / len(plans)
@@ -0,0 +1,23 @@
+"""The terminal bot against transcripts recorded from the original input()-based flow.
+
+Each tests/transcripts/NAME.in holds the answers typed in one session and NAME.out the
+exact output of the pre-state-machine bmi_bot.py for them. Together they cover every
+dialog branch: BMI, plans (metric and imperial), under-18, pregnancy, medical condition,
+no deficit needed, no consent, tips and invalid input."""
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+TRANSCRIPTS = ROOT / "tests" / "transcripts"
+
+
+@pytest.mark.parametrize("name", sorted(p.stem for p in TRANSCRIPTS.glob("*.in")))
+def test_terminal_output_matches_original_flow(name):
+    answers = (TRANSCRIPTS / f"{name}.in").read_text(encoding="utf-8")
+    result = subprocess.run([sys.executable, str(ROOT / "bmi_bot.py")], input=answers, capture_output=True,
+                            text=True, encoding="utf-8", cwd=ROOT, timeout=60)
+    assert result.stderr == ""
+    assert result.stdout == (TRANSCRIPTS / f"{name}.out").read_text(encoding="utf-8")